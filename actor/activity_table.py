@@ -0,0 +1,85 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import math
+from utils.singleton import Singleton
+
+try:
+    import numpy
+except ImportError:
+    # 没有安装numpy时退回列表逐个比较, 行为一致
+    numpy = None
+
+
+class ActivityTable(Singleton):
+    """按槽位列式存放actor最近一次消息时间和gc时间, 找出需要gc的actor是一次向量比较
+    ActorContext绑定actor时分配槽位, 收到消息时只更新对应槽位的时间"""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        super().__init__()
+        self.__capacity = capacity
+        self.__size = 0
+        self.__free: list[int] = []
+        self.__keys: list[None | str] = []
+        if numpy is not None:
+            self.__last = numpy.zeros(capacity, dtype=numpy.float64)
+            self.__gc_time = numpy.full(capacity, math.inf, dtype=numpy.float64)
+        else:
+            self.__last = [0.0] * capacity
+            self.__gc_time = [math.inf] * capacity
+
+    def __len__(self) -> int:
+        return self.__size - len(self.__free)
+
+    def __grow(self) -> None:
+        capacity = self.__capacity * 2
+        if numpy is not None:
+            last = numpy.zeros(capacity, dtype=numpy.float64)
+            gc_time = numpy.full(capacity, math.inf, dtype=numpy.float64)
+            last[:self.__capacity] = self.__last
+            gc_time[:self.__capacity] = self.__gc_time
+            self.__last, self.__gc_time = last, gc_time
+        else:
+            self.__last.extend([0.0] * self.__capacity)
+            self.__gc_time.extend([math.inf] * self.__capacity)
+        self.__capacity = capacity
+
+    def alloc(self, key: str, gc_time: float, now: float) -> int:
+        if self.__free:
+            slot = self.__free.pop()
+            self.__keys[slot] = key
+        else:
+            if self.__size == self.__capacity:
+                self.__grow()
+            slot = self.__size
+            self.__size += 1
+            self.__keys.append(key)
+        self.__last[slot] = now
+        self.__gc_time[slot] = gc_time
+        return slot
+
+    def free(self, slot: int) -> None:
+        if slot < 0 or slot >= self.__size or self.__keys[slot] is None:
+            return
+        self.__keys[slot] = None
+        # gc时间为inf的槽位永远不会到期
+        self.__gc_time[slot] = math.inf
+        self.__free.append(slot)
+
+    def touch(self, slot: int, now: float) -> None:
+        self.__last[slot] = now
+
+    def key(self, slot: int) -> None | str:
+        return self.__keys[slot]
+
+    def expired(self, now: float) -> list[int]:
+        """返回最近一次消息时间+gc时间<=now的槽位"""
+        size = self.__size
+        if numpy is not None:
+            return numpy.flatnonzero(
+                self.__last[:size] + self.__gc_time[:size] <= now).tolist()
+        last, gc_time = self.__last, self.__gc_time
+        return [slot for slot in range(size) if last[slot] + gc_time[slot] <= now]
@@ -12,7 +12,7 @@ from message.base import JsonMessage
 from typing import Any, Callable, cast
 from message.rpc_message import RpcMessage
 from actor.actor_context import ActorContext
-from actor.actor_timer import ActorTimer, ActorTimerManager
+from actor.actor_timer import ActorTimer, ActorTimerBatch, ActorTimerManager
 from network.socket_session import SocketSession, SocketSessionManager
 from message.gateway_message import NotifyActorSessionAborted, NotifyNewActorMessage, NotifyNewActorSession
 
@@ -34,6 +34,7 @@ class ActorBase(Actor):
     def init(self, context: ActorContext, socker_session: weakref.ReferenceType[SocketSession] | None) -> None:
         self.__context = context
         self.__socket_session = socker_session
+        context.bind_activity(f'{self.actor_type()}:{self.actor_id}', self.gc_time)
 
     @property
     def actor_id(self) -> str:
@@ -111,9 +112,9 @@ class ActorBase(Actor):
             return
         await session.send(msg)
 
-    async def dispatch_message(self, msg: JsonMessage | RpcMessage | ActorTimer) -> None:
+    async def dispatch_message(self, msg: JsonMessage | RpcMessage | ActorTimer | ActorTimerBatch) -> None:
         try:
-            if isinstance(msg, ActorTimer):
+            if isinstance(msg, (ActorTimer, ActorTimerBatch)):
                 msg.tick()
             else:
                 if isinstance(msg, RpcMessage):
@@ -6,25 +6,35 @@ __author__ = '虎小黑'
 
 import weakref
 from asyncio import Queue
+from utils import monkey_config
 from message.base import JsonMessage
-from actor.actor_timer import ActorTimer
+from actor.actor_timer import ActorTimer, ActorTimerBatch
+from actor.activity_table import ActivityTable
 from utils.monkey_time import MonkeyTime
+from utils.load_monitor import LoadMonitor
 from network.socket_session import SocketSession
 from message.rpc_message import RpcMessage, RpcRequest
 
 
 MsgType = tuple[
-    weakref.ReferenceType[SocketSession], RpcRequest] | RpcMessage | JsonMessage | ActorTimer
+    weakref.ReferenceType[SocketSession], RpcRequest] | RpcMessage | JsonMessage | ActorTimer | ActorTimerBatch
+SessionRef = None | weakref.ReferenceType[SocketSession]
 
 
 class ActorContext(object):
 
     def __init__(self):
         super().__init__()
-        self.__queue: Queue[MsgType] = Queue()
+        # 队列中同时记录消息来自哪个连接, 用于按连接统计未处理消息数
+        self.__queue: Queue[tuple[MsgType, SessionRef]] = Queue()
+        # 邮箱超过高水位时被暂停读取的连接, 降到低水位以下统一恢复
+        self.__paused_sessions: dict[int, weakref.ReferenceType[SocketSession]] = {}
         self.__loop_id: int = 0
         self.__reentrant_id: int = 0
         self.__last_msg_time: int = MonkeyTime.timestamp_sec()
+        self.__activity: None | ActivityTable = None
+        self.__activity_slot: int = -1
+        self.__load = LoadMonitor()
 
     @property
     def loop_id(self) -> int:
@@ -48,12 +58,94 @@ class ActorContext(object):
 
     def update_last_msg_time(self) -> None:
         self.__last_msg_time = MonkeyTime.timestamp_sec()
+        if self.__activity is not None:
+            self.__activity.touch(self.__activity_slot, self.__last_msg_time)
 
-    async def pop_message(self) -> MsgType:
-        return await self.__queue.get()
+    @property
+    def activity_slot(self) -> int:
+        return self.__activity_slot
+
+    def bind_activity(self, unique_id: str, gc_time: int) -> None:
+        """在ActivityTable中登记, ActorManager据此找出需要gc的actor"""
+        self.release_activity()
+        self.__activity = ActivityTable()
+        self.__activity_slot = self.__activity.alloc(
+            unique_id, gc_time, self.__last_msg_time)
+
+    def release_activity(self) -> None:
+        if self.__activity is not None:
+            self.__activity.free(self.__activity_slot)
+            self.__activity = None
+            self.__activity_slot = -1
+
+    def __del__(self) -> None:
+        self.release_activity()
+        self.drain()
 
-    async def push_message(self, message: MsgType) -> None:
+    @property
+    def mailbox_size(self) -> int:
+        return self.__queue.qsize()
+
+    async def pop_message(self) -> MsgType:
+        message, source = await self.__queue.get()
+        self.__load.add_backlog(-1)
+        if source is not None:
+            session = source()
+            if session is not None:
+                session.add_pending(-1)
+        if self.__paused_sessions and self.__queue.qsize() <= monkey_config.get_config().mailbox_low_watermark:
+            self.__resume_sessions()
+        return message
+
+    def drain(self) -> list[MsgType]:
+        """取出邮箱中未处理的消息, 归还来源连接的未处理计数并恢复被暂停的连接, 返回取出的消息
+        消息循环退出或context销毁时调用, 避免共享的节点间连接一直处于暂停状态"""
+        messages: list[MsgType] = []
+        while not self.__queue.empty():
+            message, source = self.__queue.get_nowait()
+            messages.append(message)
+            if source is not None:
+                session = source()
+                if session is not None:
+                    session.add_pending(-1)
+        self.__load.add_backlog(-len(messages))
+        self.__resume_sessions()
+        return messages
+
+    def release_sessions(self) -> None:
+        """保留邮箱中的消息, 只归还来源连接的未处理计数并恢复被暂停的连接
+        消息留给下一次消息循环处理"""
+        entries: list[tuple[MsgType, SessionRef]] = []
+        while not self.__queue.empty():
+            entries.append(self.__queue.get_nowait())
+        for message, source in entries:
+            if source is not None:
+                session = source()
+                if session is not None:
+                    session.add_pending(-1)
+            self.__queue.put_nowait((message, None))
+        self.__resume_sessions()
+
+    def __resume_sessions(self) -> None:
+        paused_sessions = self.__paused_sessions
+        self.__paused_sessions = {}
+        for session_ref in paused_sessions.values():
+            session = session_ref()
+            if session is not None:
+                session.resume_reading()
+
+    async def push_message(self, message: MsgType, session: None | SocketSession = None) -> None:
+        """session为消息来源连接, 邮箱积压超过高水位时暂停该连接的读取, 让压力体现为TCP背压"""
+        source: SessionRef = None
+        if session is not None:
+            source = weakref.ref(session)
+            session.add_pending(1)
+            if self.__queue.qsize() >= monkey_config.get_config().mailbox_high_watermark and \
+                    session.session_id not in self.__paused_sessions:
+                self.__paused_sessions[session.session_id] = source
+                session.pause_reading()
+        self.__load.add_backlog(1)
         try:
-            self.__queue.put_nowait(message)
+            self.__queue.put_nowait((message, source))
         except Exception as _:
-            await self.__queue.put(message)
+            await self.__queue.put((message, source))
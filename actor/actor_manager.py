@@ -7,6 +7,7 @@ __author__ = '虎小黑'
 import asyncio
 from typing import TypeVar
 from typing import Type, cast
+from utils import monkey_config
 from logger.logger import Logger
 from actor.rpc_meta import RpcMeta
 from message.message import GCActor
@@ -14,6 +15,10 @@ from utils.monkey_type import ActorType
 from utils.singleton import Singleton
 from actor.actor_base import ActorBase
 from utils.monkey_time import MonkeyTime
+from utils.load_monitor import LoadMonitor
+from utils.timing_wheel import TimingWheel
+from actor.activity_table import ActivityTable
+from membership.membership_manager import MembershipManager
 
 
 logger = Logger().get_logger("Monkey")
@@ -25,6 +30,9 @@ class ActorManager(Singleton):
         super().__init__()
         self.__actors: dict[str, ActorBase] = {}
         self.__weight = 0
+        # 按placement续期时间挂到时间轮上, 到期的actor批量续期
+        self.__keep_alive_wheel: TimingWheel[str] = TimingWheel(
+            now=MonkeyTime.timestamp_sec())
 
     @property
     def weight(self) -> int:
@@ -43,44 +51,88 @@ class ActorManager(Singleton):
         if impl_type is None:
             raise Exception(f'actor type {actor_type.__qualname__} not found')
         actor = impl_type(actor_id)
-        self.__actors[f'{actor_type.actor_type()}:{actor_id}'] = actor
+        unique_id = f'{actor_type.actor_type()}:{actor_id}'
+        self.__actors[unique_id] = actor
+        self.__add_weight(actor.actor_weight)
+        self.__keep_alive_wheel.add(unique_id, MonkeyTime.timestamp_sec(
+        ) + MembershipManager().keep_alive_delay())
         return actor
 
-    async def calc_weight_loop(self):
+    def __add_weight(self, weight: int) -> None:
+        # 在actor激活/销毁时增量维护, 通过心跳发布给其他节点
+        self.__weight += weight
+        LoadMonitor().add_weight(weight)
+
+    async def gc_loop(self):
         while True:
-            await asyncio.sleep(10)
-            weight = 0
-            for actor in self.__actors.values():
-                weight += actor.actor_weight
-            self.__weight = weight
+            await asyncio.sleep(60)
+            await self.gc_actors(MonkeyTime.timestamp_sec())
+
+    async def gc_actors(self, now: int) -> int:
+        """销毁now时已经到期的actor, 返回销毁的数量"""
+        # 只处理ActivityTable中到期的槽位, 耗时与到期数量成正比, 与存活actor总数无关
+        table = ActivityTable()
+        evicted: list[tuple[str, str]] = []
+        for slot in table.expired(now):
+            unique_id = table.key(slot)
+            if unique_id and await self.__evict(unique_id):
+                actor_type, _, actor_id = unique_id.partition(':')
+                evicted.append((actor_type, actor_id))
+            else:
+                table.free(slot)
+        if evicted:
+            # 销毁的actor批量释放位置, 避免Redis中留下没人续期的key
+            try:
+                await MembershipManager().release_positions(evicted)
+            except Exception as e:
+                logger.exception(
+                    f'ActorManager gc_actors release positions count:{len(evicted)} error:{e}')
+        return len(evicted)
 
-    async def __gc_actor(self, actor: ActorBase) -> bool:
+    async def __evict(self, unique_id: str) -> bool:
+        actor = self.__actors.pop(unique_id, None)
+        if actor is None:
+            return False
+        self.__add_weight(-actor.actor_weight)
+        self.__keep_alive_wheel.remove(unique_id)
         if actor.context is None:
             return False
-        if actor.context.last_msg_time + actor.gc_time <= MonkeyTime.timestamp_sec():
-            logger.info(
-                f'ActorManager __gc_actor {actor.actor_type()}:{actor.actor_id}')
+        try:
+            actor.context.release_activity()
+            logger.info(f'ActorManager evict {unique_id}')
             await actor.context.push_message(GCActor(actor_id=actor.actor_id))
-            return True
-        return False
+        except Exception as e:
+            logger.exception(f'ActorManager evict {unique_id} error:{e}')
+        return True
 
-    async def gc_loop(self):
+    def __schedule_keep_alive(self, unique_id: str) -> None:
+        # 过期时间过半时续期
+        self.__keep_alive_wheel.add(unique_id, MonkeyTime.timestamp_sec(
+        ) + monkey_config.get_config().actor_keep_alive_time // 2)
+
+    async def keep_alive_loop(self):
         while True:
-            await asyncio.sleep(60)
-            unique_ids: list[str] = []
-            now = MonkeyTime.timestamp_sec()
-            for actor in self.__actors.values():
-                if actor.context is None:
-                    continue
-                try:
-                    if await self.__gc_actor(actor):
-                        unique_ids.append(
-                            f"{actor.actor_type()}:{actor.actor_id}")
-                except Exception as e:
-                    logger.exception(
-                        f'ActorManager gc_loop gc {actor.actor_type()}:{actor.actor_id} error:{e}')
-                finally:
-                    if MonkeyTime.timestamp_sec() - now > 100:
-                        break
-            for unique_id in unique_ids:
-                self.__actors.pop(unique_id, None)
+            await asyncio.sleep(monkey_config.get_config().actor_keep_alive_interval)
+            unique_ids = [unique_id for unique_id in self.__keep_alive_wheel.advance(
+                MonkeyTime.timestamp_sec()) if unique_id in self.__actors]
+            if not unique_ids:
+                continue
+            actors = [(unique_id.partition(':')[0], self.__actors[unique_id].actor_id)
+                      for unique_id in unique_ids]
+            try:
+                results = await MembershipManager().actors_keep_alive(
+                    actors, monkey_config.get_config().actor_keep_alive_time)
+            except Exception as e:
+                logger.exception(
+                    f'ActorManager keep_alive_loop count:{len(actors)} error:{e}')
+                for unique_id in unique_ids:
+                    self.__schedule_keep_alive(unique_id)
+                continue
+            for unique_id, result in zip(unique_ids, results):
+                if result:
+                    self.__schedule_keep_alive(unique_id)
+                else:
+                    # placement已经不归属本节点, 销毁本地actor
+                    logger.warning(
+                        f'ActorManager keep_alive_loop lost placement {unique_id}')
+                    await self.__evict(unique_id)
@@ -30,9 +30,9 @@ class ActorMessageLoop(object):
     @classmethod
     async def send_error_resp(cls, session: SocketSession, request_id: int, e: Exception):
         resp = RpcResponse(request_id=request_id)
-        if isinstance(e, RpcResponse):
-            resp.error_code = e.error_code
-            resp.error_str = e.error_str
+        if isinstance(e, RpcException):
+            resp.error_code = e.code
+            resp.error_str = str(e)
         else:
             resp.error_code = RpcErrorCode.UnknownError
             resp.error_str = traceback.format_exc()
@@ -57,7 +57,7 @@ class ActorMessageLoop(object):
             resp = RpcResponse()
             resp.request_id = request.request_id
             if session:
-                await session.send(RpcMessage.from_msg(resp, utils.pickle_dump(result)))
+                await session.send(RpcMessage.from_msg(resp, utils.pickle_dump(result, compress=False)))
         except Exception as e:
             if session is not None:
                 await cls.send_error_resp(session, request.request_id, e)
@@ -79,6 +79,8 @@ class ActorMessageLoop(object):
                 logger.exception(
                     f'ActorMessageLoop dispatch_actor_message_in_loop {actor.actor_id} active failed error:{e}')
                 actor.context.loop_id = 0
+                # 消息留在邮箱中等下一次消息循环处理, 只释放来源连接的背压
+                actor.context.release_sessions()
                 return
             while True:
                 await asyncio.sleep(0)
@@ -107,10 +109,35 @@ class ActorMessageLoop(object):
         if actor.context.loop_id == loop_id:
             actor.context.loop_id = 0
             actor.context.reentrant_id = -1
+            await cls.__drain_mailbox(actor)
 
         logger.info(
             f'ActorMessageLoop dispatch_actor_message_in_loop {actor.actor_type()}:{actor.actor_id} exit')
 
+    @classmethod
+    async def __drain_mailbox(cls, actor: ActorBase) -> None:
+        # 退出后不会再处理的消息统一丢弃, 释放来源连接的背压, rpc请求回复错误避免调用方等到超时
+        assert actor.context
+        dropped = actor.context.drain()
+        if not dropped:
+            return
+        logger.warning(
+            f'ActorMessageLoop dispatch_actor_message_in_loop {actor.actor_type()}:{actor.actor_id} dropped:{len(dropped)}')
+        for o in dropped:
+            if not isinstance(o, tuple):
+                continue
+            session, msg = cast(
+                tuple[weakref.ReferenceType[SocketSession], RpcRequest], o)
+            source = session()
+            if source is None or source.is_closed:
+                continue
+            try:
+                await cls.send_error_resp(source, msg.request_id, RpcException.actor_not_running(
+                    actor.actor_type(), f'{msg.server_name}:{msg.actor_id}'))
+            except Exception as e:
+                logger.error(
+                    f'ActorMessageLoop __drain_mailbox {actor.actor_id} request_id:{msg.request_id} send error resp error:{e}')
+
     def run_message_loop(self, actor: ActorBase) -> None:
         assert actor.context
 
@@ -130,6 +157,6 @@ class ActorMessageLoop(object):
                 asyncio.create_task(
                     self.dispatch_actor_rpc_request(actor, session, msg))
             else:
-                await actor.context.push_message((weakref.ref(session), msg))
+                await actor.context.push_message((weakref.ref(session), msg), session)
         else:
-            await actor.context.push_message(msg)
+            await actor.context.push_message(msg, session)
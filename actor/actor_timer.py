@@ -5,10 +5,15 @@ __author__ = '虎小黑'
 
 import asyncio
 import weakref
-from actor.actor import Actor
-from typing import Callable, Any
+from typing import TYPE_CHECKING, Callable, Any
+from utils import monkey_config
 from logger.logger import Logger
+from utils.singleton import Singleton
 from utils.sequence_id import SequenceId
+from utils.timing_wheel import TimingWheel
+
+if TYPE_CHECKING:
+    from actor.actor import Actor
 
 
 logger = Logger().get_logger('Monkey')
@@ -20,7 +25,7 @@ class ActorTimer(object):
             self,
             timer_id: int,
             weaker_manager: weakref.ReferenceType['ActorTimerManager'],
-            weak_actor: weakref.ReferenceType[Actor],
+            weak_actor: weakref.ReferenceType['Actor'],
             delay: int,
             interval: int,
             repetition: int,
@@ -64,8 +69,13 @@ class ActorTimer(object):
     def tick_cnt(self) -> int:
         return self.__tick_cnt
 
+    @property
+    def actor(self) -> 'None | Actor':
+        return self.__weak_actor()
+
     def cancel(self) -> None:
         self.__is_cancel = True
+        TimerScheduler().cancel(self)
 
     def tick(self) -> None:
         if self.__is_cancel:
@@ -78,9 +88,8 @@ class ActorTimer(object):
                 f'ActorTimer tick error, timer_id:{self.__timer_id}, error:{e}')
         finally:
             manager = self.__weaker_manager()
-            if not manager:
-                return
-            manager.__register_timer(self)
+            if manager:
+                manager.schedule_timer(self)
 
     def next_tick_time(self) -> int:
         if self.__repetition > 0 and self.__tick_cnt >= self.__repetition:
@@ -90,31 +99,97 @@ class ActorTimer(object):
             return self.__interval
         return self.__delay
 
-    def run(self):
-        actor = self.__weak_actor()
-        if actor and actor.context:
-            asyncio.create_task(actor.context.push_message(self))
-        else:
-            manager = self.__weaker_manager()
-            if manager:
-                manager.unregister_timer(self.__timer_id)
+    def expire(self) -> None:
+        """到期时actor已经销毁, 从所属的manager中移除"""
+        manager = self.__weaker_manager()
+        if manager:
+            manager.unregister_timer(self.__timer_id)
+
+
+class ActorTimerBatch(object):
+    """同一个actor在同一轮到期的定时器合并成一条邮箱消息"""
+
+    def __init__(self, timers: list[ActorTimer]) -> None:
+        self.__timers = timers
+
+    @property
+    def timers(self) -> list[ActorTimer]:
+        return self.__timers
+
+    def tick(self) -> None:
+        for timer in self.__timers:
+            timer.tick()
+
+
+class TimerScheduler(Singleton):
+    """进程内所有ActorTimer共用一个时间轮和一个驱动协程, 取消为O(1)
+    没有定时器时驱动协程退出, 下次注册时再启动"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__tick = monkey_config.get_config().actor_timer_tick
+        self.__wheel: None | TimingWheel[ActorTimer] = None
+        self.__driver: None | asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self.__wheel) if self.__wheel is not None else 0
+
+    def schedule(self, timer: ActorTimer, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self.__wheel is None:
+            self.__wheel = TimingWheel(tick=self.__tick, now=loop.time())
+        elif not self.__wheel:
+            # 空闲期间时间轮没有推进, 先直接跳到当前时间, 避免下一次advance逐格追赶
+            self.__wheel.advance(loop.time())
+        self.__wheel.add(timer, loop.time() + delay)
+        if self.__driver is None or self.__driver.done():
+            self.__driver = loop.create_task(self.__drive())
+
+    def cancel(self, timer: ActorTimer) -> None:
+        if self.__wheel is not None:
+            self.__wheel.remove(timer)
+
+    async def __drive(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.__wheel:
+            await asyncio.sleep(self.__tick)
+            try:
+                await self.__dispatch(self.__wheel.advance(loop.time()))
+            except Exception as e:
+                logger.exception(f'TimerScheduler drive error:{e}')
+
+    @classmethod
+    async def __dispatch(cls, timers: list[ActorTimer]) -> None:
+        batches: dict[int, tuple['Actor', list[ActorTimer]]] = {}
+        for timer in timers:
+            actor = timer.actor
+            if actor is None or not actor.context:
+                timer.expire()
+                continue
+            batch = batches.get(id(actor), None)
+            if batch is None:
+                batches[id(actor)] = (actor, [timer])
+            else:
+                batch[1].append(timer)
+        for actor, actor_timers in batches.values():
+            message = actor_timers[0] if len(
+                actor_timers) == 1 else ActorTimerBatch(actor_timers)
+            await actor.context.push_message(message)
 
 
 class ActorTimerManager(object):
 
-    def __init__(self, weak_actor: weakref.ReferenceType[Actor]) -> None:
+    def __init__(self, weak_actor: weakref.ReferenceType['Actor']) -> None:
         self.__seq_id = SequenceId()
         self.__weak_actor = weak_actor
         self.__timers: dict[int, ActorTimer] = {}
 
-    @classmethod
-    async def __run_timer(cls, sleep: int, timer: ActorTimer) -> None:
-        if sleep > 0:
-            await asyncio.sleep(sleep)
-        timer.run()
-
-    def __register_timer(self, timer: ActorTimer) -> None:
-        asyncio.create_task(self.__run_timer(timer.next_tick_time(), timer))
+    def schedule_timer(self, timer: ActorTimer) -> None:
+        delay = timer.next_tick_time()
+        if timer.is_cancel:
+            self.__timers.pop(timer.timer_id, None)
+            return
+        TimerScheduler().schedule(timer, delay)
 
     def register_timer(
             self,
@@ -137,7 +212,7 @@ class ActorTimerManager(object):
             *args,
             **kwargs)
         self.__timers[timer.timer_id] = timer
-        self.__register_timer(timer)
+        self.schedule_timer(timer)
         return timer
 
     def unregister_timer(self, timer_id: int) -> None:
@@ -146,5 +221,5 @@ class ActorTimerManager(object):
             timer.cancel()
 
     def unregister_all_timer(self) -> None:
-        for timer_id in self.__timers.keys():
+        for timer_id in list(self.__timers.keys()):
             self.unregister_timer(timer_id)
@@ -67,7 +67,7 @@ class __RpcMethodObject(object):
             server_id=position.server_id)
         if not self.__check_position:
             req.server_id = ''
-        raw_rags = utils.pickle_dump((args, kwargs))
+        raw_rags = utils.pickle_dump((args, kwargs), compress=False)
         await session.send(RpcMessage.from_msg(req, raw_rags))
         return req.request_id
 
@@ -0,0 +1,61 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+"""JsonMessage生成的to_dict/from_dict与反射实现的对比: python -m benchmarks.bench_json_message"""
+
+import timeit
+import inspect
+from utils import utils
+from message.base import JsonMessage
+from message.rpc_message import RpcRequest, RpcResponse
+
+
+def reflect_from_dict(cls: type[JsonMessage], kwargs: dict) -> JsonMessage:
+    try:
+        return cls(**kwargs)
+    except Exception:
+        parameters = inspect.signature(cls).parameters
+        return cls(**{k: kwargs[k] for k in parameters if k in kwargs})
+
+
+def bench(name: str, fn, number: int) -> float:
+    cost = min(timeit.repeat(fn, number=number, repeat=5))
+    print(f'{name:<40} {cost / number * 1e9:>10.1f} ns/op')
+    return cost
+
+
+def main(number: int = 100000) -> None:
+    request = RpcRequest(
+        msg_id=10001,
+        server_name='Monkey',
+        method_name='test',
+        actor_id='123',
+        reentrant_id=1,
+        request_id=1001,
+        server_id='1001')
+    response = RpcResponse(request_id=1001, error_str='ok')
+    request_dict = request.to_dict()
+    extra_dict = dict(request_dict, unknown_key=1)
+
+    for msg, data in ((request, request_dict), (response, response.to_dict())):
+        cls = msg.__class__
+        print(f'--- {cls.__qualname__}')
+        old = bench('utils.to_dict', lambda: utils.to_dict(msg), number)
+        new = bench('generated to_dict', msg.to_dict, number)
+        print(f'{"speedup":<40} {old / new:>10.2f} x')
+        old = bench('reflect from_dict', lambda: reflect_from_dict(cls, data), number)
+        new = bench('generated from_dict', lambda: cls.from_dict(data), number)
+        print(f'{"speedup":<40} {old / new:>10.2f} x')
+
+    print('--- RpcRequest with unknown key')
+    old = bench('reflect from_dict', lambda: reflect_from_dict(
+        RpcRequest, extra_dict), number // 10)
+    new = bench('generated from_dict', lambda: RpcRequest.from_dict(
+        extra_dict), number // 10)
+    print(f'{"speedup":<40} {old / new:>10.2f} x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+"""DictLRU与LRUCache的读写吞吐对比, 访问分布为zipf近似: python -m benchmarks.bench_lru"""
+
+import time
+import random
+from utils.lru import DictLRU, LRUCache
+
+
+CAPACITY = 4096
+KEYS = 16384
+OPS = 500000
+
+
+def workload() -> list[int]:
+    rng = random.Random(7)
+    weights = [1 / (i + 1) for i in range(KEYS)]
+    return rng.choices(range(KEYS), weights=weights, k=OPS)
+
+
+def bench(name: str, cache, keys: list[int]) -> None:
+    get, put = cache.get, cache.put
+    hits = 0
+    begin = time.perf_counter()
+    for key in keys:
+        if get(key) is None:
+            put(key, key)
+        else:
+            hits += 1
+    cost = time.perf_counter() - begin
+    print(f'{name:<12} {OPS / cost / 1e6:6.2f} Mops/s  {cost / OPS * 1e9:6.0f} ns/op  hit_rate:{hits / OPS:.3f}')
+
+
+def main() -> None:
+    keys = workload()
+    bench('DictLRU', DictLRU(CAPACITY), keys)
+    bench('LRUCache', LRUCache(max_size=CAPACITY), keys)
+    bench('LRUCache+ttl', LRUCache(max_size=CAPACITY, ttl=60), keys)
+
+
+if __name__ == '__main__':
+    main()
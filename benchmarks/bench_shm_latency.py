@@ -0,0 +1,95 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+"""共享内存环与TCP回环的RPC往返延迟对比, 服务端在独立进程中: python -m benchmarks.bench_shm_latency"""
+
+import os
+import time
+import asyncio
+import tempfile
+import multiprocessing
+from typing import Type
+from network.codec_rpc import CodecRpc
+from message.rpc_message import RpcMessage
+from network.event_handler import EventHandler
+from network.socket_session import SocketSession
+from network.shm_session import ShmSocketSession
+from network.tcp_session import TcpSocketSession
+from message.message import RequestHeartBeat, ResponseHeartBeat
+
+
+PORT = 19527
+waiters: list[asyncio.Future] = []
+
+
+def serve(path: str, ready) -> None:
+    from network.tcp_server import TcpServer
+
+    async def on_request(session: SocketSession, _: Type, msg: object) -> None:
+        assert isinstance(msg, RpcMessage)
+        await session.send(RpcMessage.from_msg(ResponseHeartBeat(now_sec=msg.meta.now_sec), msg.body))
+
+    EventHandler.register_hander(RequestHeartBeat, on_request)
+    server = TcpServer()
+    server.create_task(server.listen('127.0.0.1', PORT, CodecRpc, buffered=True))
+    server.create_task(server.listen_shm(path, CodecRpc))
+    asyncio.get_event_loop().call_later(0.3, ready.set)
+    server.run()
+
+
+async def ping_pong(session: SocketSession, rounds: int, body: bytes) -> list[float]:
+    latencies: list[float] = []
+    for i in range(rounds):
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        begin = time.perf_counter()
+        await session.send(RpcMessage.from_msg(RequestHeartBeat(now_sec=i), body))
+        await future
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+
+async def on_response(session: SocketSession, _: Type, msg: object) -> None:
+    future = waiters.pop(0)
+    future.set_result(msg)
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies.sort()
+    count = len(latencies)
+    print(f'{name:<24} p50 {latencies[count // 2] * 1e6:>8.1f} us  '
+          f'p99 {latencies[int(count * 0.99)] * 1e6:>8.1f} us  '
+          f'avg {sum(latencies) / count * 1e6:>8.1f} us')
+
+
+async def run(path: str, rounds: int) -> None:
+    EventHandler.register_hander(ResponseHeartBeat, on_response)
+    tcp = await TcpSocketSession.connect('127.0.0.1', PORT, CodecRpc, buffered=True)
+    shm = await ShmSocketSession.connect_shm(path, CodecRpc)
+    assert tcp is not None and shm is not None
+    for size in (16, 1024):
+        body = b'x' * size
+        for name, session in (('tcp', tcp), ('shm', shm)):
+            await ping_pong(session, rounds // 10, body)
+            report(f'{name} body:{size}', await ping_pong(session, rounds, body))
+    tcp.close()
+    shm.close()
+
+
+def main(rounds: int = 5000) -> None:
+    path = os.path.join(tempfile.gettempdir(), f'monkey_bench_{os.getpid()}.sock')
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=serve, args=(path, ready), daemon=True)
+    process.start()
+    try:
+        ready.wait(5)
+        asyncio.run(run(path, rounds))
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,7 @@ from utils import monkey_config
 from logger.logger import Logger
 from utils.monkey_time import MonkeyTime
 from membership.membership import Membership
-from membership.server_node import ServerNode
+from membership.server_node import SHM_PATH_META, UNIX_PATH_META, ServerNode
 from network.socket_session import SocketSession
 from pydantic import BaseModel, PrivateAttr, Field
 from membership.membership_manager import MembershipManager
@@ -77,6 +77,7 @@ class ConsulServerNode(ServerNode):
 
     _session: None | weakref.ReferenceType[SocketSession] = PrivateAttr(None)
     _session_id: int = PrivateAttr(0)
+    _weight: int = PrivateAttr(0)
 
     @property
     def server_id(self) -> str:
@@ -103,29 +104,53 @@ class ConsulServerNode(ServerNode):
     def port(self) -> int:
         return self.server.port
 
+    @property
+    def unix_path(self) -> str:
+        return self.server.meta.get(UNIX_PATH_META, '')
+
+    @property
+    def shm_path(self) -> str:
+        return self.server.meta.get(SHM_PATH_META, '')
+
     @property
     def weight(self) -> int:
-        return 0
+        """节点通过心跳上报的负载"""
+        return self._weight
+
+    @weight.setter
+    def weight(self, weight: int) -> None:
+        self._weight = weight
 
     @property
-    def is_available(self) -> bool:
-        if self.session is None:
-            return False
+    def is_healthy(self) -> bool:
         for node_check in self.checks:
             if node_check.check_id == self.server.server_id and \
                     node_check.status == 'passing':
                 return True
         return False
 
+    @property
+    def is_available(self) -> bool:
+        return self.session is not None and self.is_healthy
+
     def is_support(self, mate: str) -> bool:
         return mate in self.server.meta
 
+    def refresh(self, node: ServerNode) -> None:
+        if isinstance(node, ConsulServerNode):
+            self.checks = node.checks
+
 
 class ConsulPlacement(Membership):
 
     def __init__(self) -> None:
         super().__init__()
         self.__consul_index = -1
+        self.__server_id = ''
+
+    @property
+    def server_id(self) -> str:
+        return self.__server_id
 
     async def register_server(self, namespace: str, name: str, address: str, port: int, tags: list[str], meta: dict[str, str]) -> bool:
         for _ in range(monkey_config.get_config().consul_try_times):
@@ -136,9 +161,10 @@ class ConsulPlacement(Membership):
                     f'{monkey_config.get_config().consul_address}'
                     f'/v1/agent/service/register'
                 )
+                server_id = f'{namespace}-{name}-{address}-{port}-{MonkeyTime.timestamp_sec()}'
                 async with aiohttp.ClientSession() as session:
                     payload = {
-                        'ID': f'{namespace}-{name}-{address}-{port}-{MonkeyTime.timestamp_sec()}',
+                        'ID': server_id,
                         'Name': name,
                         'Address': address,
                         'Port': port,
@@ -168,6 +194,7 @@ class ConsulPlacement(Membership):
                                 f'ConsulPlacement register_server error {namespace}-{name}-{address}-{port} register_url:{register_url} response:{response}')
                             await asyncio.sleep(3)
                             continue
+                        self.__server_id = server_id
                         logger.info(
                             f'ConsulPlacement register_server success {namespace}-{name}-{address}-{port} register_url:{register_url}')
             except Exception as e:
@@ -194,6 +221,8 @@ class ConsulPlacement(Membership):
                                 f'ConsulPlacement unregister_server server error unregister_url:{unregister_url} response:{data}')
                             await asyncio.sleep(3)
                             continue
+                        if server_id == self.__server_id:
+                            self.__server_id = ''
                         logger.info(
                             f'ConsulPlacement unregister_server server success unregister_url:{unregister_url} response:{data}')
             except Exception as e:
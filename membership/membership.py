@@ -9,6 +9,12 @@ from abc import ABC, abstractmethod
 
 class Membership(ABC):
 
+    @property
+    @abstractmethod
+    def server_id(self) -> str:
+        """本节点注册成功后的server_id, 未注册时为空"""
+        pass
+
     @abstractmethod
     async def register_server(self, namespace: str, name: str, address: str, port: int, tags: list[str], meta: dict[str, str]) -> bool:
         pass
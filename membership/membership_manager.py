@@ -5,13 +5,17 @@ __author__ = '虎小黑'
 
 
 import random
+from utils import monkey_config
 from logger.logger import Logger
-from typing import Callable, Type
+from typing import TYPE_CHECKING, Callable, Type
 from utils.singleton import Singleton
 from utils.monkey_type import ActorType
-from membership.placement import Placement
 from membership.membership import Membership
 from membership.server_node import ServerNode
+from network.worker_supervisor import worker_index
+
+if TYPE_CHECKING:
+    from membership.placement import Placement
 
 
 logger = Logger().get_logger('Monkey')
@@ -24,8 +28,11 @@ class MembershipManager(Singleton):
         self.__servers: dict[str, ServerNode] = {}
         self.__add_callback: None | Callable[[ServerNode], None] = None
         self.__remove_callback: None | Callable[[ServerNode], None] = None
+        self.__update_callback: None | Callable[[ServerNode], None] = None
         self.__membership: None | Membership = None
-        self.__placement: None | Placement = None
+        self.__placement: 'None | Placement' = None
+        # 按actor类型缓存支持它的节点, 只在成员变化时失效
+        self.__eligible: dict[str, list[ServerNode]] = {}
 
     def set_add_callback(self, callback: Callable[[ServerNode], None]) -> None:
         self.__add_callback = callback
@@ -33,17 +40,32 @@ class MembershipManager(Singleton):
     def set_remove_callback(self, callback: Callable[[ServerNode], None]) -> None:
         self.__remove_callback = callback
 
+    def set_update_callback(self, callback: Callable[[ServerNode], None]) -> None:
+        self.__update_callback = callback
+
     def set_membership(self, membership: Membership) -> None:
         self.__membership = membership
 
-    def set_placement(self, placement: Placement) -> None:
+    def set_placement(self, placement: 'Placement') -> None:
         self.__placement = placement
 
     async def register_server(self, namespace: str, name: str, address: str, port: int, tags: list[str], meta: dict[str, str]) -> bool:
         if self.__membership is None:
             return False
+        if worker_index() >= 0:
+            # 同一台机器上的每个worker都是独立的ServerNode
+            meta = {**meta, 'monkey_worker': str(worker_index())}
         return await self.__membership.register_server(namespace, name, address, port, tags, meta)
 
+    @property
+    def server_id(self) -> str:
+        return self.__membership.server_id if self.__membership is not None else ''
+
+    def update_member_load(self, server_id: str, load: int) -> None:
+        member = self.__servers.get(server_id, None)
+        if member is not None:
+            member.weight = load
+
     async def unregister_server(self, server_id: str) -> bool:
         if self.__membership is None:
             return False
@@ -63,17 +85,50 @@ class MembershipManager(Singleton):
             return False
         return await self.__placement.actor_keep_alive(actor_type, actor_id, sec)
 
+    def keep_alive_delay(self) -> int:
+        if self.__placement is None:
+            return monkey_config.get_config().actor_keep_alive_time // 2
+        return self.__placement.keep_alive_delay()
+
+    def eligible_members(self, mate: str) -> list[ServerNode]:
+        """支持mate的节点, 不检查是否可用"""
+        members = self.__eligible.get(mate, None)
+        if members is None:
+            members = [server for server in self.__servers.values()
+                       if server.is_support(mate)]
+            self.__eligible[mate] = members
+        return members
+
+    async def actors_keep_alive(self, actors: list[tuple[str, str]], sec: int) -> list[bool]:
+        if self.__placement is None:
+            return [False] * len(actors)
+        return await self.__placement.actors_keep_alive(actors, sec)
+
+    async def release_positions(self, actors: list[tuple[str, str]]) -> None:
+        if self.__placement is not None:
+            await self.__placement.release_positions(actors)
+
     def choose_member(self, mate: str) -> ServerNode | None:
-        servers: list[ServerNode] = []
-        for server in self.__servers.values():
-            if not server.is_available:
-                continue
-            if not server.is_support(mate):
-                continue
-            servers.append(server)
-        if len(servers) == 0:
+        """power of two choices: 随机取两个可用节点, 选上报负载较低的一个"""
+        members = self.eligible_members(mate)
+        count = len(members)
+        if count == 0:
+            return None
+        first = random.randrange(count)
+        indexes = [first]
+        if count > 1:
+            second = random.randrange(count - 1)
+            indexes.append(second + 1 if second >= first else second)
+        candidates = [members[index] for index in indexes
+                      if members[index].is_available]
+        if not candidates:
+            # 抽到的节点都不可用时退回扫描
+            candidates = [member for member in members if member.is_available]
+            if len(candidates) > 2:
+                candidates = random.sample(candidates, 2)
+        if not candidates:
             return None
-        return random.choice(servers)
+        return min(candidates, key=lambda member: member.weight)
 
     def get_member(self, server_id: str) -> None | ServerNode:
         return self.__servers.get(server_id, None)
@@ -85,6 +140,7 @@ class MembershipManager(Singleton):
         if member.server_id not in self.__servers:
             logger.info(f'MembershipManager add member {member.server_id}')
             self.__servers[member.server_id] = member
+            self.__eligible.clear()
             if self.__add_callback is not None:
                 self.__add_callback(member)
 
@@ -92,6 +148,7 @@ class MembershipManager(Singleton):
         if server_id in self.__servers:
             logger.info(f'MembershipManager remove member {server_id}')
             server_node = self.__servers.pop(server_id, None)
+            self.__eligible.clear()
             if self.__remove_callback is not None and server_node is not None:
                 self.__remove_callback(server_node)
 
@@ -102,4 +159,10 @@ class MembershipManager(Singleton):
         for server_id in delete_server_ids:
             self.remove_member(server_id)
         for m in members:
-            self.add_member(m)
+            member = self.__servers.get(m.server_id, None)
+            if member is None:
+                self.add_member(m)
+            elif member is not m:
+                member.refresh(m)
+                if self.__update_callback is not None:
+                    self.__update_callback(member)
@@ -5,6 +5,7 @@ __author__ = '虎小黑'
 
 
 from typing import Type
+from utils import monkey_config
 from abc import abstractmethod
 from utils.monkey_type import ActorType
 from membership.server_node import ServerNode
@@ -17,6 +18,7 @@ class Placement():
         super().__init__()
         MembershipManager().set_add_callback(self.on_add_server)
         MembershipManager().set_remove_callback(self.on_remove_server)
+        MembershipManager().set_update_callback(self.on_update_server)
 
     @abstractmethod
     def on_add_server(self, node: ServerNode):
@@ -26,6 +28,10 @@ class Placement():
     def on_remove_server(self, node: ServerNode):
         pass
 
+    def on_update_server(self, node: ServerNode):
+        """已有节点在membership中的状态刷新"""
+        pass
+
     @abstractmethod
     def find_position_in_cache(self, actor_type: str, actor_id: str) -> ServerNode | None:
         pass
@@ -40,3 +46,15 @@ class Placement():
     @abstractmethod
     async def actor_keep_alive(self, actor_type: str, actor_id: str, sec: int) -> bool:
         pass
+
+    async def actors_keep_alive(self, actors: list[tuple[str, str]], sec: int) -> list[bool]:
+        """批量续期(actor_type, actor_id), 返回每个actor是否仍归属本节点"""
+        return [await self.actor_keep_alive(actor_type, actor_id, sec) for actor_type, actor_id in actors]
+
+    def keep_alive_delay(self) -> int:
+        """新激活的actor第一次续期前等待的秒数, find_position已经登记过位置, 过期时间过半时再续期"""
+        return monkey_config.get_config().actor_keep_alive_time // 2
+
+    async def release_positions(self, actors: list[tuple[str, str]]) -> None:
+        """本节点销毁(actor_type, actor_id)后释放它们的位置"""
+        pass
@@ -0,0 +1,104 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+from dataclasses import dataclass
+from utils.lru import LRUCache
+from utils.timing_wheel import TimingWheel
+
+
+@dataclass(slots=True)
+class PlacementEntry:
+    key: str
+    server_id: str
+    expire_time: int
+
+
+class PlacementCache(object):
+    """actor位置的本地缓存, 由LRUCache按LRU淘汰
+    server_id到key的二级索引使节点下线时只处理受影响的key, 过期由时间轮在expire中批量清理, 读取时不检查"""
+
+    def __init__(self, capacity: int, now: int = 0) -> None:
+        self.__capacity = 1 if capacity <= 0 else capacity
+        self.__entries: LRUCache[str, PlacementEntry] = LRUCache(
+            max_size=self.__capacity, on_evict=self.__on_evict)
+        self.__servers: dict[str, set[str]] = {}
+        self.__wheel: TimingWheel[str] = TimingWheel(now=now)
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__entries
+
+    def stats(self) -> dict[str, int | float]:
+        return self.__entries.stats()
+
+    def get(self, key: str) -> None | PlacementEntry:
+        return self.__entries.get(key)
+
+    def put(self, key: str, server_id: str, expire_time: int) -> PlacementEntry:
+        entry = self.__entries.peek(key)
+        if entry is None:
+            entry = PlacementEntry(key, server_id, expire_time)
+        else:
+            if entry.server_id != server_id:
+                self.__unindex(entry)
+                entry.server_id = server_id
+            entry.expire_time = expire_time
+        self.__entries.put(key, entry)
+        self.__servers.setdefault(server_id, set()).add(key)
+        self.__wheel.add(key, expire_time)
+        return entry
+
+    def refresh(self, key: str, expire_time: int) -> bool:
+        entry = self.__entries.peek(key)
+        if entry is None:
+            return False
+        entry.expire_time = expire_time
+        self.__wheel.add(key, expire_time)
+        return True
+
+    def pop(self, key: str) -> None | PlacementEntry:
+        entry = self.__entries.pop(key)
+        if entry is None:
+            return None
+        self.__unindex(entry)
+        self.__wheel.remove(key)
+        return entry
+
+    def __on_evict(self, key: str, entry: PlacementEntry) -> None:
+        self.__unindex(entry)
+        self.__wheel.remove(key)
+
+    def __unindex(self, entry: PlacementEntry) -> None:
+        keys = self.__servers.get(entry.server_id, None)
+        if keys is not None:
+            keys.discard(entry.key)
+            if not keys:
+                del self.__servers[entry.server_id]
+
+    def remove_server(self, server_id: str) -> int:
+        """删除指向server_id的全部缓存, 返回删除的数量"""
+        keys = self.__servers.pop(server_id, None)
+        if not keys:
+            return 0
+        for key in keys:
+            self.__entries.pop(key)
+            self.__wheel.remove(key)
+        return len(keys)
+
+    def expire(self, now: int) -> int:
+        """清理到期的缓存, 返回清理的数量"""
+        keys = self.__wheel.advance(now)
+        for key in keys:
+            entry = self.__entries.pop(key)
+            if entry is not None:
+                self.__unindex(entry)
+        return len(keys)
@@ -4,48 +4,79 @@ __time__ = '2024/09/01'
 __author__ = '虎小黑'
 
 
+import os
 import time
 import asyncio
 from typing import Type
-from utils.lru import DictLRU
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 from utils import monkey_config
 from logger.logger import Logger
 from utils.singleton import Singleton
-from pydantic import BaseModel, Field
 from network.codec_rpc import CodecRpc
 from utils.monkey_type import ActorType
 from utils.monkey_time import MonkeyTime
 from utils.redis_script import RedisScript
 from membership.placement import Placement
-from message.message import RequestHeartBeat
+from membership.placement_cache import PlacementCache
+from utils.load_monitor import LoadMonitor
+from network.event_handler import EventHandler
+from network.socket_session import SocketSession
 from membership.server_node import ServerNode
+from message.message import RequestHeartBeat, ResponseHeartBeat
 from network.tcp_session import TcpSocketSession
+from network.shm_session import ShmSocketSession
+from network.unix_session import UnixSocketSession, is_local_address
 from membership.membership_manager import MembershipManager
 
 
 logger = Logger().get_logger('Monkey')
 
 
-class ActorPlacement(BaseModel):
-    actor_id: str = Field(alias='actor_id')
-    actor_type: str = Field(alias='actor_type')
-    server_id: str = Field(alias='server_id')
-    expire_time: int = Field(alias='expire_time')
-
-
 class RedisPlacement(Singleton, Placement):
 
+    NODE_LEASE_PREFIX = 'monkey:lease:'
+
     def __init__(self, uri: str) -> None:
         super().__init__()
-        self.__cache: DictLRU[str, ActorPlacement] = DictLRU(1024 * 2)
+        self.__cache = PlacementCache(
+            monkey_config.get_config().placement_cache_size, MonkeyTime.timestamp_sec())
         self.__redis_client = Redis.from_url(uri)
-        asyncio.create_task(self.__heart_beat_loop())
+        # 节点租约模式下actor key只带很长的兜底过期时间, 随心跳续期节点租约, Redis写入量基本与actor数量无关
+        self.__node_lease = monkey_config.get_config().placement_node_lease
+        # 脚本只注册一次, 之后都走EVALSHA
+        self.__find_positions_script = self.__redis_client.register_script(
+            RedisScript.find_actor_positions_lease_lua() if self.__node_lease else RedisScript.find_actor_positions_lua())
+        self.__keep_alive_script = self.__redis_client.register_script(
+            RedisScript.actor_keep_alive_lua())
+        self.__keep_alives_script = self.__redis_client.register_script(
+            RedisScript.actors_keep_alive_lease_lua() if self.__node_lease else RedisScript.actors_keep_alive_lua())
+        self.__claim_positions_script = self.__redis_client.register_script(
+            RedisScript.claim_actor_positions_lua())
+        self.__release_positions_script = self.__redis_client.register_script(
+            RedisScript.release_actor_positions_lua())
+        # 同一个actor的并发查询共用一个future, 同一轮事件循环中的查询合并成一次pipeline
+        self.__inflight: dict[str, asyncio.Future[str]] = {}
+        self.__batch: dict[str, str] = {}
+        self.__batch_handle: None | asyncio.Handle = None
+        self.__connecting: set[str] = set()
+        self.__closed = False
+        EventHandler.register_hander(RequestHeartBeat, self.__on_heart_beat)
+        EventHandler.register_hander(ResponseHeartBeat, self.__on_heart_beat_response)
+        EventHandler.register_batch_handler(RequestHeartBeat, self.__on_heart_beats)
+        EventHandler.register_batch_handler(ResponseHeartBeat, self.__on_heart_beat_responses)
+        self.__heart_beat_task = asyncio.create_task(self.__heart_beat_loop())
+        asyncio.create_task(LoadMonitor().sample_loop())
 
     @classmethod
     def placement_key(cls, actor_type: str, actor_id: str) -> str:
         return f'{actor_type}:{actor_id}'
 
+    @classmethod
+    def placement_ttl(cls) -> int:
+        """首次登记的过期时间与续期时间一致, ActorManager在过半时续期"""
+        return monkey_config.get_config().actor_keep_alive_time
+
     def on_add_server(self, node: ServerNode):
         logger.info(f'RedisPlacement on_add_server {node.server_id}')
         pass
@@ -54,19 +85,13 @@ class RedisPlacement(Singleton, Placement):
         logger.info(f'RedisPlacement on_remove_server {node.server_id}')
         if node.session:
             node.session.close()
-        for key in self.__cache.keys():
-            placement = self.__cache.get(key)
-            if placement is not None and placement.server_id == node.server_id:
-                self.__cache.pop(key)
+        self.__cache.remove_server(node.server_id)
 
     def find_position_in_cache(self, actor_type: str, actor_id: str) -> ServerNode | None:
         actor_placement = self.__cache.get(
             self.placement_key(actor_type, actor_id))
         if actor_placement is None:
             return None
-        if actor_placement.expire_time < MonkeyTime.timestamp_sec():
-            self.__cache.pop(self.placement_key(actor_type, actor_id))
-            return None
         return MembershipManager().get_member(actor_placement.server_id)
 
     async def find_position(self, actor_type: str, actor_id: str) -> ServerNode | None:
@@ -76,21 +101,110 @@ class RedisPlacement(Singleton, Placement):
         node = MembershipManager().choose_member(actor_type)
         if node is None:
             return None
-        async_script = self.__redis_client.register_script(
-            RedisScript.find_actor_position_lua())
-        server_id = await async_script(keys=[actor_type, actor_id], args=[node.server_id, 120])
-        if isinstance(server_id, bytes):
-            server_id = server_id.decode('utf-8')
+        return await self._claim_position(actor_type, actor_id, node)
+
+    async def _claim_position(self, actor_type: str, actor_id: str, node: ServerNode) -> ServerNode | None:
+        """以node为候选在Redis中登记actor位置, 已经登记过时返回已有的节点"""
+        key = self.placement_key(actor_type, actor_id)
+        future = self.__inflight.get(key, None)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.__inflight[key] = future
+            self.__batch[key] = node.server_id
+            if self.__batch_handle is None:
+                self.__batch_handle = loop.call_soon(self.__flush_batch)
+        server_id = await asyncio.shield(future)
         node = MembershipManager().get_member(server_id)
         if node is not None:
             self.__cache.put(
-                self.placement_key(actor_type, actor_id),
-                ActorPlacement(actor_id=actor_id,
-                               actor_type=actor_type,
-                               server_id=server_id,
-                               expire_time=MonkeyTime.timestamp_sec() + 120))
+                key, server_id, MonkeyTime.timestamp_sec() + self.placement_ttl())
         return node
 
+    def __flush_batch(self) -> None:
+        self.__batch_handle = None
+        batch = self.__batch
+        self.__batch = {}
+        if batch:
+            asyncio.create_task(self.__find_positions(batch))
+
+    async def __run_positions(self, script: AsyncScript, first_args: list[int | str], keys: list[str], server_ids: list[str]) -> list[str]:
+        # 按placement_batch_size分段执行脚本, 所有分段放在同一个pipeline中
+        batch_size = monkey_config.get_config().placement_batch_size
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for begin in range(0, len(keys), batch_size):
+            await script(keys=keys[begin: begin + batch_size],
+                         args=[*first_args, *server_ids[begin: begin + batch_size]], client=pipeline)
+        results: list[str] = []
+        for result in await pipeline.execute():
+            results.extend(server_id.decode('utf-8') if isinstance(
+                server_id, bytes) else server_id for server_id in result)
+        return results
+
+    async def __find_positions(self, batch: dict[str, str]) -> None:
+        keys = list(batch.keys())
+        try:
+            server_ids = await self.__run_positions(
+                self.__find_positions_script, self.__find_positions_args(), keys, [batch[key] for key in keys])
+            for key, server_id in zip(keys, server_ids):
+                future = self.__inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(server_id)
+        except Exception as e:
+            logger.error(
+                f'RedisPlacement __find_positions count:{len(keys)} error:{e}')
+            for key in keys:
+                future = self.__inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+        finally:
+            for key in keys:
+                future = self.__inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(RuntimeError(f'placement {key} not found'))
+
+    def __find_positions_args(self) -> list[int | str]:
+        if self.__node_lease:
+            return [self.NODE_LEASE_PREFIX, monkey_config.get_config().node_lease_key_ttl]
+        return [self.placement_ttl()]
+
+    async def _claim_positions(self, keys: list[str], server_id: str, sec: int) -> list[str]:
+        """以server_id为候选批量登记keys, 已经归属server_id的同时续期, 返回每个key当前归属的server_id"""
+        if not keys:
+            return []
+        if self.__node_lease:
+            # 租约模式下key的兜底过期时间由keep alive续期, 登记即可
+            server_ids = await self.__run_positions(
+                self.__find_positions_script, self.__find_positions_args(), keys, [server_id] * len(keys))
+        else:
+            server_ids = await self.__run_positions(
+                self.__claim_positions_script, [sec], keys, [server_id] * len(keys))
+        expire_time = MonkeyTime.timestamp_sec() + sec
+        for key, owner_id in zip(keys, server_ids):
+            if MembershipManager().get_member(owner_id) is not None:
+                self.__cache.put(key, owner_id, expire_time)
+            else:
+                self.__cache.pop(key)
+        return server_ids
+
+    async def _release_positions(self, keys: list[str], server_id: str) -> int:
+        """删除Redis中仍归属server_id的keys, 返回删除的数量"""
+        for key in keys:
+            self.__cache.pop(key)
+        if not keys:
+            return 0
+        return await self.__release_positions_script(keys=keys, args=[server_id] * len(keys))
+
+    async def release_positions(self, actors: list[tuple[str, str]]) -> None:
+        # 按placement_batch_size分段, 只删除仍归属本节点的key
+        server_id = MembershipManager().server_id
+        if not server_id:
+            return
+        keys = [self.placement_key(actor_type, actor_id) for actor_type, actor_id in actors]
+        batch_size = monkey_config.get_config().placement_batch_size
+        for begin in range(0, len(keys), batch_size):
+            await self._release_positions(keys[begin: begin + batch_size], server_id)
+
     def remove_position_from_cache(self, actor_type: str, actor_id: str) -> None:
         """理论上不应该主动清理Redis中的数据,Actor下线时按道理,Redis中的数据会自动过期"""
         self.__cache.pop(self.placement_key(actor_type, actor_id))
@@ -100,22 +214,89 @@ class RedisPlacement(Singleton, Placement):
             self.placement_key(actor_type, actor_id))
         if actor_placement is None:
             return False
-        async_script = self.__redis_client.register_script(
-            RedisScript.actor_keep_alive_lua())
-        result = await async_script(keys=[actor_type, actor_id], args=[actor_placement.server_id, sec])
+        if self.__node_lease:
+            return (await self.actors_keep_alive([(actor_type, actor_id)], sec))[0]
+        result = await self.__keep_alive_script(keys=[actor_type, actor_id], args=[actor_placement.server_id, sec])
         if isinstance(result, bytes):
             result = result.decode('utf-8')
         if result == 'success':
-            actor_placement.expire_time = MonkeyTime.timestamp_sec() + sec
+            self.__cache.refresh(actor_placement.key, MonkeyTime.timestamp_sec() + sec)
             return True
         self.remove_position_from_cache(actor_type, actor_id)
         return False
 
+    @classmethod
+    async def __on_heart_beat(cls, session: SocketSession, _: Type, msg: object) -> None:
+        assert isinstance(msg, RequestHeartBeat)
+        MembershipManager().update_member_load(msg.server_id, msg.load)
+        await session.send(ResponseHeartBeat(
+            now_sec=msg.now_sec, server_id=MembershipManager().server_id, load=LoadMonitor().load))
+
+    @classmethod
+    def __on_heart_beat_response(cls, session: SocketSession, _: Type, msg: object) -> None:
+        assert isinstance(msg, ResponseHeartBeat)
+        MembershipManager().update_member_load(msg.server_id, msg.load)
+
+    @classmethod
+    def __on_heart_beats(cls, session: SocketSession, clz: Type, msgs: list[object]) -> None:
+        # 同一个连接上积压的心跳只需要按最后一个更新负载并回复一次
+        msg = msgs[-1]
+        assert isinstance(msg, RequestHeartBeat)
+        MembershipManager().update_member_load(msg.server_id, msg.load)
+        session.send_nowait(ResponseHeartBeat(
+            now_sec=msg.now_sec, server_id=MembershipManager().server_id, load=LoadMonitor().load))
+
+    @classmethod
+    def __on_heart_beat_responses(cls, session: SocketSession, clz: Type, msgs: list[object]) -> None:
+        cls.__on_heart_beat_response(session, clz, msgs[-1])
+
+    async def actors_keep_alive(self, actors: list[tuple[str, str]], sec: int) -> list[bool]:
+        if not actors:
+            return []
+        own_server_id = MembershipManager().server_id
+        keys: list[str] = []
+        server_ids: list[str] = []
+        for actor_type, actor_id in actors:
+            key = self.placement_key(actor_type, actor_id)
+            actor_placement = self.__cache.get(key)
+            keys.append(key)
+            server_ids.append(
+                actor_placement.server_id if actor_placement is not None else own_server_id)
+        # 租约模式只检查归属, 兜底过期时间过半时才写Redis
+        expire = monkey_config.get_config().node_lease_key_ttl if self.__node_lease else sec
+        batch_size = monkey_config.get_config().placement_batch_size
+        pipeline = self.__redis_client.pipeline(transaction=False)
+        for begin in range(0, len(keys), batch_size):
+            await self.__keep_alives_script(
+                keys=keys[begin: begin + batch_size],
+                args=[expire, *server_ids[begin: begin + batch_size]], client=pipeline)
+        values: list = []
+        for chunk in await pipeline.execute():
+            values.extend(chunk)
+        results = [bool(value) for value in values]
+        expire_time = MonkeyTime.timestamp_sec() + sec
+        lost: list[str] = []
+        for key, result in zip(keys, results):
+            if not result:
+                lost.append(key)
+                continue
+            self.__cache.refresh(key, expire_time)
+        # 已经不归属本节点的actor统一从缓存中清理
+        for key in lost:
+            self.__cache.pop(key)
+        if lost:
+            logger.warning(
+                f'RedisPlacement actors_keep_alive count:{len(keys)} lost:{len(lost)}')
+        return results
+
     async def __try_send_heart_beat(self):
-        head_beat = RequestHeartBeat(now_sec=MonkeyTime.timestamp_sec())
+        # 心跳中带上本节点的负载, 对端据此更新ServerNode.weight
+        head_beat = RequestHeartBeat(now_sec=MonkeyTime.timestamp_sec(
+        ), server_id=MembershipManager().server_id, load=LoadMonitor().load)
         for node in MembershipManager().get_members():
             if node.session is None or node.session.is_closed:
-                asyncio.create_task(self.__try_connect(node))
+                if node.server_id not in self.__connecting:
+                    asyncio.create_task(self.__try_connect(node))
                 continue
             try:
                 await node.session.send(head_beat)
@@ -123,20 +304,53 @@ class RedisPlacement(Singleton, Placement):
                 logger.error(
                     f'RedisPlacement __try_send_heart_beat Send heart beat to {node.address}:{node.port} failed, error:{e}')
 
+    async def __refresh_node_lease(self) -> None:
+        server_id = MembershipManager().server_id
+        if server_id:
+            await self.__redis_client.set(
+                self.NODE_LEASE_PREFIX + server_id, 1, ex=monkey_config.get_config().node_lease_time)
+
+    def close(self) -> None:
+        """停止心跳和节点租约续期"""
+        self.__closed = True
+        self.__heart_beat_task.cancel()
+
     async def __heart_beat_loop(self):
-        while True:
+        while not self.__closed:
+            try:
+                self.__cache.expire(MonkeyTime.timestamp_sec())
+                if self.__node_lease:
+                    # 节点租约随心跳续期
+                    await self.__refresh_node_lease()
+            except Exception as e:
+                logger.error(
+                    f'RedisPlacement __heart_beat_loop refresh lease error:{e}')
+            await asyncio.sleep(monkey_config.get_config().load_report_interval)
             try:
-                await asyncio.sleep(monkey_config.get_config().tcp_ttl // 3)
                 await self.__try_send_heart_beat()
             except Exception as e:
                 logger.error(
                     f'RedisPlacement __heart_beat_loop heart beat error:{e}')
 
-    @classmethod
-    async def __try_connect(cls, node: ServerNode):
+    async def __try_connect(self, node: ServerNode):
         begin = time.time()
+        self.__connecting.add(node.server_id)
         try:
-            session = await TcpSocketSession.connect(node.address, node.port, CodecRpc)
+            session = None
+            if is_local_address(node.address):
+                shm_path, unix_path = node.shm_path, node.unix_path
+                if shm_path and os.path.exists(shm_path):
+                    session = await ShmSocketSession.connect_shm(shm_path, CodecRpc)
+                    if session is not None:
+                        logger.info(
+                            f'RedisPlacement __try_connect Connect to {node.address}:{node.port} by shm:{shm_path}')
+                if session is None and unix_path and os.path.exists(unix_path):
+                    session = await UnixSocketSession.connect_unix(unix_path, CodecRpc)
+                    if session is not None:
+                        logger.info(
+                            f'RedisPlacement __try_connect Connect to {node.address}:{node.port} by unix:{unix_path}')
+            if session is None:
+                session = await TcpSocketSession.connect(node.address, node.port, CodecRpc)
             if session is not None:
                 node.session = session
                 logger.info(
@@ -145,6 +359,8 @@ class RedisPlacement(Singleton, Placement):
             end = time.time()
             logger.error(
                 f'RedisPlacement __try_connect Connect to {node.address}:{node.port} failed, cost {end - begin}s, error: {e}')
+        finally:
+            self.__connecting.discard(node.server_id)
 
     async def check_health(self) -> bool:
         suc: bool = await self.__redis_client.ping()
@@ -0,0 +1,125 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import time
+import hashlib
+from utils import monkey_config
+from logger.logger import Logger
+from membership.server_node import ServerNode
+from membership.redis_placement import RedisPlacement
+from membership.membership_manager import MembershipManager
+
+
+logger = Logger().get_logger('Monkey')
+
+
+class RendezvousPlacement(RedisPlacement):
+    """rendezvous(HRW)哈希放置: actor归属于 hash(server_id, actor_type:actor_id) 最大的健康节点
+    成员稳定时直接返回HRW结果, 不访问Redis; 归属节点激活actor后在第一轮续期中把位置登记到Redis;
+    健康节点集合变化后的过渡期内先在Redis中登记再返回, 冲突时以Redis为准, 续期时不再归属本节点的actor释放Redis中的位置
+    过渡期至少覆盖一轮续期, 保证旧节点在过渡期结束前交出归属发生变化的actor"""
+
+    def __init__(self, uri: str) -> None:
+        super().__init__(uri)
+        self.__transition_until = 0.0
+        self.__hashers: dict[str, 'hashlib._Hash'] = {}
+        self.__healthy: dict[str, bool] = {}
+
+    @property
+    def in_transition(self) -> bool:
+        return time.monotonic() < self.__transition_until
+
+    def __begin_transition(self) -> None:
+        config = monkey_config.get_config()
+        self.__hashers.clear()
+        self.__transition_until = time.monotonic() + max(
+            config.rendezvous_transition_time,
+            config.actor_keep_alive_time // 2 + config.actor_keep_alive_interval)
+
+    def on_add_server(self, node: ServerNode):
+        super().on_add_server(node)
+        self.__healthy[node.server_id] = node.is_healthy
+        self.__begin_transition()
+
+    def on_remove_server(self, node: ServerNode):
+        super().on_remove_server(node)
+        self.__healthy.pop(node.server_id, None)
+        self.__begin_transition()
+
+    def on_update_server(self, node: ServerNode):
+        healthy = node.is_healthy
+        if self.__healthy.get(node.server_id, None) != healthy:
+            # 健康状态变化等同于成员变化
+            self.__healthy[node.server_id] = healthy
+            self.__begin_transition()
+
+    def __score(self, server_id: str, key: bytes) -> int:
+        hasher = self.__hashers.get(server_id, None)
+        if hasher is None:
+            hasher = hashlib.blake2b(server_id.encode(), digest_size=8)
+            self.__hashers[server_id] = hasher
+        hasher = hasher.copy()
+        hasher.update(key)
+        return int.from_bytes(hasher.digest(), 'little')
+
+    def owner(self, actor_type: str, actor_id: str) -> ServerNode | None:
+        """当前成员视图下actor的归属节点, 只看membership中的健康状态, 不看本地会话"""
+        key = f'\0{actor_type}:{actor_id}'.encode()
+        owner: ServerNode | None = None
+        best = -1
+        for node in MembershipManager().eligible_members(actor_type):
+            if not node.is_healthy:
+                continue
+            score = self.__score(node.server_id, key)
+            if score > best:
+                owner, best = node, score
+        return owner
+
+    def find_position_in_cache(self, actor_type: str, actor_id: str) -> ServerNode | None:
+        node = super().find_position_in_cache(actor_type, actor_id)
+        if node is not None or self.in_transition:
+            return node
+        return self.owner(actor_type, actor_id)
+
+    async def find_position(self, actor_type: str, actor_id: str) -> ServerNode | None:
+        node = super().find_position_in_cache(actor_type, actor_id)
+        if node is not None and node.session is not None:
+            return node
+        node = self.owner(actor_type, actor_id)
+        if node is None:
+            return None
+        if self.in_transition:
+            return await self._claim_position(actor_type, actor_id, node)
+        return node
+
+    def keep_alive_delay(self) -> int:
+        # 稳定期的find_position不写Redis, 新激活的actor在下一轮续期中登记
+        return 0
+
+    async def actor_keep_alive(self, actor_type: str, actor_id: str, sec: int) -> bool:
+        return (await self.actors_keep_alive([(actor_type, actor_id)], sec))[0]
+
+    async def actors_keep_alive(self, actors: list[tuple[str, str]], sec: int) -> list[bool]:
+        if not actors:
+            return []
+        server_id = MembershipManager().server_id
+        claims: list[str] = []
+        releases: list[str] = []
+        for actor_type, actor_id in actors:
+            key = self.placement_key(actor_type, actor_id)
+            owner = self.owner(actor_type, actor_id)
+            if owner is not None and owner.server_id != server_id:
+                releases.append(key)
+            else:
+                claims.append(key)
+        owners = dict(zip(claims, await self._claim_positions(claims, server_id, sec)))
+        if releases:
+            # 归属已经转移的actor交出Redis中的位置, 新的归属节点才能登记
+            await self._release_positions(releases, server_id)
+            logger.info(
+                f'RendezvousPlacement actors_keep_alive count:{len(actors)} released:{len(releases)}')
+        return [owners.get(self.placement_key(actor_type, actor_id), None) == server_id
+                for actor_type, actor_id in actors]
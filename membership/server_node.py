@@ -9,6 +9,11 @@ from abc import ABC, abstractmethod
 from network.socket_session import SocketSession
 
 
+# 注册到membership的meta中记录unix socket路径, 同一台机器上的节点优先使用
+UNIX_PATH_META = 'monkey_unix_path'
+SHM_PATH_META = 'monkey_shm_path'
+
+
 class ServerNode(ABC, BaseModel):
 
     @property
@@ -41,11 +46,32 @@ class ServerNode(ABC, BaseModel):
     def port(self) -> int:
         pass
 
+    @property
+    @abstractmethod
+    def unix_path(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def shm_path(self) -> str:
+        pass
+
     @property
     @abstractmethod
     def weight(self) -> int:
         pass
 
+    @weight.setter
+    @abstractmethod
+    def weight(self, weight: int) -> None:
+        pass
+
+    @property
+    @abstractmethod
+    def is_healthy(self) -> bool:
+        """membership中的健康状态, 与本地会话无关, 各节点看到的结果一致"""
+        pass
+
     @property
     @abstractmethod
     def is_available(self) -> bool:
@@ -54,3 +80,8 @@ class ServerNode(ABC, BaseModel):
     @abstractmethod
     def is_support(self, mate: str) -> bool:
         pass
+
+    @abstractmethod
+    def refresh(self, node: 'ServerNode') -> None:
+        """用重新拉取到的同一节点更新健康状态, 保留已有会话"""
+        pass
@@ -0,0 +1,78 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import asyncio
+from logger.logger import Logger
+from network.codec import Codec
+from network.tcp_server import TcpServer
+from typing import Awaitable, Callable, Type
+from membership.membership_manager import MembershipManager
+from network.worker_supervisor import worker_index, worker_port
+
+
+logger = Logger().get_logger('Monkey')
+
+
+class WorkerServer(object):
+    """WorkerSupervisor默认的worker_main
+    1. 通过reuse_port和其他worker共享对外端口port, 再监听各自的rpc端口worker_port(port)
+    2. 以worker_port(port)注册成独立的ServerNode
+    3. 收到SIGTERM时从membership注销再退出
+    setup在监听之前执行, 用于在worker进程中设置membership/placement等"""
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            codec_type: Type[Codec],
+            namespace: str,
+            name: str,
+            address: str,
+            tags: list[str] = [],
+            meta: dict[str, str] = {},
+            buffered: bool = False,
+            setup: None | Callable[[], Awaitable] = None) -> None:
+        self.__host = host
+        self.__port = port
+        self.__codec_type = codec_type
+        self.__namespace = namespace
+        self.__name = name
+        self.__address = address
+        self.__tags = tags
+        self.__meta = meta
+        self.__buffered = buffered
+        self.__setup = setup
+
+    async def start(self) -> bool:
+        if self.__setup is not None:
+            await self.__setup()
+        server = TcpServer()
+        rpc_port = worker_port(self.__port)
+        if not await server.listen(self.__host, self.__port, self.__codec_type, self.__buffered, reuse_port=True):
+            return False
+        if not await server.listen(self.__host, rpc_port, self.__codec_type, self.__buffered):
+            return False
+        if not await MembershipManager().register_server(
+                self.__namespace, self.__name, self.__address, rpc_port, self.__tags, self.__meta):
+            logger.error(
+                f'WorkerServer start register server failed index:{worker_index()} port:{rpc_port}')
+            return False
+        logger.info(
+            f'WorkerServer start index:{worker_index()} port:{rpc_port} server_id:{MembershipManager().server_id}')
+        return True
+
+    async def stop(self) -> None:
+        server_id = MembershipManager().server_id
+        if server_id:
+            await MembershipManager().unregister_server(server_id)
+
+    def __call__(self, index: int) -> None:
+        server = TcpServer()
+        server.set_shutdown_handler(self.stop)
+        # 监听或注册失败时退出进程, 由supervisor按重启间隔重新拉起
+        if not asyncio.get_event_loop().run_until_complete(self.start()):
+            raise RuntimeError(f'WorkerServer index:{index} start failed')
+        server.run()
@@ -4,8 +4,9 @@ __time__ = '2024/08/11'
 __author__ = '虎小黑'
 
 
-import inspect
-from utils import utils
+from message import dict_codec
+from message import binary_codec
+from typing import ClassVar
 from logger.logger import Logger
 from dataclasses import dataclass
 
@@ -14,11 +15,16 @@ logger = Logger().get_logger('Monkey')
 
 
 __json_models: dict[bytes, type['JsonMessage']] = {}
+__json_model_ids: dict[bytes, int] = {}
 
 
 def register_model(cls: type) -> None:
     global __json_models
-    __json_models[cls.__qualname__.encode()] = cls
+    global __json_model_ids
+    name = cls.__qualname__.encode()
+    __json_models[name] = cls
+    if name not in __json_model_ids:
+        __json_model_ids[name] = len(__json_model_ids) + 1
 
 
 def find_model(name: bytes) -> type['JsonMessage'] | None:
@@ -26,27 +32,55 @@ def find_model(name: bytes) -> type['JsonMessage'] | None:
     return __json_models.get(name, None)
 
 
+def find_model_id(name: bytes) -> int:
+    """进程内按注册顺序分配的紧凑id, 未注册返回0; 不同进程的id不同, 需要在连接上协商"""
+    global __json_model_ids
+    return __json_model_ids.get(name, 0)
+
+
+def get_model_ids() -> dict[bytes, int]:
+    global __json_model_ids
+    return dict(__json_model_ids)
+
+
 class JsonMeta(type):
 
     def __new__(cls, class_name, class_parents, class_attr):
         cls = type.__new__(cls, class_name, class_parents, class_attr)
         register_model(cls)
+        if '__dataclass_fields__' in class_attr:
+            # dataclass(slots=True)会用最终的字段重新创建类, 此时生成编解码函数
+            cls._dict_codec = dict_codec.compile_codec(cls)
+            binary_codec.compile_codec(cls)
+        else:
+            # 非slots的dataclass在类创建之后才有字段, 第一次使用时再生成
+            cls._dict_codec = None
         return cls
 
 
 @dataclass(slots=True)
 class JsonMessage(metaclass=JsonMeta):
+    _dict_codec: ClassVar[None | tuple[dict_codec.ToDict, dict_codec.FromDict]] = None
     msg_id: int = 0
     name: str = ''
 
     @classmethod
     def from_dict(cls, kwargs: dict) -> 'JsonMessage':
-        try:
-            return cls(**kwargs)
-        except Exception as e:
-            logger.exception(f"JsonMessage from_dict error:{e}")
-            parameters = inspect.signature(cls).parameters
-            return cls(**{k: kwargs[k] for k in parameters if k in kwargs})
+        codec = cls._dict_codec
+        if codec is None:
+            codec = cls._dict_codec = dict_codec.get_codec(cls)
+        return codec[1](cls, kwargs)
 
     def to_dict(self) -> dict:
-        return utils.to_dict(self)
+        codec = self._dict_codec
+        if codec is None:
+            codec = self.__class__._dict_codec = dict_codec.get_codec(
+                self.__class__)
+        return codec[0](self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview, offset: int = 0) -> 'JsonMessage':
+        return binary_codec.get_codec(cls)[1](cls, data, offset)
+
+    def to_bytes(self) -> bytes:
+        return binary_codec.get_codec(self.__class__)[0](self)
@@ -0,0 +1,143 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import enum
+import struct
+import dataclasses
+from utils import utils
+from utils import mokey_json
+from typing import Any, Callable, get_type_hints
+from utils.varint import decode_varint, encode_varint
+
+
+# 按字段声明顺序依次写入, 只包含不以_开头的字段(与to_dict一致):
+# bool 1字节, int/IntEnum zigzag varint, float 8字节, str/bytes varint长度+数据, 其余类型 varint长度+json
+Encoder = Callable[[Any], bytes]
+Decoder = Callable[[type, bytes | bytearray | memoryview, int], Any]
+
+_codecs: dict[type, tuple[Encoder, Decoder]] = {}
+_double = struct.Struct('<d')
+
+
+def _write_bool(out: bytearray, value: bool) -> None:
+    out.append(1 if value else 0)
+
+
+def _read_bool(data: bytes | bytearray | memoryview, offset: int) -> tuple[bool, int]:
+    return data[offset] != 0, offset + 1
+
+
+def _write_int(out: bytearray, value: int) -> None:
+    out += encode_varint(value << 1 if value >= 0 else ((-value) << 1) - 1)
+
+
+def _read_int(data: bytes | bytearray | memoryview, offset: int) -> tuple[int, int]:
+    value, offset = decode_varint(data, offset)
+    return (value >> 1) ^ -(value & 1), offset
+
+
+def _write_float(out: bytearray, value: float) -> None:
+    out += _double.pack(value)
+
+
+def _read_float(data: bytes | bytearray | memoryview, offset: int) -> tuple[float, int]:
+    return _double.unpack_from(data, offset)[0], offset + 8
+
+
+def _write_bytes(out: bytearray, value: bytes) -> None:
+    out += encode_varint(len(value))
+    out += value
+
+
+def _read_bytes(data: bytes | bytearray | memoryview, offset: int) -> tuple[bytes, int]:
+    length, offset = decode_varint(data, offset)
+    return bytes(data[offset: offset + length]), offset + length
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    _write_bytes(out, value.encode())
+
+
+def _read_str(data: bytes | bytearray | memoryview, offset: int) -> tuple[str, int]:
+    length, offset = decode_varint(data, offset)
+    return str(data[offset: offset + length], 'utf-8'), offset + length
+
+
+def _write_json(out: bytearray, value: Any) -> None:
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    elif isinstance(value, (list, tuple, dict)) or hasattr(value, '__slots__'):
+        value = utils.to_dict(value)
+    array = mokey_json.json_dumps(value)
+    _write_bytes(out, array.encode() if isinstance(array, str) else array)
+
+
+def _read_json(data: bytes | bytearray | memoryview, offset: int) -> tuple[Any, int]:
+    length, offset = decode_varint(data, offset)
+    return mokey_json.json_loads(data[offset: offset + length]), offset + length
+
+
+def _field_kind(tp: Any) -> str:
+    if tp is bool:
+        return 'bool'
+    if isinstance(tp, type) and issubclass(tp, enum.IntEnum):
+        return 'enum'
+    if tp is int:
+        return 'int'
+    if tp is float:
+        return 'float'
+    if tp is str:
+        return 'str'
+    if tp is bytes:
+        return 'bytes'
+    return 'json'
+
+
+def compile_codec(cls: type) -> tuple[Encoder, Decoder]:
+    """根据dataclass字段注解生成专用的编码/解码函数"""
+    try:
+        hints = get_type_hints(cls)
+    except Exception:
+        hints = {}
+    arguments: list[str] = []
+    encode_lines = ['def encode(o):', '    out = bytearray()']
+    decode_lines = ['def decode(cls, data, offset):']
+    namespace: dict[str, Any] = {
+        '_write_bool': _write_bool, '_read_bool': _read_bool,
+        '_write_int': _write_int, '_read_int': _read_int,
+        '_write_float': _write_float, '_read_float': _read_float,
+        '_write_str': _write_str, '_read_str': _read_str,
+        '_write_bytes': _write_bytes, '_read_bytes': _read_bytes,
+        '_write_json': _write_json, '_read_json': _read_json,
+    }
+    for index, field in enumerate(dataclasses.fields(cls)):
+        if field.name.startswith('_') or not field.init:
+            continue
+        field_type = hints.get(field.name, field.type)
+        kind = _field_kind(field_type)
+        if kind == 'enum':
+            namespace[f'_enum_{index}'] = field_type
+            encode_lines.append(f'    _write_int(out, o.{field.name})')
+            decode_lines.append(f'    f_{index}, offset = _read_int(data, offset)')
+            decode_lines.append(f'    f_{index} = _enum_{index}(f_{index})')
+        else:
+            encode_lines.append(f'    _write_{kind}(out, o.{field.name})')
+            decode_lines.append(f'    f_{index}, offset = _read_{kind}(data, offset)')
+        arguments.append(f'{field.name}=f_{index}')
+    encode_lines.append('    return bytes(out)')
+    decode_lines.append(f'    return cls({", ".join(arguments)})')
+    exec('\n'.join(encode_lines), namespace)
+    exec('\n'.join(decode_lines), namespace)
+    codec = (namespace['encode'], namespace['decode'])
+    _codecs[cls] = codec
+    return codec
+
+
+def get_codec(cls: type) -> tuple[Encoder, Decoder]:
+    codec = _codecs.get(cls, None)
+    if codec is None:
+        codec = compile_codec(cls)
+    return codec
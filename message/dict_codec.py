@@ -0,0 +1,104 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import enum
+import types
+import typing
+import dataclasses
+from utils import utils
+from typing import Any, Callable, get_type_hints
+
+
+ToDict = Callable[[Any], dict]
+FromDict = Callable[[type, dict], Any]
+
+_codecs: dict[type, tuple[ToDict, FromDict]] = {}
+
+
+def _unwrap_optional(tp: Any) -> Any:
+    if typing.get_origin(tp) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(tp) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return tp
+
+
+def compile_codec(cls: type) -> tuple[ToDict, FromDict]:
+    """根据dataclass字段生成专用的to_dict/from_dict, 字段列表/默认值/嵌套消息只在这里解析一次"""
+    try:
+        hints = get_type_hints(cls)
+    except Exception:
+        hints = {}
+    namespace: dict[str, Any] = {
+        '_to_dict': utils.to_dict, '_missing': dataclasses.MISSING}
+    items: list[str] = []
+    # 位置参数比关键字参数调用快得多, 只有kw_only字段才用关键字传递
+    arguments: list[str] = []
+    fixes: list[str] = []
+    names: set[str] = set()
+    for index, field in enumerate(dataclasses.fields(cls)):
+        field_type = _unwrap_optional(hints.get(field.name, field.type))
+        is_enum = isinstance(field_type, type) and issubclass(
+            field_type, enum.Enum)
+        is_message = isinstance(field_type, type) and hasattr(
+            field_type, 'from_dict') and hasattr(field_type, 'to_dict')
+
+        if not field.name.startswith('_'):
+            value = f'o.{field.name}'
+            if is_message:
+                value = f'(None if {value} is None else {value}.to_dict())'
+            elif field_type not in (int, str, bool, float, bytes) and not is_enum:
+                value = f'_to_dict({value})'
+            items.append(f'{field.name!r}: {value}')
+
+        if not field.init:
+            continue
+        names.add(field.name)
+        if field.default is not dataclasses.MISSING:
+            namespace[f'_d_{index}'] = field.default
+            value = f'get({field.name!r}, _d_{index})'
+        elif field.default_factory is not dataclasses.MISSING:
+            namespace[f'_f_{index}'] = field.default_factory
+            value = f'(v if (v := get({field.name!r}, _missing)) is not _missing else _f_{index}())'
+        else:
+            value = f'kwargs[{field.name!r}]'
+        if is_enum:
+            namespace[f'_t_{index}'] = field_type
+            value = f'(v if (v := {value}) is None or v.__class__ is _t_{index} else _t_{index}(v))'
+            fixes.append(
+                f'        if (v := o.{field.name}) is not None and v.__class__ is not _t_{index}: o.{field.name} = _t_{index}(v)')
+        elif is_message:
+            namespace[f'_t_{index}'] = field_type
+            value = f'(_t_{index}.from_dict(v) if isinstance(v := {value}, dict) else v)'
+            fixes.append(
+                f'        if isinstance(v := o.{field.name}, dict): o.{field.name} = _t_{index}.from_dict(v)')
+        arguments.append(f'{field.name}={value}' if field.kw_only else value)
+
+    # 没有多余字段时直接走cls(**kwargs), 否则按字段逐个取值, 多余字段被忽略而不是抛异常
+    namespace['_names'] = frozenset(names)
+    source = '\n'.join((
+        'def to_dict(o):',
+        f'    return {{{", ".join(items)}}}',
+        '',
+        'def from_dict(cls, kwargs):',
+        '    if _names.issuperset(kwargs):',
+        '        o = cls(**kwargs)',
+        *fixes,
+        '        return o',
+        '    get = kwargs.get',
+        f'    return cls({", ".join(arguments)})',
+    ))
+    exec(source, namespace)
+    codec = (namespace['to_dict'], namespace['from_dict'])
+    _codecs[cls] = codec
+    return codec
+
+
+def get_codec(cls: type) -> tuple[ToDict, FromDict]:
+    codec = _codecs.get(cls, None)
+    if codec is None:
+        codec = compile_codec(cls)
+    return codec
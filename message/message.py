@@ -4,20 +4,39 @@ __time__ = '2024/08/12'
 __author__ = '虎小黑'
 
 
-from dataclasses import dataclass
 from message.base import JsonMessage
+from dataclasses import dataclass, field
 
 
 @dataclass(slots=True)
 class RequestHeartBeat(JsonMessage):
     now_sec: int = 0
+    server_id: str = ''
+    load: int = 0
 
 
 @dataclass(slots=True)
 class ResponseHeartBeat(JsonMessage):
     now_sec: int = 0
+    server_id: str = ''
+    load: int = 0
 
 
 @dataclass(slots=True)
 class GCActor(JsonMessage):
     actor_id: str = ''
+
+
+@dataclass(slots=True)
+class RpcHandshake(JsonMessage):
+    models: dict[str, int] = field(default_factory=dict)
+    zstd: bool = False
+    dict_ids: list[int] = field(default_factory=list)
+    # 能够拼接RpcChunk分块, 对端据此决定是否分块发送
+    chunk: bool = False
+
+
+@dataclass(slots=True)
+class RpcChunk(JsonMessage):
+    stream_id: int = 0
+    total: int = 0
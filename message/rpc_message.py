@@ -4,8 +4,10 @@ __time__ = '2024/08/12'
 __author__ = '虎小黑'
 
 
+import asyncio
 from typing import Self
 from enum import IntEnum
+from collections import deque
 from dataclasses import dataclass
 from message.base import JsonMessage
 
@@ -16,6 +18,7 @@ class RpcErrorCode(IntEnum):
     TimeoutError = -1001
     PositionNotFound = -1002
     MehodNotFound = -1003
+    ActorNotRunning = -1004
     RpcErrorPositionChanged = -2001
 
 
@@ -41,15 +44,78 @@ class RpcException(Exception):
     def method_not_found(cls, actor_type: str, actor_unique_id: str, method_name: str) -> Self:
         return cls(RpcErrorCode.MehodNotFound, f"{actor_type}:{actor_unique_id} {method_name} not found")
 
+    @classmethod
+    def actor_not_running(cls, actor_type: str, actor_unique_id: str) -> Self:
+        return cls(RpcErrorCode.ActorNotRunning, f"{actor_type}:{actor_unique_id} not running")
+
+
+class RpcBodyStream(object):
+    """分块到达的body, 按到达顺序异步读取, 读到b''表示结束"""
+
+    def __init__(self, size: int) -> None:
+        self.__size = size
+        self.__chunks: deque[bytes] = deque()
+        self.__eof = False
+        self.__exception: None | Exception = None
+        self.__waiter: None | asyncio.Future = None
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __wakeup(self) -> None:
+        waiter = self.__waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def feed(self, data: bytes) -> None:
+        if data:
+            self.__chunks.append(data)
+            self.__wakeup()
+
+    def feed_eof(self) -> None:
+        self.__eof = True
+        self.__wakeup()
+
+    def set_exception(self, exception: Exception) -> None:
+        self.__exception = exception
+        self.__wakeup()
+
+    async def read(self) -> bytes:
+        while not self.__chunks and not self.__eof and self.__exception is None:
+            self.__waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.__waiter
+            finally:
+                self.__waiter = None
+        if self.__chunks:
+            return self.__chunks.popleft()
+        if self.__exception is not None:
+            raise self.__exception
+        return b''
+
+    async def read_all(self) -> bytes:
+        return b''.join([chunk async for chunk in self])
+
+    def __aiter__(self) -> 'RpcBodyStream':
+        return self
+
+    async def __anext__(self) -> bytes:
+        data = await self.read()
+        if not data:
+            raise StopAsyncIteration
+        return data
+
 
 @dataclass(slots=True)
 class RpcMessage:
     meta: JsonMessage
     body: bytes = b''
+    stream: None | RpcBodyStream = None
 
     @classmethod
-    def from_msg(cls, meta: JsonMessage, body: bytes = b'') -> Self:
-        return cls(meta, body)
+    def from_msg(cls, meta: JsonMessage, body: bytes = b'', stream: None | RpcBodyStream = None) -> Self:
+        return cls(meta, body, stream)
 
 
 @dataclass(slots=True)
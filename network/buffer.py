@@ -6,24 +6,39 @@ __author__ = '虎小黑'
 
 from utils import monkey_config
 from logger.logger import Logger
+from network.buffer_pool import BufferPool
 
 
 logger = Logger().get_logger('Monkey')
 
 
 class Buffer(object):
+    """ring模式下slice/read返回memoryview且只在回绕时整理数据, 视图只在下一次append之前有效
+    底层bytearray从BufferPool按分级借用, 扩容时换成更大的一级, release之后下次写入再借"""
 
-    def __init__(self) -> None:
-        self.__buffer = bytearray(monkey_config.get_config().tcp_buffer_size)
+    def __init__(self, ring: bool = False) -> None:
+        self.__buffer = BufferPool().acquire(
+            monkey_config.get_config().tcp_buffer_size)
+        self.__ring = ring
         self.__read = 0
         self.__write = 0
 
+    def __del__(self) -> None:
+        self.release(force=True)
+
     @staticmethod
-    def from_bytes(data: bytes) -> 'Buffer':
-        buffer = Buffer()
+    def from_bytes(data: bytes, ring: bool = False) -> 'Buffer':
+        buffer = Buffer(ring)
         buffer.append(data)
         return buffer
 
+    @property
+    def is_ring(self) -> bool:
+        return self.__ring
+
+    def capacity(self) -> int:
+        return len(self.__buffer)
+
     def readable_len(self) -> int:
         return self.__write - self.__read
 
@@ -33,35 +48,88 @@ class Buffer(object):
     def has_read(self, length: int) -> None:
         self.__read += length
 
-    def slice(self, length: int) -> bytearray:
+    def has_write(self, length: int) -> None:
+        self.__write += length
+
+    def view(self, length: int = -1) -> memoryview:
+        if length <= 0 or length > self.readable_len():
+            length = self.readable_len()
+        return memoryview(self.__buffer)[self.__read:self.__read + length].toreadonly()
+
+    def slice(self, length: int) -> bytearray | memoryview:
+        if self.__ring:
+            return self.view(length)
         if length <= 0:
             return self.__buffer[self.__read:self.__write]
         return self.__buffer[self.__read:self.__read + length]
 
-    def shrink(self) -> None:
+    def __compact(self) -> None:
         length = self.readable_len()
         if length > 0:
             self.__buffer[:length] = self.__buffer[self.__read:self.__write]
         self.__write = length
         self.__read = 0
 
-    def read(self, length: int = -1) -> bytearray:
+    def __grow(self, length: int) -> None:
+        array = BufferPool().acquire(length)
+        readable = self.readable_len()
+        array[:readable] = self.__buffer[self.__read:self.__write]
+        if self.__buffer:
+            BufferPool().release(self.__buffer)
+        self.__buffer = array
+        self.__read = 0
+        self.__write = readable
+
+    def shrink(self) -> None:
+        if not self.__ring:
+            self.__compact()
+        elif self.__read == self.__write:
+            self.__read = 0
+            self.__write = 0
+
+    def release(self, force: bool = False) -> bool:
+        """数据读空时把bytearray还给BufferPool, 之前取得的视图随之失效
+        force为True时丢弃未读的数据, 用于连接关闭和对象回收"""
+        if self.__read != self.__write and not force:
+            return False
+        if self.__buffer:
+            BufferPool().release(self.__buffer)
+            self.__buffer = bytearray()
+        self.__read = 0
+        self.__write = 0
+        return True
+
+    def reserve(self, length: int) -> memoryview:
+        """返回尾部可写区域的视图供直接写入(最多扩容到tcp_buffer_max_size), 写入后调用has_write"""
+        if self.writable_len() < length:
+            if self.__read > 0:
+                self.__compact()
+            max_size = monkey_config.get_config().tcp_buffer_max_size
+            if self.writable_len() < length and len(self.__buffer) < max_size:
+                self.__grow(min(self.readable_len() + length, max_size))
+        if self.writable_len() <= 0:
+            logger.error(
+                f'Monkey network buffer is full read:{self.__read} write:{self.__write}')
+            raise BufferError('buffer is full')
+        return memoryview(self.__buffer)[self.__write:]
+
+    def read(self, length: int = -1) -> bytearray | memoryview:
         if length > self.readable_len() or length <= 0:
             length = self.readable_len()
         data = self.slice(length)
         self.has_read(length)
         return data
 
-    def append(self, data: bytes) -> None:
-        first_space = min(self.writable_len(), len(data))
-        second_space = len(data) - first_space
-        self.__buffer[self.__write:self.__write +
-                      first_space] = data[:first_space]
-        self.__write += first_space
-        if second_space > 0:
-            if len(self.__buffer) + second_space > monkey_config.get_config().tcp_buffer_max_size:
-                logger.error(
-                    f'Monkey network buffer is full bytes:{self.__buffer} read:{self.__read} write:{self.__write} extend:{data[first_space:]}')
-                raise BufferError('buffer is full')
-            self.__buffer.extend(data[first_space:])
-            self.__write += second_space
+    def append(self, data: bytes | bytearray | memoryview) -> None:
+        length = len(data)
+        if self.writable_len() < length:
+            if self.__read > 0:
+                self.__compact()
+            if self.writable_len() < length:
+                if self.readable_len() + length > monkey_config.get_config().tcp_buffer_max_size:
+                    logger.error(
+                        f'Monkey network buffer is full read:{self.__read} write:{self.__write} extend:{length}')
+                    raise BufferError('buffer is full')
+                self.__grow(self.readable_len() + length)
+        self.__buffer[self.__write:self.__write + length] = data
+        self.__write += length
@@ -0,0 +1,75 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+from utils import monkey_config
+from utils.singleton import Singleton
+
+
+class BufferPool(Singleton):
+    """进程内共享的bytearray池, 按tcp_buffer_size的2的幂倍分级, 最大一级为tcp_buffer_max_size"""
+
+    def __init__(self) -> None:
+        config = monkey_config.get_config()
+        sizes: list[int] = []
+        size = config.tcp_buffer_size
+        while size < config.tcp_buffer_max_size:
+            sizes.append(size)
+            size *= 2
+        sizes.append(config.tcp_buffer_max_size)
+        self.__sizes = sizes
+        self.__free: dict[int, list[bytearray]] = {size: [] for size in sizes}
+        self.__max_pooled_bytes = config.buffer_pool_max_bytes
+        self.__pooled_bytes = 0
+        self.__pinned_bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def sizes(self) -> list[int]:
+        return self.__sizes
+
+    def size_class(self, length: int) -> int:
+        """能容纳length的最小分级, 超过最大分级返回0"""
+        for size in self.__sizes:
+            if size >= length:
+                return size
+        return 0
+
+    def acquire(self, length: int) -> bytearray:
+        size = self.size_class(length)
+        if size == 0:
+            raise BufferError(f'BufferPool acquire too large length:{length}')
+        free = self.__free[size]
+        if free:
+            self.__hits += 1
+            self.__pooled_bytes -= size
+            array = free.pop()
+        else:
+            self.__misses += 1
+            array = bytearray(size)
+        self.__pinned_bytes += size
+        return array
+
+    def release(self, array: bytearray) -> None:
+        size = len(array)
+        free = self.__free.get(size, None)
+        if free is None:
+            return
+        self.__pinned_bytes -= size
+        if self.__pooled_bytes + size > self.__max_pooled_bytes:
+            return
+        self.__pooled_bytes += size
+        free.append(array)
+
+    def stats(self) -> dict[str, int | float]:
+        total = self.__hits + self.__misses
+        return {
+            'bytes_pinned': self.__pinned_bytes,
+            'bytes_pooled': self.__pooled_bytes,
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'hit_rate': self.__hits / total if total else 0.0,
+        }
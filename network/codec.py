@@ -17,10 +17,35 @@ class Codec(ABC):
     def code_id(cls) -> str:
         return cls.__qualname__
 
+    def fork(self) -> 'Codec':
+        """每个连接调用一次, 有连接级状态的codec返回新实例"""
+        return self
+
+    def handshake(self) -> bytes | None:
+        """连接建立后最先发送给对端的数据"""
+        return None
+
+    def close(self) -> None:
+        """连接关闭时调用, 释放连接级状态"""
+        pass
+
     @abstractmethod
     def decode(self, buffer: Buffer) -> object | None:
         pass
 
+    def decode_many(self, buffer: Buffer) -> list[object]:
+        """一次取出缓冲区中所有完整的消息"""
+        msgs: list[object] = []
+        while True:
+            msg = self.decode(buffer)
+            if msg is None:
+                return msgs
+            msgs.append(msg)
+
     @abstractmethod
     def encode(self, data: object) -> bytes:
         pass
+
+    def encode_frames(self, data: object) -> list[bytes]:
+        """编码成若干可以单独发送的帧, 多于一帧时session把它们与其他消息交错发送"""
+        return [self.encode(data)]
@@ -17,7 +17,7 @@ class CodecEcho(Codec):
     def decode(self, buffer: Buffer) -> object | None:
         if buffer.readable_len() > 0:
             arr = buffer.read()
-            return arr.decode(encoding='utf-8')
+            return str(arr, encoding='utf-8')
         return None
 
     def encode(self, data: object) -> bytes:
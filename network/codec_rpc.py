@@ -11,45 +11,168 @@ from network.codec import Codec
 from utils import monkey_config
 from logger.logger import Logger
 from network.buffer import Buffer
-from message.message import JsonMessage
-from message.rpc_message import RpcMessage
+from message.rpc_message import RpcBodyStream, RpcMessage
+from message.message import JsonMessage, RpcChunk, RpcHandshake
+from utils.varint import decode_varint, encode_varint
+from utils.compression import Compression, ZstdContext
 
 
 logger = Logger().get_logger('Monkey')
 
 
+class _ChunkStream(object):
+
+    __slots__ = ('total', 'received', 'data', 'checked', 'body')
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.received = 0
+        self.data = bytearray()
+        self.checked = False
+        self.body: None | RpcBodyStream = None
+
+
 class CodecRpc(Codec):
 
     MAGIC_LEN = len(monkey_config.get_config().magic_code)
     MAGIC_CODE = monkey_config.get_config().magic_code.encode()
     HEARD_LENGTH = MAGIC_LEN + 8
+    META_EXTENDED = 0
+    FLAG_TYPE_ID = 0x01
+    FLAG_BINARY = 0x02
+    FLAG_BODY_ZSTD = 0x04
     __class_name_cache: dict[type[JsonMessage], bytes] = {}
+    __stream_models: set[type[JsonMessage]] = set()
 
-    def __init__(self) -> None:
+    def __init__(self, binary_meta: bool | None = None) -> None:
         super().__init__()
+        if binary_meta is None:
+            binary_meta = monkey_config.get_config().rpc_binary_meta
+        self.__binary_meta = binary_meta
+        # 已经通过握手告知对端的最大类型id, 之后注册的类型仍按名字编码
+        # 收到对端握手之前对端可能不认识类型id, 先记在__pending_id中, 仍按名字编码
+        self.__announced_id = 0
+        self.__pending_id = 0
+        self.__peer_handshake = False
+        self.__peer_models: dict[int, type[JsonMessage]] = {}
+        self.__stream_id = 0
+        self.__streams: dict[int, _ChunkStream] = {}
+        # 对端在握手中声明支持zstd之后才压缩body, 解压上下文在收到压缩帧时创建
+        self.__compress = False
+        self.__zstd: None | ZstdContext = None
+        # 对端在握手中声明能拼接分块之后才分块发送, 旧版本的对端不认识RpcChunk
+        self.__chunk = False
+
+    @property
+    def binary_meta(self) -> bool:
+        return self.__binary_meta
+
+    def fork(self) -> 'CodecRpc':
+        return type(self)(binary_meta=self.__binary_meta)
+
+    def handshake(self) -> bytes | None:
+        config = monkey_config.get_config()
+        zstd = config.rpc_compress_threshold > 0
+        if not config.rpc_type_id and not zstd and self.chunk_size() <= 0:
+            return None
+        handshake = RpcHandshake(zstd=zstd, chunk=True)
+        if zstd:
+            handshake.dict_ids = Compression().dict_ids()
+        announced_id = 0
+        if config.rpc_type_id:
+            model_ids = base.get_model_ids()
+            handshake.models = {name.decode(): model_id for name,
+                                model_id in model_ids.items()}
+            announced_id = max(model_ids.values(), default=0)
+        data = self.encode(handshake)
+        self.__pending_id = announced_id
+        if self.__peer_handshake:
+            self.__announced_id = announced_id
+        return data
 
     @classmethod
-    def _encode_meta(cls, o: JsonMessage) -> bytes:
-        # 1字节长度
-        # N字节MessageName
-        # M字节json
-        _class = o.__class__
+    def register_stream_model(cls, model: type[JsonMessage]) -> None:
+        """分块传输的该类型消息在收到meta后立即分发, body通过RpcMessage.stream逐块读取"""
+        cls.__stream_models.add(model)
+
+    @classmethod
+    def unregister_stream_model(cls, model: type[JsonMessage]) -> None:
+        cls.__stream_models.discard(model)
+
+    def close(self) -> None:
+        for stream in self.__streams.values():
+            if stream.body is not None:
+                stream.body.set_exception(
+                    ConnectionResetError('CodecRpc connection closed'))
+        self.__streams.clear()
+
+    def __on_handshake(self, handshake: RpcHandshake) -> None:
+        peer_models: dict[int, type[JsonMessage]] = {}
+        for name, model_id in handshake.models.items():
+            model = base.find_model(name.encode())
+            if model is not None:
+                peer_models[model_id] = model
+        self.__peer_models = peer_models
+        # 对端发来握手说明它能解析本端的握手, 此后才按类型id编码
+        self.__peer_handshake = True
+        self.__announced_id = self.__pending_id
+        if handshake.zstd and monkey_config.get_config().rpc_compress_threshold > 0:
+            self.__zstd = ZstdContext(
+                Compression().select_dictionary(handshake.dict_ids))
+            self.__compress = True
+        self.__chunk = handshake.chunk
+        logger.debug(
+            f'CodecRpc handshake peer models:{len(handshake.models)} known:{len(peer_models)} zstd:{handshake.zstd} dict_id:{self.__zstd.dict_id if self.__zstd else 0} chunk:{handshake.chunk}')
+
+    @classmethod
+    def _class_name(cls, _class: type[JsonMessage]) -> bytes:
         name_bytes = cls.__class_name_cache.get(_class, None)
         if not name_bytes:
-            if _class not in cls.__class_name_cache:
-                name: str = _class.__qualname__
-                cls.__class_name_cache[_class] = name.encode()
-            name_bytes = cls.__class_name_cache[_class]
-        json_data: bytes = cast(bytes, mokey_json.json_dumps(o.to_dict()))
-        return b"".join((len(name_bytes).to_bytes(1, 'big'), name_bytes, json_data))
+            name: str = _class.__qualname__
+            name_bytes = name.encode()
+            cls.__class_name_cache[_class] = name_bytes
+        return name_bytes
+
+    def _encode_meta(self, o: JsonMessage, flags: int = 0) -> bytes:
+        # 名字格式: 1字节长度 | N字节MessageName | M字节json
+        # 扩展格式: 1字节0 | 1字节flags | varint类型id或(1字节长度 | N字节MessageName) | M字节json或二进制
+        name_bytes = self._class_name(o.__class__)
+        if self.__binary_meta:
+            flags |= self.FLAG_BINARY
+            payload = o.to_bytes()
+        else:
+            payload = cast(bytes, mokey_json.json_dumps(o.to_dict()))
+        if self.__announced_id:
+            model_id = base.find_model_id(name_bytes)
+            if 0 < model_id <= self.__announced_id:
+                return b"".join((bytes((self.META_EXTENDED, flags | self.FLAG_TYPE_ID)), encode_varint(model_id), payload))
+        if flags:
+            return b"".join((bytes((self.META_EXTENDED, flags, len(name_bytes))), name_bytes, payload))
+        return b"".join((len(name_bytes).to_bytes(1, 'big'), name_bytes, payload))
+
+    @staticmethod
+    def chunk_size() -> int:
+        """分块大小, 未配置时取tcp_buffer_max_size的一半, 保证对端缓冲区能同时容纳一个分块和下一帧的开头"""
+        config = monkey_config.get_config()
+        if config.rpc_chunk_size == 0:
+            return config.tcp_buffer_max_size // 2
+        return max(config.rpc_chunk_size, 0)
 
     def encode(self, msg: object) -> bytes:
+        return b''.join(self.encode_frames(msg))
+
+    def encode_frames(self, msg: object) -> list[bytes]:
+        """对端支持分块时, 超过chunk_size的消息切成多个RpcChunk帧
+        分块的消息在最后一块到达时才交给上层, 同一连接上之后发送的小消息可能先到; 不分块的消息之间保持发送顺序"""
         if not isinstance(msg, RpcMessage):
             msg = RpcMessage.from_msg(cast(JsonMessage, msg))
         msg = cast(RpcMessage, msg)
-        meta_data = self._encode_meta(msg.meta)
         body_data = msg.body if msg.body else b''
-        return b''.join(
+        flags = 0
+        if self.__compress and body_data:
+            flags, body_data = self.__compress_body(msg.meta, body_data)
+        meta_data = self._encode_meta(msg.meta, flags)
+        frame = b''.join(
             (
                 self.MAGIC_CODE,
                 len(meta_data).to_bytes(4, 'little'),
@@ -58,36 +181,191 @@ class CodecRpc(Codec):
                 body_data
             )
         )
+        chunk_size = self.chunk_size()
+        if self.__chunk and 0 < chunk_size < len(frame):
+            return self.__encode_chunks(frame, chunk_size)
+        return [frame]
 
-    @classmethod
-    def _decode_meta(cls, array: bytearray) -> JsonMessage | None:
-        name_length = array[0]
-        name = bytes(array[1: name_length + 1])
-        model = base.find_model(name)
-        if model is not None:
-            json = mokey_json.json_loads(array[name_length + 1:])
-            return model.from_dict(json)
+    def __compress_body(self, meta: JsonMessage, body: bytes) -> tuple[int, bytes]:
+        # 压缩后的body: varint字典id | zstd帧; 流式类型要逐块交给处理函数, 不压缩
+        clz = meta.__class__
+        if clz in self.__stream_models:
+            return 0, body
+        compression = Compression()
+        threshold = compression.threshold(clz.__qualname__)
+        if threshold <= 0 or len(body) < threshold:
+            return 0, body
+        compression.sample(body)
+        zstd = cast(ZstdContext, self.__zstd)
+        compressed = zstd.compress(body)
+        if len(compressed) + 1 >= len(body):
+            return 0, body
+        return self.FLAG_BODY_ZSTD, encode_varint(zstd.dict_id) + compressed
+
+    def __decompress_body(self, data: memoryview) -> bytes:
+        dict_id, offset = decode_varint(data, 0)
+        if self.__zstd is None:
+            self.__zstd = ZstdContext()
+        return self.__zstd.decompress(data[offset:], dict_id, monkey_config.get_config().rpc_max_body_size)
+
+    def __encode_chunks(self, frame: bytes, chunk_size: int) -> list[bytes]:
+        # 超过chunk_size的帧整体切成若干RpcChunk帧, 对端按stream_id重新拼接, 不同消息的分块可以交错到达
+        self.__stream_id += 1
+        meta_data = self._encode_meta(
+            RpcChunk(stream_id=self.__stream_id, total=len(frame)))
+        piece_size = chunk_size - self.HEARD_LENGTH - len(meta_data)
+        if piece_size <= 0:
+            raise ValueError(
+                f'CodecRpc rpc_chunk_size too small chunk_size:{chunk_size} meta:{len(meta_data)}')
+        meta_len = len(meta_data).to_bytes(4, 'little')
+        chunks: list[bytes] = []
+        with memoryview(frame) as view:
+            for start in range(0, len(frame), piece_size):
+                piece = view[start: start + piece_size]
+                chunks.append(b''.join((self.MAGIC_CODE, meta_len, len(
+                    piece).to_bytes(4, 'little'), meta_data, piece)))
+        return chunks
+
+    def __on_chunk(self, chunk: RpcChunk, data: memoryview) -> RpcMessage | None:
+        stream = self.__streams.get(chunk.stream_id, None)
+        if stream is None:
+            config = monkey_config.get_config()
+            if chunk.total > config.rpc_max_body_size:
+                raise ValueError(
+                    f'CodecRpc chunk too large stream_id:{chunk.stream_id} total:{chunk.total}')
+            if len(self.__streams) >= config.rpc_max_streams:
+                raise ValueError(
+                    f'CodecRpc too many streams stream_id:{chunk.stream_id} streams:{len(self.__streams)}')
+            stream = _ChunkStream(chunk.total)
+            self.__streams[chunk.stream_id] = stream
+        stream.received += len(data)
+        if stream.received > stream.total:
+            raise ValueError(
+                f'CodecRpc chunk overflow stream_id:{chunk.stream_id} total:{stream.total} received:{stream.received}')
+        finished = stream.received == stream.total
+        if finished:
+            del self.__streams[chunk.stream_id]
+        if stream.body is not None:
+            stream.body.feed(bytes(data))
+            if finished:
+                stream.body.feed_eof()
+            return None
+        stream.data += data
+        if finished:
+            with memoryview(stream.data) as view:
+                result = self._decode_frame(view, 0)
+            if result is None or result[1] != stream.total:
+                raise ValueError(
+                    f'CodecRpc chunk frame error stream_id:{chunk.stream_id} total:{stream.total}')
+            return result[0]
+        if not stream.checked and self.__stream_models:
+            return self.__open_stream(stream)
         return None
 
-    def decode(self, buffer: Buffer) -> RpcMessage | None:
-        if buffer.readable_len() < self.HEARD_LENGTH:
+    def __open_stream(self, stream: _ChunkStream) -> RpcMessage | None:
+        data = stream.data
+        if len(data) < self.HEARD_LENGTH:
+            return None
+        meta_len = int.from_bytes(
+            data[self.MAGIC_LEN: self.MAGIC_LEN + 4], 'little')
+        body_offset = self.HEARD_LENGTH + meta_len
+        if len(data) < body_offset:
+            return None
+        stream.checked = True
+        meta = self._decode_meta(data[self.HEARD_LENGTH: body_offset])
+        if meta is None or meta.__class__ not in self.__stream_models:
+            return None
+        body = RpcBodyStream(int.from_bytes(
+            data[self.MAGIC_LEN + 4: self.HEARD_LENGTH], 'little'))
+        body.feed(bytes(data[body_offset:]))
+        stream.body = body
+        stream.data = bytearray()
+        return RpcMessage.from_msg(meta, b'', body)
+
+    def _decode_meta(self, array: bytearray | memoryview) -> JsonMessage | None:
+        name_length = array[0]
+        flags = 0
+        if name_length != self.META_EXTENDED:
+            model = base.find_model(bytes(array[1: name_length + 1]))
+            offset = name_length + 1
+        else:
+            flags = array[1]
+            if flags & self.FLAG_TYPE_ID:
+                model_id, offset = decode_varint(array, 2)
+                model = self.__peer_models.get(model_id, None)
+            else:
+                name_length = array[2]
+                model = base.find_model(bytes(array[3: name_length + 3]))
+                offset = name_length + 3
+        if model is None:
             return None
-        header = buffer.slice(self.HEARD_LENGTH)
-        if header[:self.MAGIC_LEN] != self.MAGIC_CODE:
+        if flags & self.FLAG_BINARY:
+            return model.from_bytes(array, offset)
+        json = mokey_json.json_loads(array[offset:])
+        return model.from_dict(json)
+
+    def _decode_frame(self, view: memoryview, offset: int) -> tuple[RpcMessage | None, int] | None:
+        """从view的offset处解析一帧, 返回消息和帧长度, 数据不完整返回None; 握手帧和未拼完的分块在codec内部消化, 消息为None"""
+        if len(view) - offset < self.HEARD_LENGTH:
+            return None
+        meta_offset = offset + self.HEARD_LENGTH
+        if view[offset: offset + self.MAGIC_LEN] != self.MAGIC_CODE:
             logger.error(
-                f"CodecRpc decode magic code error: {header[:self.MAGIC_LEN]}")
+                f"CodecRpc decode magic code error: {bytes(view[offset: offset + self.MAGIC_LEN])}")
             raise ValueError(
-                f"CodecRpc decode magic code error: {header[:self.MAGIC_LEN]}")
+                f"CodecRpc decode magic code error: {bytes(view[offset: offset + self.MAGIC_LEN])}")
         meta_len = int.from_bytes(
-            header[self.MAGIC_LEN: self.MAGIC_LEN + 4], 'little')
-        body_len = int.from_bytes(header[self.MAGIC_LEN + 4:], 'little')
-        if buffer.readable_len() < self.HEARD_LENGTH + meta_len + body_len:
+            view[offset + self.MAGIC_LEN: offset + self.MAGIC_LEN + 4], 'little')
+        body_len = int.from_bytes(
+            view[offset + self.MAGIC_LEN + 4: meta_offset], 'little')
+        frame_len = self.HEARD_LENGTH + meta_len + body_len
+        if len(view) - offset < frame_len:
             return None
-        buffer.has_read(self.HEARD_LENGTH)
-        meta_data = buffer.read(meta_len)
-        body_data = buffer.read(body_len)
+        meta_data = view[meta_offset: meta_offset + meta_len]
         meta = self._decode_meta(meta_data)
         if meta is None:
-            logger.error(f"CodecRpc decode meta error: {meta_data}")
-            raise ValueError(f"CodecRpc decode meta error: {meta_data}")
-        return RpcMessage.from_msg(meta, body_data if body_data else b'')
+            logger.error(f"CodecRpc decode meta error: {bytes(meta_data)}")
+            raise ValueError(f"CodecRpc decode meta error: {bytes(meta_data)}")
+        if isinstance(meta, RpcChunk):
+            return self.__on_chunk(meta, view[meta_offset + meta_len: offset + frame_len]), frame_len
+        if isinstance(meta, RpcHandshake):
+            self.__on_handshake(meta)
+            return None, frame_len
+        # body会被投递到actor邮箱, 生命周期长于缓冲区, 这里是唯一一次拷贝
+        if meta_data[0] == self.META_EXTENDED and meta_data[1] & self.FLAG_BODY_ZSTD:
+            body_data = self.__decompress_body(
+                view[meta_offset + meta_len: offset + frame_len])
+        else:
+            body_data = bytes(view[meta_offset + meta_len: offset + frame_len])
+        return RpcMessage.from_msg(meta, body_data), frame_len
+
+    def decode(self, buffer: Buffer) -> RpcMessage | None:
+        if buffer.readable_len() < self.HEARD_LENGTH:
+            return None
+        msg: RpcMessage | None = None
+        offset = 0
+        with buffer.view() as view:
+            while msg is None:
+                result = self._decode_frame(view, offset)
+                if result is None:
+                    break
+                msg = result[0]
+                offset += result[1]
+        buffer.has_read(offset)
+        return msg
+
+    def decode_many(self, buffer: Buffer) -> list[object]:
+        msgs: list[object] = []
+        if buffer.readable_len() < self.HEARD_LENGTH:
+            return msgs
+        offset = 0
+        with buffer.view() as view:
+            while True:
+                result = self._decode_frame(view, offset)
+                if result is None:
+                    break
+                if result[0] is not None:
+                    msgs.append(result[0])
+                offset += result[1]
+        buffer.has_read(offset)
+        return msgs
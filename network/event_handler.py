@@ -18,7 +18,9 @@ class EventHandler(object):
     __close_socket_handler: None | Callable[[SocketSession], None] = None
     __new_socket_handler: None | Callable[[SocketSession], None] = None
     __message_handler: dict[Type, Callable[[
-        SocketSession, Type, object], Awaitable]] = {}
+        SocketSession, Type, object], None | Awaitable]] = {}
+    __batch_message_handler: dict[Type, Callable[[
+        SocketSession, Type, list[object]], None | Awaitable]] = {}
 
     @classmethod
     def set_close_socket_handler(cls, handler: Callable[[SocketSession], None]) -> None:
@@ -29,7 +31,8 @@ class EventHandler(object):
         cls.__new_socket_handler = handler
 
     @classmethod
-    def register_hander(cls, clz: Type, handler: Callable[[SocketSession, Type, object], Awaitable]) -> None:
+    def register_hander(cls, clz: Type, handler: Callable[[SocketSession, Type, object], None | Awaitable]) -> None:
+        """handler可以是普通函数, 批量分发时不需要await"""
         if clz in cls.__message_handler:
             logger.error(
                 f"EventHandler register handler error, clz:{clz} handler already exist")
@@ -38,6 +41,24 @@ class EventHandler(object):
         logger.debug(
             f"EventHandler register handler clz:{clz.__qualname__} handler:{handler.__qualname__}")
 
+    @classmethod
+    def unregister_handler(cls, clz: Type) -> None:
+        cls.__message_handler.pop(clz, None)
+
+    @classmethod
+    def register_batch_handler(cls, clz: Type, handler: Callable[[SocketSession, Type, list[object]], None | Awaitable]) -> None:
+        if clz in cls.__batch_message_handler:
+            logger.error(
+                f"EventHandler register batch handler error, clz:{clz} handler already exist")
+            return
+        cls.__batch_message_handler[clz] = handler
+        logger.debug(
+            f"EventHandler register batch handler clz:{clz.__qualname__} handler:{handler.__qualname__}")
+
+    @classmethod
+    def unregister_batch_handler(cls, clz: Type) -> None:
+        cls.__batch_message_handler.pop(clz, None)
+
     @classmethod
     def process_income_socket(cls, session: SocketSession) -> None:
         suc = SocketSessionManager().add_session(session)
@@ -71,10 +92,50 @@ class EventHandler(object):
     async def process_socket_message(cls, session: SocketSession, clz: Type,  msg: object) -> None:
         try:
             if cls.__message_handler.get(clz) is not None:
-                await cls.__message_handler[clz](session, clz, msg)
+                result = cls.__message_handler[clz](session, clz, msg)
+                if result is not None:
+                    await result
             else:
                 logger.error(
                     f"EventHandler process message error, clz:{clz} handler not found")
         except Exception as e:
             logger.exception(
                 f"EventHandler process message error, session_id:{session.session_id} clz:{clz} error:{e}")
+
+    @classmethod
+    async def process_socket_messages(cls, session: SocketSession, msgs: list[tuple[Type, object]]) -> None:
+        """按到达顺序分发一批消息, 连续的同类型消息如果注册了批量处理函数则合并成一次调用
+        其余消息直接调用处理函数, 普通函数不经过await"""
+        handlers = cls.__message_handler
+        batch_handlers = cls.__batch_message_handler
+        index = 0
+        count = len(msgs)
+        while index < count:
+            clz, msg = msgs[index]
+            batch_handler = batch_handlers.get(clz)
+            if batch_handler is None:
+                index += 1
+                handler = handlers.get(clz)
+                if handler is None:
+                    logger.error(
+                        f"EventHandler process message error, clz:{clz} handler not found")
+                    continue
+                try:
+                    result = handler(session, clz, msg)
+                    if result is not None:
+                        await result
+                except Exception as e:
+                    logger.exception(
+                        f"EventHandler process message error, session_id:{session.session_id} clz:{clz} error:{e}")
+                continue
+            end = index + 1
+            while end < count and msgs[end][0] is clz:
+                end += 1
+            try:
+                result = batch_handler(session, clz, [item[1] for item in msgs[index:end]])
+                if result is not None:
+                    await result
+            except Exception as e:
+                logger.exception(
+                    f"EventHandler process batch message error, session_id:{session.session_id} clz:{clz} count:{end - index} error:{e}")
+            index = end
@@ -0,0 +1,130 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+
+_u64 = struct.Struct('<Q')
+# 本进程创建的共享内存, 同进程attach时不能从resource_tracker注销
+_created: set[str] = set()
+
+
+class ShmRing(object):
+    """共享内存上的单生产者/单消费者字节环, 读写位置单调递增, 对容量取模得到偏移
+    头部: head(生产者写) | tail(消费者写) | consumer_idle | producer_blocked, 各占一个cache line"""
+
+    HEAD_OFFSET = 0
+    TAIL_OFFSET = 64
+    CONSUMER_IDLE_OFFSET = 128
+    PRODUCER_BLOCKED_OFFSET = 192
+    DATA_OFFSET = 256
+
+    def __init__(self, shm: SharedMemory, owner: bool) -> None:
+        self.__shm = shm
+        self.__owner = owner
+        self.__capacity = shm.size - self.DATA_OFFSET
+
+    @classmethod
+    def create(cls, capacity: int) -> 'ShmRing':
+        shm = SharedMemory(create=True, size=cls.DATA_OFFSET + capacity)
+        shm.buf[:cls.DATA_OFFSET] = bytes(cls.DATA_OFFSET)
+        _created.add(shm.name)
+        return cls(shm, True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'ShmRing':
+        shm = SharedMemory(name=name)
+        if shm.name not in _created:
+            # 只有创建方负责unlink, 避免本进程的resource_tracker退出时重复清理
+            resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore
+        return cls(shm, False)
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def __get(self, offset: int) -> int:
+        return _u64.unpack_from(self.__shm.buf, offset)[0]
+
+    def __set(self, offset: int, value: int) -> None:
+        _u64.pack_into(self.__shm.buf, offset, value)
+
+    def readable_len(self) -> int:
+        return self.__get(self.HEAD_OFFSET) - self.__get(self.TAIL_OFFSET)
+
+    def writable_len(self) -> int:
+        return self.__capacity - self.readable_len()
+
+    @property
+    def consumer_idle(self) -> bool:
+        return self.__shm.buf[self.CONSUMER_IDLE_OFFSET] != 0
+
+    @consumer_idle.setter
+    def consumer_idle(self, idle: bool) -> None:
+        self.__shm.buf[self.CONSUMER_IDLE_OFFSET] = 1 if idle else 0
+
+    @property
+    def producer_blocked(self) -> bool:
+        return self.__shm.buf[self.PRODUCER_BLOCKED_OFFSET] != 0
+
+    @producer_blocked.setter
+    def producer_blocked(self, blocked: bool) -> None:
+        self.__shm.buf[self.PRODUCER_BLOCKED_OFFSET] = 1 if blocked else 0
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        """生产者写入尽可能多的数据, 返回写入的字节数"""
+        head = self.__get(self.HEAD_OFFSET)
+        length = min(len(data), self.__capacity -
+                     (head - self.__get(self.TAIL_OFFSET)))
+        if length <= 0:
+            return 0
+        buf = self.__shm.buf
+        start = head % self.__capacity
+        first = min(length, self.__capacity - start)
+        begin = self.DATA_OFFSET + start
+        buf[begin: begin + first] = data[:first]
+        if first < length:
+            buf[self.DATA_OFFSET: self.DATA_OFFSET + length - first] = data[first:length]
+        self.__set(self.HEAD_OFFSET, head + length)
+        return length
+
+    def read_into(self, out: memoryview) -> int:
+        """消费者把数据拷贝到out中, 返回读取的字节数"""
+        tail = self.__get(self.TAIL_OFFSET)
+        length = min(len(out), self.__get(self.HEAD_OFFSET) - tail)
+        if length <= 0:
+            return 0
+        buf = self.__shm.buf
+        start = tail % self.__capacity
+        first = min(length, self.__capacity - start)
+        begin = self.DATA_OFFSET + start
+        out[:first] = buf[begin: begin + first]
+        if first < length:
+            out[first:length] = buf[self.DATA_OFFSET: self.DATA_OFFSET + length - first]
+        self.__set(self.TAIL_OFFSET, tail + length)
+        return length
+
+    def unlink(self) -> None:
+        if self.__owner:
+            self.__owner = False
+            _created.discard(self.__shm.name)
+            try:
+                self.__shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        self.unlink()
+        try:
+            self.__shm.close()
+        except BufferError:
+            pass
@@ -0,0 +1,273 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import asyncio
+from collections import deque
+from network.codec import Codec
+from utils import monkey_config
+from logger.logger import Logger
+from network.shm_ring import ShmRing
+from typing import Callable, Iterable, Type
+from network.socket_session import SocketSession
+from network.tcp_session import TcpSocketSession
+from network.tcp_protocol import TcpBufferedProtocol
+
+
+logger = Logger().get_logger('Monkey')
+
+
+class ShmProtocol(TcpBufferedProtocol):
+    """数据走一对共享内存环, unix socket只用于握手/唤醒/存活检测
+    握手: 客户端创建两个环并发送 HELLO c2s s2c\\n, 服务端attach后回复ACK, 客户端收到ACK后unlink
+    唤醒: 只有对端消费者空闲或生产者因环满阻塞时才写一个字节
+    生产者阻塞期间按POLL_INTERVAL轮询, 空闲时轮询间隔指数退避到POLL_MAX_INTERVAL, 只兜底丢失的唤醒"""
+
+    HELLO = b'MONKEYSHM'
+    ACK = b'\x00'
+    WAKEUP = b'\x01'
+    POLL_INTERVAL = 0.01
+    POLL_MAX_INTERVAL = 1.0
+
+    def __init__(
+            self,
+            on_connected: None | Callable[[TcpBufferedProtocol], None] = None,
+            rings: None | tuple[ShmRing, ShmRing] = None) -> None:
+        super().__init__()
+        self.__on_shm_connected = on_connected
+        self.__tx: None | ShmRing = rings[0] if rings else None
+        self.__rx: None | ShmRing = rings[1] if rings else None
+        self.__is_client = rings is not None
+        self.__acked = False
+        self.__hello = bytearray()
+        self.__control = bytearray(64)
+        self.__pending: deque[bytes | bytearray | memoryview] = deque()
+        self.__pending_bytes = 0
+        self.__drain_waiter: None | asyncio.Future = None
+        self.__poll_handle: None | asyncio.TimerHandle = None
+        self.__poll_interval = self.POLL_INTERVAL
+        self.__lost = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        super().connection_made(transport)
+        if self.__tx is not None and self.__rx is not None:
+            self.transport.write(b' '.join(
+                (self.HELLO, self.__tx.name.encode(), self.__rx.name.encode())) + b'\n')
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.__lost = True
+        super().connection_lost(exc)
+        if self.__poll_handle is not None:
+            self.__poll_handle.cancel()
+            self.__poll_handle = None
+        waiter = self.__drain_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(exc or ConnectionResetError('Connection lost'))
+        for ring in (self.__tx, self.__rx):
+            if ring is not None:
+                ring.close()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return memoryview(self.__control)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        if not self.__is_client and self.__rx is None:
+            self.__on_hello(self.__control[:nbytes])
+            if self.__rx is None:
+                return
+        elif self.__is_client and not self.__acked:
+            # 服务端已经attach, 共享内存文件可以删除了, 任何一方异常退出都不会泄漏
+            self.__acked = True
+            for ring in (self.__tx, self.__rx):
+                if ring is not None:
+                    ring.unlink()
+        self.__on_wakeup()
+
+    def __on_hello(self, data: bytearray) -> None:
+        self.__hello += data
+        index = self.__hello.find(b'\n')
+        if index < 0:
+            if len(self.__hello) > 256:
+                logger.error(
+                    f'ShmProtocol hello too long data:{bytes(self.__hello)}')
+                self.close()
+            return
+        try:
+            magic, c2s, s2c = bytes(self.__hello[:index]).split(b' ')
+            if magic != self.HELLO:
+                raise ValueError(f'magic:{magic}')
+            self.__rx = ShmRing.attach(c2s.decode())
+            self.__tx = ShmRing.attach(s2c.decode())
+        except Exception as e:
+            logger.error(
+                f'ShmProtocol hello error data:{bytes(self.__hello)} error:{e}')
+            self.close()
+            return
+        self.transport.write(self.ACK)
+        if self.__on_shm_connected is not None:
+            self.__on_shm_connected(self)
+
+    def __on_wakeup(self) -> bool:
+        written = self.__flush_pending()
+        return self.__drain_rx() > 0 or written > 0
+
+    def __poll(self) -> None:
+        self.__poll_handle = None
+        if self.__lost:
+            return
+        if self.__on_wakeup() or self.__pending:
+            self.__poll_interval = self.POLL_INTERVAL
+        else:
+            self.__poll_interval = min(
+                self.__poll_interval * 2, self.POLL_MAX_INTERVAL)
+        self.__schedule_poll()
+
+    def __schedule_poll(self) -> None:
+        if self.__poll_handle is None and not self.__lost:
+            self.__poll_handle = asyncio.get_running_loop().call_later(
+                self.__poll_interval, self.__poll)
+
+    def __poll_soon(self) -> None:
+        # 生产者阻塞时对端的唤醒可能因为标志位竞争丢失, 恢复快速轮询
+        self.__poll_interval = self.POLL_INTERVAL
+        if self.__poll_handle is not None and \
+                self.__poll_handle.when() - asyncio.get_running_loop().time() > self.POLL_INTERVAL:
+            self.__poll_handle.cancel()
+            self.__poll_handle = None
+        self.__schedule_poll()
+
+    @property
+    def poll_interval(self) -> float:
+        return self.__poll_interval
+
+    def __wakeup_peer(self) -> None:
+        if not self.__lost and not self.transport.is_closing():
+            self.transport.write(self.WAKEUP)
+
+    def __drain_rx(self) -> int:
+        rx = self.__rx
+        if rx is None or self.__lost:
+            return 0
+        max_size = monkey_config.get_config().tcp_buffer_max_size
+        buffer = self.buffer
+        received = 0
+        rx.consumer_idle = False
+        while True:
+            space = max_size - buffer.readable_len()
+            if space <= 0:
+                # session还没处理完, 不算空闲, 下次wait_readable时继续读
+                break
+            length = min(rx.readable_len(), space)
+            if length <= 0:
+                rx.consumer_idle = True
+                if rx.readable_len() == 0:
+                    break
+                rx.consumer_idle = False
+                continue
+            with buffer.reserve(length) as view:
+                length = rx.read_into(view[:length])
+            super().buffer_updated(length)
+            received += length
+        if received and rx.producer_blocked:
+            rx.producer_blocked = False
+            self.__wakeup_peer()
+        return received
+
+    def __flush_pending(self) -> int:
+        tx = self.__tx
+        if tx is None or not self.__pending:
+            return 0
+        written = 0
+        while self.__pending:
+            data = self.__pending[0]
+            length = tx.write(data)
+            written += length
+            self.__pending_bytes -= length
+            if length < len(data):
+                self.__pending[0] = data[length:]
+                tx.producer_blocked = True
+                self.__poll_soon()
+                break
+            self.__pending.popleft()
+        if written:
+            self.__notify_consumer(tx)
+        waiter = self.__drain_waiter
+        if not self.__pending and waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return written
+
+    def __notify_consumer(self, tx: ShmRing) -> None:
+        if tx.consumer_idle:
+            tx.consumer_idle = False
+            self.__wakeup_peer()
+
+    def __write(self, tx: ShmRing, data: bytes | bytearray | memoryview) -> None:
+        if self.__pending:
+            self.__pending.append(data)
+            self.__pending_bytes += len(data)
+            return
+        length = tx.write(data)
+        if length < len(data):
+            self.__pending.append(data[length:])
+            self.__pending_bytes += len(data) - length
+            tx.producer_blocked = True
+            self.__poll_soon()
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        self.writelines((data,))
+
+    def writelines(self, list_of_data: Iterable[bytes | bytearray | memoryview]) -> None:
+        tx = self.__tx
+        if tx is None or self.__lost:
+            raise ConnectionResetError('ShmProtocol not connected')
+        for data in list_of_data:
+            self.__write(tx, data)
+        self.__notify_consumer(tx)
+
+    async def wait_readable(self) -> bool:
+        self.__drain_rx()
+        self.__schedule_poll()
+        return await super().wait_readable()
+
+    def get_write_buffer_size(self) -> int:
+        return self.__pending_bytes
+
+    def get_write_buffer_limits(self) -> tuple[int, int]:
+        return 0, self.__tx.capacity if self.__tx is not None else 0
+
+    async def drain(self) -> None:
+        if self.__lost:
+            raise ConnectionResetError('Connection lost')
+        if not self.__pending:
+            return
+        self.__drain_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.__drain_waiter
+        finally:
+            self.__drain_waiter = None
+
+
+class ShmSocketSession(TcpSocketSession):
+    """同一台机器上网关与逻辑进程之间走共享内存环, 编解码/事件分发与TcpSocketSession完全相同"""
+
+    @staticmethod
+    def _format_address(peername: object) -> str:
+        return f'shm:{peername}' if peername else 'shm'
+
+    @classmethod
+    async def connect_shm(cls, path: str, codec_type: Type[Codec]) -> None | SocketSession:
+        ring_size = monkey_config.get_config().shm_ring_size
+        rings: list[ShmRing] = []
+        try:
+            rings.append(ShmRing.create(ring_size))
+            rings.append(ShmRing.create(ring_size))
+            _, protocol = await asyncio.get_running_loop().create_unix_connection(
+                lambda: ShmProtocol(rings=(rings[0], rings[1])), path=path)
+            return cls._new_client(codec_type, protocol, protocol)
+        except Exception as e:
+            logger.error(f'ShmSocketSession connect path:{path} error:{e}')
+            for ring in rings:
+                ring.close()
+            return None
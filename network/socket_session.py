@@ -11,6 +11,7 @@ from network.codec import Codec
 from utils import monkey_config
 from logger.logger import Logger
 from utils.singleton import Singleton
+from utils.timing_wheel import TimingWheel
 
 
 logger = Logger().get_logger('Monkey')
@@ -28,6 +29,11 @@ class SocketSession:
     def create_time(self) -> int:
         pass
 
+    @property
+    @abstractmethod
+    def last_active_time(self) -> float:
+        pass
+
     @abstractmethod
     def heart_beat(self, time_now: float) -> None:
         pass
@@ -73,12 +79,32 @@ class SocketSession:
     async def send(self, msg: object) -> None:
         pass
 
+    @abstractmethod
+    def send_nowait(self, msg: object) -> None:
+        pass
+
+    @abstractmethod
+    def pause_reading(self) -> None:
+        """暂停读取, 可以嵌套调用, 与resume_reading成对使用"""
+        pass
+
+    @abstractmethod
+    def resume_reading(self) -> None:
+        pass
+
+    @abstractmethod
+    def add_pending(self, count: int) -> None:
+        """记录该连接投递到邮箱中尚未处理的消息数, 超过高水位暂停读取, 低于低水位恢复"""
+        pass
+
 
 class SocketSessionManager(Singleton):
 
     def __init__(self):
         super().__init__()
         self._sessions: dict[int, SocketSession] = {}
+        # 按最近活跃时间+超时时间挂到时间轮上, gc时只检查到期的session
+        self._wheel: TimingWheel[int] = TimingWheel(now=time.time())
 
     def add_session(self, session: SocketSession) -> bool:
         session_id = session.session_id
@@ -87,6 +113,8 @@ class SocketSessionManager(Singleton):
                 f"SocketSessionManager add session {session_id} failed, already exists")
             return False
         self._sessions[session_id] = session
+        self._wheel.add(session_id, session.last_active_time +
+                        monkey_config.get_config().tcp_session_timeout)
         logger.info(
             f"SocketSessionManager add session SessionId:{session_id} RemoteAddress:{session.remote_address}")
         return True
@@ -97,6 +125,7 @@ class SocketSessionManager(Singleton):
                 f"SocketSessionManager remove session {session_id} failed, not exists")
             return
         session = self._sessions.pop(session_id)
+        self._wheel.remove(session_id)
         session.close()
         logger.info(
             f"SocketSessionManager remove session SessionId:{session_id} RemoteAddress:{session.remote_address}")
@@ -105,15 +134,24 @@ class SocketSessionManager(Singleton):
         """业务上持有session的地方,建议使用弱引用,否则会拉长session的生命周期"""
         return self._sessions.get(session_id, None)
 
-    async def _gc_loop(self):
+    def _gc_step(self, current_time: float) -> list[SocketSession]:
+        """只处理时间轮上到期的session, 期间有过数据的按新的活跃时间重新挂回时间轮"""
         deads: list[SocketSession] = []
+        timeout = monkey_config.get_config().tcp_session_timeout
+        for session_id in self._wheel.advance(current_time):
+            session = self._sessions.get(session_id, None)
+            if session is None:
+                continue
+            if session.is_dead(current_time):
+                deads.append(session)
+            else:
+                self._wheel.add(session_id, session.last_active_time + timeout)
+        for item in deads:
+            self.remove_session(item.session_id)
+            logger.warning(f"session {item.session_id} is dead")
+        return deads
+
+    async def _gc_loop(self):
         while True:
-            deads.clear()
-            current_time = time.time()
-            for item in self._sessions.values():
-                if item.is_dead(current_time):
-                    deads.append(item)
-            for item in deads:
-                self.remove_session(item.session_id)
-                logger.warning(f"session {item.session_id} is dead")
+            self._gc_step(time.time())
             await asyncio.sleep(monkey_config.get_config().socket_gc_interval)
@@ -0,0 +1,176 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import asyncio
+from utils import monkey_config
+from logger.logger import Logger
+from network.buffer import Buffer
+from typing import Any, Callable, Iterable, cast
+
+
+logger = Logger().get_logger('Monkey')
+
+
+class TcpBufferedProtocol(asyncio.BufferedProtocol):
+    """内核直接把数据读进session的Buffer, 同时提供TcpSocketSession需要的reader/writer接口"""
+
+    MIN_READ_SIZE = 256
+
+    def __init__(self, on_connected: None | Callable[['TcpBufferedProtocol'], None] = None) -> None:
+        super().__init__()
+        self.__on_connected = on_connected
+        self.__transport: None | asyncio.Transport = None
+        self.__buffer = Buffer(ring=True)
+        self.__read_size = monkey_config.get_config().tcp_buffer_size
+        self.__read_waiter: None | asyncio.Future = None
+        self.__drain_waiter: None | asyncio.Future = None
+        self.__has_data = False
+        self.__read_paused = False
+        self.__backpressure = False
+        self.__write_paused = False
+        self.__eof = False
+        self.__exception: None | Exception = None
+
+    @property
+    def buffer(self) -> Buffer:
+        return self.__buffer
+
+    @property
+    def transport(self) -> asyncio.Transport:
+        return cast(asyncio.Transport, self.__transport)
+
+    @property
+    def read_size(self) -> int:
+        return self.__read_size
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.__transport = cast(asyncio.Transport, transport)
+        if self.__on_connected is not None:
+            self.__on_connected(self)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.__eof = True
+        self.__exception = exc
+        self.__wakeup_reader()
+        waiter = self.__drain_waiter
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    def eof_received(self) -> bool | None:
+        # 对端半关闭时保持transport打开, Buffer中已经收到的帧处理完之后由session关闭
+        self.feed_eof()
+        return True
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.__buffer.reserve(self.__read_size)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.__buffer.has_write(nbytes)
+        self.__adjust_read_size(nbytes)
+        free_len = monkey_config.get_config().tcp_buffer_max_size - \
+            self.__buffer.readable_len()
+        if free_len < self.MIN_READ_SIZE and not self.__read_paused and self.__transport is not None:
+            # 缓冲区快满了, 等session消费之后再继续读
+            self.__read_paused = True
+            self.__transport.pause_reading()
+        self.__has_data = True
+        self.__wakeup_reader()
+
+    def __adjust_read_size(self, nbytes: int) -> None:
+        # 读满了说明对端发得快, 放大下次读的大小; 连续读不到四分之一则缩小, 避免空闲连接占用大块内存
+        if nbytes >= self.__read_size:
+            self.__read_size = min(
+                self.__read_size * 2, monkey_config.get_config().tcp_buffer_max_size)
+        elif nbytes < self.__read_size // 4:
+            self.__read_size = max(self.__read_size // 2, self.MIN_READ_SIZE)
+
+    def __wakeup_reader(self) -> None:
+        waiter = self.__read_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def pause_reading(self) -> None:
+        """上层处理不过来时暂停读取, 与缓冲区满引起的暂停分开记录"""
+        if self.__backpressure:
+            return
+        self.__backpressure = True
+        if not self.__read_paused and self.__transport is not None:
+            self.__transport.pause_reading()
+
+    def resume_reading(self) -> None:
+        if not self.__backpressure:
+            return
+        self.__backpressure = False
+        if not self.__read_paused and self.__transport is not None:
+            self.__transport.resume_reading()
+
+    async def wait_readable(self) -> bool:
+        """等待新数据写入Buffer, 连接已关闭返回False"""
+        if self.__read_paused and not self.__backpressure and self.__transport is not None:
+            self.__read_paused = False
+            self.__transport.resume_reading()
+        if not self.__has_data and not self.__eof:
+            self.__read_waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.__read_waiter
+            finally:
+                self.__read_waiter = None
+        has_data = self.__has_data
+        self.__has_data = False
+        return has_data
+
+    def feed_eof(self) -> None:
+        self.__eof = True
+        self.__wakeup_reader()
+
+    def at_eof(self) -> bool:
+        return self.__eof and self.__buffer.readable_len() == 0
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        if self.__transport is None:
+            return default
+        return self.__transport.get_extra_info(name, default)
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        self.transport.write(data)
+
+    def writelines(self, list_of_data: Iterable[bytes | bytearray | memoryview]) -> None:
+        self.transport.writelines(list_of_data)
+
+    def get_write_buffer_size(self) -> int:
+        return self.transport.get_write_buffer_size()
+
+    def get_write_buffer_limits(self) -> tuple[int, int]:
+        return self.transport.get_write_buffer_limits()
+
+    def pause_writing(self) -> None:
+        self.__write_paused = True
+
+    def resume_writing(self) -> None:
+        self.__write_paused = False
+        waiter = self.__drain_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def drain(self) -> None:
+        if self.__exception is not None:
+            raise self.__exception
+        if self.__eof and self.transport.is_closing():
+            raise ConnectionResetError('Connection lost')
+        if not self.__write_paused:
+            return
+        self.__drain_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.__drain_waiter
+        finally:
+            self.__drain_waiter = None
+
+    def close(self) -> None:
+        if self.__transport is not None:
+            self.__transport.close()
@@ -4,15 +4,23 @@ __time__ = '2024/08/15'
 __author__ = '虎小黑'
 
 
+import os
+import stat
+import errno
+import signal
+import socket
 import asyncio
 from network import session_id
 from network.codec import Codec
 from utils import monkey_config
 from logger.logger import Logger
-from typing import Coroutine, Type
+from typing import Awaitable, Callable, Coroutine, Type
 from utils.singleton import Singleton
 from network.codec_manager import CodecManager
 from network.tcp_session import TcpSocketSession
+from network.unix_session import UnixSocketSession
+from network.shm_session import ShmProtocol, ShmSocketSession
+from network.tcp_protocol import TcpBufferedProtocol
 
 
 logger = Logger().get_logger('Monkey')
@@ -28,32 +36,122 @@ class TcpServer(Singleton):
         except Exception as e:
             logger.error('uvloop install failed, error:%s', e)
         self.__loop = asyncio.get_event_loop()
+        self.__shutdown_handler: None | Callable[[], Awaitable] = None
 
     @classmethod
-    async def __handle_new_session(cls, codec: Codec, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
-        session = TcpSocketSession(
+    async def __handle_new_session(cls, codec: Codec, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, session_type: Type[TcpSocketSession] = TcpSocketSession) -> None:
+        session = session_type(
             session_id.new_session_id(), codec, reader, writer)
         await session.recv()
 
-    async def listen(self, host: str, port: int, codec_type: Type[Codec]) -> None:
+    @classmethod
+    def __handle_new_protocol(cls, codec: Codec, protocol: TcpBufferedProtocol, session_type: Type[TcpSocketSession] = TcpSocketSession) -> None:
+        session = session_type(
+            session_id.new_session_id(), codec, protocol, protocol)
+        asyncio.create_task(session.recv())
+
+    async def listen(self, host: str, port: int, codec_type: Type[Codec], buffered: bool = False, reuse_port: bool = False) -> bool:
         codec = CodecManager().get_codec(codec_type)
         if codec is None:
             logger.error(
                 f'TcpServer listen error Codec:{codec_type.code_id()} not found')
-            return
+            return False
 
         async def callback(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
             await self.__handle_new_session(codec, reader, writer)
 
+        def protocol_factory() -> TcpBufferedProtocol:
+            return TcpBufferedProtocol(lambda protocol: self.__handle_new_protocol(codec, protocol))
+
         try:
-            logger.info(f'TcpServer listen on {host}:{port}')
-            await asyncio.start_server(callback, host=host, port=port, limit=monkey_config.get_config().tcp_window_size)
+            logger.info(
+                f'TcpServer listen on {host}:{port} buffered:{buffered} reuse_port:{reuse_port}')
+            if buffered:
+                await self.__loop.create_server(protocol_factory, host=host, port=port, reuse_port=reuse_port or None)
+            else:
+                await asyncio.start_server(callback, host=host, port=port, limit=monkey_config.get_config().tcp_window_size, reuse_port=reuse_port or None)
+            return True
         except Exception as e:
             logger.error(
                 f'TcpServer listen on {host}:{port} failed, error:{e}')
+            return False
+
+    async def listen_unix(self, path: str, codec_type: Type[Codec], buffered: bool = False) -> None:
+        """在TCP监听之外再监听一个unix socket, 供同一台机器上的节点使用"""
+        codec = CodecManager().get_codec(codec_type)
+        if codec is None:
+            logger.error(
+                f'TcpServer listen_unix error Codec:{codec_type.code_id()} not found')
+            return
+
+        async def callback(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            await self.__handle_new_session(codec, reader, writer, UnixSocketSession)
+
+        def protocol_factory() -> TcpBufferedProtocol:
+            return TcpBufferedProtocol(lambda protocol: self.__handle_new_protocol(codec, protocol, UnixSocketSession))
+
+        try:
+            self.__remove_stale_socket(path)
+            logger.info(f'TcpServer listen_unix on {path} buffered:{buffered}')
+            if buffered:
+                await self.__loop.create_unix_server(protocol_factory, path=path)
+            else:
+                await asyncio.start_unix_server(callback, path=path, limit=monkey_config.get_config().tcp_window_size)
+        except Exception as e:
+            logger.error(f'TcpServer listen_unix on {path} failed, error:{e}')
+
+    async def listen_shm(self, path: str, codec_type: Type[Codec]) -> None:
+        """共享内存传输, path是用于握手和唤醒的unix socket"""
+        codec = CodecManager().get_codec(codec_type)
+        if codec is None:
+            logger.error(
+                f'TcpServer listen_shm error Codec:{codec_type.code_id()} not found')
+            return
+
+        def protocol_factory() -> ShmProtocol:
+            return ShmProtocol(lambda protocol: self.__handle_new_protocol(codec, protocol, ShmSocketSession))
+
+        try:
+            self.__remove_stale_socket(path)
+            logger.info(f'TcpServer listen_shm on {path}')
+            await self.__loop.create_unix_server(protocol_factory, path=path)
+        except Exception as e:
+            logger.error(f'TcpServer listen_shm on {path} failed, error:{e}')
+
+    @staticmethod
+    def __remove_stale_socket(path: str) -> None:
+        # 上次进程异常退出留下的socket文件需要先删除; 能连上说明还有进程在监听, 不能删除
+        if not os.path.exists(path) or not stat.S_ISSOCK(os.stat(path).st_mode):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(path)
+            except ConnectionRefusedError:
+                os.unlink(path)
+                logger.info(f'TcpServer remove stale socket path:{path}')
+                return
+        raise OSError(errno.EADDRINUSE, f'unix socket in use path:{path}')
 
     def create_task(self, co: Coroutine) -> None:
         self.__loop.create_task(co)
 
+    def set_shutdown_handler(self, handler: Callable[[], Awaitable]) -> None:
+        """收到SIGTERM时先执行handler(比如从membership注销)再停止事件循环"""
+        self.__shutdown_handler = handler
+
+    async def __shutdown(self) -> None:
+        try:
+            if self.__shutdown_handler is not None:
+                await self.__shutdown_handler()
+        except Exception as e:
+            logger.exception(f'TcpServer shutdown handler error:{e}')
+        finally:
+            self.__loop.stop()
+
     def run(self) -> None:
+        try:
+            self.__loop.add_signal_handler(
+                signal.SIGTERM, lambda: self.__loop.create_task(self.__shutdown()))
+        except (NotImplementedError, RuntimeError) as e:
+            logger.error(f'TcpServer add signal handler failed, error:{e}')
         self.__loop.run_forever()
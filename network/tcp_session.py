@@ -4,8 +4,10 @@ __time__ = '2024/08/15'
 __author__ = '虎小黑'
 
 
+import time
 import asyncio
-from typing import Type
+from typing import Type, cast
+from collections import deque
 from network import session_id
 from network.codec import Codec
 from utils import monkey_config
@@ -16,6 +18,7 @@ from message.rpc_message import RpcMessage
 from network.event_handler import EventHandler
 from network.codec_manager import CodecManager
 from network.socket_session import SocketSession
+from network.tcp_protocol import TcpBufferedProtocol
 
 
 logger = Logger().get_logger('Monkey')
@@ -23,23 +26,42 @@ logger = Logger().get_logger('Monkey')
 
 class TcpSocketSession(SocketSession):
 
-    def __init__(self, session_id: int, codec: Codec, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    def __init__(
+            self,
+            session_id: int,
+            codec: Codec,
+            reader: asyncio.StreamReader | TcpBufferedProtocol,
+            writer: asyncio.StreamWriter | TcpBufferedProtocol) -> None:
         super().__init__()
         self.__session_id = session_id
         self.__create_time = MonkeyTime.timestamp_sec()
-        self.__last_update_time = MonkeyTime.timestamp_sec()
-        self.__codec = codec
+        self.__last_update_time = time.time()
+        self.__codec = codec.fork()
         self.__is_client = False
         self.__reader = reader
         self.__writer = writer
-        peername = writer.get_extra_info('peername')
-        if peername is None:
-            self.__address = 'unknown'
+        self.__address = self._format_address(writer.get_extra_info('peername'))
+        if isinstance(reader, TcpBufferedProtocol):
+            self.__protocol: None | TcpBufferedProtocol = reader
+            self.__buffer = reader.buffer
         else:
-            self.__address = f'{peername[0]}:{peername[1]}'
-        self.__buffer = Buffer()
+            self.__protocol = None
+            self.__buffer = Buffer(ring=True)
         self.__user_data: None | object = None
         self.__stop = False
+        self.__send_frames: list[bytes] = []
+        self.__send_bytes = 0
+        self.__flush_handle: None | asyncio.Handle = None
+        self.__send_streams: deque[tuple[deque[bytes], None | asyncio.Future]] = deque()
+        self.__pump_task: None | asyncio.Task = None
+        self.__pause_count = 0
+        self.__read_gate = asyncio.Event()
+        self.__read_gate.set()
+        self.__pending = 0
+        self.__pending_paused = False
+        handshake = self.__codec.handshake()
+        if handshake:
+            self.__writer.write(handshake)
         EventHandler.process_income_socket(self)
 
     def __del__(self):
@@ -54,15 +76,20 @@ class TcpSocketSession(SocketSession):
         return self.__create_time
 
     @property
-    def heart_beat(self) -> int:
+    def last_active_time(self) -> float:
         return self.__last_update_time
 
-    @property
-    def is_dead(self) -> bool:
-        return self.__stop or MonkeyTime.timestamp_sec() - self.__last_update_time >= monkey_config.get_config().tcp_session_timeout
+    def heart_beat(self, time_now: float) -> None:
+        self.__last_update_time = time_now
+
+    def is_dead(self, current_time: float) -> bool:
+        return self.__stop or current_time - self.__last_update_time >= monkey_config.get_config().tcp_session_timeout
 
     @property
     def is_closed(self) -> bool:
+        if self.__protocol is not None:
+            # 连接断开后Buffer中已经收到的完整帧仍然要交给上层
+            return self.__stop or self.__protocol.at_eof()
         return self.__stop or self.__writer.transport.is_closing() or self.__reader.at_eof()
 
     @property
@@ -87,10 +114,15 @@ class TcpSocketSession(SocketSession):
     def close(self) -> None:
         if self.__stop:
             return
+        self.__flush()
         self.__stop = True
+        self.__read_gate.set()
         try:
+            self.__codec.close()
             self.__writer.close()
             self.__reader.feed_eof()
+            # 对端断开时缓冲区中常常留有半帧, 丢弃后归还bytearray
+            self.__buffer.release(force=True)
         except Exception as e:
             logger.error(
                 f'TcpSocketSession Close session_id:{self.__session_id} error:{e}')
@@ -98,18 +130,76 @@ class TcpSocketSession(SocketSession):
             logger.info(
                 f'TcpSocketSession Close session_id:{self.__session_id}')
 
+    def pause_reading(self) -> None:
+        self.__pause_count += 1
+        if self.__pause_count > 1:
+            return
+        self.__read_gate.clear()
+        try:
+            if self.__protocol is not None:
+                self.__protocol.pause_reading()
+            else:
+                self.__writer.transport.pause_reading()
+        except Exception as e:
+            logger.error(
+                f'TcpSocketSession pause_reading session_id:{self.__session_id} error:{e}')
+        logger.warning(
+            f'TcpSocketSession pause_reading session_id:{self.__session_id} pending:{self.__pending}')
+
+    def resume_reading(self) -> None:
+        if self.__pause_count <= 0:
+            return
+        self.__pause_count -= 1
+        if self.__pause_count > 0:
+            return
+        self.__read_gate.set()
+        try:
+            if self.__protocol is not None:
+                self.__protocol.resume_reading()
+            elif not self.__writer.transport.is_closing():
+                self.__writer.transport.resume_reading()
+        except Exception as e:
+            logger.error(
+                f'TcpSocketSession resume_reading session_id:{self.__session_id} error:{e}')
+        logger.info(
+            f'TcpSocketSession resume_reading session_id:{self.__session_id} pending:{self.__pending}')
+
+    def add_pending(self, count: int) -> None:
+        self.__pending += count
+        config = monkey_config.get_config()
+        if not self.__pending_paused and self.__pending >= config.session_pending_high_watermark:
+            self.__pending_paused = True
+            self.pause_reading()
+        elif self.__pending_paused and self.__pending <= config.session_pending_low_watermark:
+            self.__pending_paused = False
+            self.resume_reading()
+
+    @staticmethod
+    def _format_address(peername: object) -> str:
+        if not peername:
+            return 'unknown'
+        return f'{peername[0]}:{peername[1]}'
+
     @staticmethod
     def get_real_type(o: object) -> Type:
         if isinstance(o, RpcMessage):
             return o.meta.__class__
         return o.__class__
 
-    async def _recv_data(self) -> None | object:
+    async def _recv_data(self) -> None | list[object]:
         while not self.is_closed:
-            msg = self.codec.decode(self.__buffer)
-            if msg is not None:
-                return msg
-            self.__buffer.shrink()
+            msgs = self.codec.decode_many(self.__buffer)
+            if msgs:
+                return msgs
+            # 数据读空后等待期间不占用缓冲区, 大量空闲连接共享BufferPool中的内存
+            if not self.__buffer.release():
+                self.__buffer.shrink()
+            if self.__protocol is not None:
+                if not await self.__protocol.wait_readable():
+                    logger.error(
+                        f'TcpSocketSession recv data empty session_id:{self.__session_id}')
+                    return None
+                continue
             data = await self.__reader.read(1024)
             if not data or len(data) == 0:
                 logger.error(
@@ -121,12 +211,26 @@ class TcpSocketSession(SocketSession):
     async def recv(self) -> None | object:
         try:
             while not self.is_closed:
-                msg = await self._recv_data()
-                if msg is None:
+                if not self.__read_gate.is_set():
+                    await self.__read_gate.wait()
+                    continue
+                msgs = await self._recv_data()
+                if msgs is None:
                     logger.info(
                         f'TcpSocketSession recv session_id:{self.__session_id} recv None')
                     break
-                await EventHandler.process_socket_message(self, self.get_real_type(msg), msg)
+                # 只记录活跃时间, 超时检查由SocketSessionManager的时间轮在到期时进行
+                self.__last_update_time = time.time()
+                batch: list[tuple[Type, object]] = []
+                for msg in msgs:
+                    if isinstance(msg, RpcMessage) and msg.stream is not None:
+                        # 流式body要靠recv循环继续喂数据, 不能在这里等待处理函数
+                        asyncio.create_task(EventHandler.process_socket_message(
+                            self, self.get_real_type(msg), msg))
+                    else:
+                        batch.append((self.get_real_type(msg), msg))
+                if batch:
+                    await EventHandler.process_socket_messages(self, batch)
         except Exception as e:
             logger.exception(
                 f'TcpSocketSession recv session_id:{self.__session_id} error:{e}')
@@ -134,30 +238,126 @@ class TcpSocketSession(SocketSession):
         finally:
             EventHandler.process_close_socket(self.__session_id)
 
+    def __flush(self) -> None:
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+        if not self.__send_frames:
+            return
+        frames = self.__send_frames
+        self.__send_frames = []
+        self.__send_bytes = 0
+        if self.__stop:
+            return
+        try:
+            self.__writer.writelines(frames)
+        except Exception as e:
+            logger.error(
+                f'TcpSocketSession flush session_id:{self.__session_id} frames:{len(frames)} error:{e}')
+
+    def __queue_frame(self, data: bytes) -> None:
+        # 同一轮事件循环中产生的帧合并成一次writelines
+        self.__send_frames.append(data)
+        self.__send_bytes += len(data)
+        if self.__flush_handle is None:
+            self.__flush_handle = asyncio.get_running_loop().call_soon(self.__flush)
+
+    def __queue_chunks(self, chunks: list[bytes], wait: bool) -> None | asyncio.Future:
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future() if wait else None
+        self.__send_streams.append((deque(chunks), waiter))
+        if self.__pump_task is None:
+            self.__pump_task = loop.create_task(self.__pump_streams())
+        return waiter
+
+    async def __pump_streams(self) -> None:
+        # 每轮从正在发送的每个流各取一块, 与期间排队的小消息一起写出, 多个大消息和小消息交错发送
+        # 同时发送的流不超过rpc_max_streams, 其余的排在后面, 避免超过对端的上限
+        try:
+            while self.__send_streams and not self.__stop:
+                active = min(len(self.__send_streams),
+                             monkey_config.get_config().rpc_max_streams)
+                streams = [self.__send_streams.popleft() for _ in range(active)]
+                for chunks, _ in streams:
+                    data = chunks.popleft()
+                    self.__send_frames.append(data)
+                    self.__send_bytes += len(data)
+                self.__send_streams.extendleft(
+                    reversed([stream for stream in streams if stream[0]]))
+                self.__flush()
+                for chunks, waiter in streams:
+                    if not chunks and waiter is not None and not waiter.done():
+                        waiter.set_result(None)
+                await self.__writer.drain()
+                # drain在未超过高水位时不会让出, 这里让出一次, 其他协程排队的消息才能插进来
+                await asyncio.sleep(0)
+        except Exception as e:
+            logger.error(
+                f'TcpSocketSession pump_streams session_id:{self.__session_id} streams:{len(self.__send_streams)} error:{e}')
+        finally:
+            self.__pump_task = None
+            for _, waiter in self.__send_streams:
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(ConnectionResetError(
+                        f'TcpSocketSession closed session_id:{self.__session_id}'))
+            self.__send_streams.clear()
+
+    def send_nowait(self, msg: object) -> None:
+        try:
+            frames = self.codec.encode_frames(msg)
+            if len(frames) > 1:
+                self.__queue_chunks(frames, False)
+            else:
+                self.__queue_frame(frames[0])
+        except Exception as e:
+            logger.error(
+                f'TcpSocketSession send_nowait session_id:{self.__session_id} error:{e}')
+
     async def send(self, msg: object) -> None:
         try:
-            data = self.codec.encode(msg)
-            self.__writer.write(data)
-            await self.__writer.drain()
+            frames = self.codec.encode_frames(msg)
+            if len(frames) > 1:
+                # 分块的大消息由发送循环与其他消息交错写出, 全部写出后返回
+                await cast(asyncio.Future, self.__queue_chunks(frames, True))
+                return None
+            self.__queue_frame(frames[0])
+            writer = self.__protocol if self.__protocol is not None else self.__writer.transport
+            _, high_water = writer.get_write_buffer_limits()
+            if self.__send_bytes + writer.get_write_buffer_size() > high_water:
+                self.__flush()
+                await self.__writer.drain()
         except Exception as e:
             logger.error(
                 f'TcpSocketSession send session_id:{self.__session_id} error:{e}')
             return None
 
     @classmethod
-    async def connect(cls, host: str, port: int, codec_type: Type[Codec]) -> None | SocketSession:
+    def _new_client(
+            cls,
+            codec_type: Type[Codec],
+            reader: asyncio.StreamReader | TcpBufferedProtocol,
+            writer: asyncio.StreamWriter | TcpBufferedProtocol) -> None | SocketSession:
+        codec = CodecManager().get_codec(codec_type)
+        if codec is None:
+            logger.error(
+                f'{cls.__name__} connect codec not found:{codec_type.code_id()}')
+            writer.close()
+            return None
+        session = cls(session_id.new_session_id(), codec, reader, writer)
+        session.__is_client = True
+        asyncio.create_task(session.recv())
+        return session
+
+    @classmethod
+    async def connect(cls, host: str, port: int, codec_type: Type[Codec], buffered: bool = False) -> None | SocketSession:
         try:
-            reader, writer = await asyncio.open_connection(host=host, port=port, limit=monkey_config.get_config().tcp_window_size)
-            codec = CodecManager().get_codec(codec_type)
-            if codec is None:
-                logger.error(
-                    f'TcpSocketSession connect codec not found:{codec_type.code_id()}')
-                return None
-            session = TcpSocketSession(
-                session_id.new_session_id(), codec, reader, writer)
-            session.__is_client = True
-            asyncio.create_task(session.recv())
-            return session
+            if buffered:
+                _, protocol = await asyncio.get_running_loop().create_connection(
+                    TcpBufferedProtocol, host=host, port=port)
+                reader = writer = protocol
+            else:
+                reader, writer = await asyncio.open_connection(host=host, port=port, limit=monkey_config.get_config().tcp_window_size)
+            return cls._new_client(codec_type, reader, writer)
         except Exception as e:
             logger.error(
                 f'TcpSocketSession connect host:{host} port:{port} error:{e}')
@@ -0,0 +1,73 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import socket
+import asyncio
+import psutil
+from typing import Type
+from network.codec import Codec
+from utils import monkey_config
+from logger.logger import Logger
+from network.socket_session import SocketSession
+from network.tcp_session import TcpSocketSession
+from network.tcp_protocol import TcpBufferedProtocol
+
+
+logger = Logger().get_logger('Monkey')
+
+
+_local_addresses: None | set[str] = None
+
+
+def is_local_address(address: str) -> bool:
+    """address是否指向本机, 本机的节点优先走unix socket"""
+    global _local_addresses
+    if _local_addresses is None:
+        addresses = {'localhost', '127.0.0.1', '::1', socket.gethostname()}
+        try:
+            for interface_addresses in psutil.net_if_addrs().values():
+                for interface_address in interface_addresses:
+                    if interface_address.family in (socket.AF_INET, socket.AF_INET6):
+                        addresses.add(interface_address.address)
+        except Exception as e:
+            logger.error(f'is_local_address get net interfaces error:{e}')
+        _local_addresses = addresses
+    return address in _local_addresses
+
+
+class UnixSocketSession(TcpSocketSession):
+    """同一台机器上的节点之间通过unix domain socket通信, 协议与TcpSocketSession完全相同"""
+
+    def __init__(
+            self,
+            session_id: int,
+            codec: Codec,
+            reader: asyncio.StreamReader | TcpBufferedProtocol,
+            writer: asyncio.StreamWriter | TcpBufferedProtocol) -> None:
+        self.__path = writer.get_extra_info('sockname') or writer.get_extra_info('peername') or ''
+        super().__init__(session_id, codec, reader, writer)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @staticmethod
+    def _format_address(peername: object) -> str:
+        return f'unix:{peername}' if peername else 'unix'
+
+    @classmethod
+    async def connect_unix(cls, path: str, codec_type: Type[Codec], buffered: bool = False) -> None | SocketSession:
+        try:
+            if buffered:
+                _, protocol = await asyncio.get_running_loop().create_unix_connection(
+                    TcpBufferedProtocol, path=path)
+                reader = writer = protocol
+            else:
+                reader, writer = await asyncio.open_unix_connection(path=path, limit=monkey_config.get_config().tcp_window_size)
+            return cls._new_client(codec_type, reader, writer)
+        except Exception as e:
+            logger.error(f'UnixSocketSession connect path:{path} error:{e}')
+            return None
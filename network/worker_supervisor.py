@@ -0,0 +1,139 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import os
+import time
+import signal
+from utils import monkey_config
+from logger.logger import Logger
+from typing import Callable
+
+
+logger = Logger().get_logger('Monkey')
+
+
+WORKER_INDEX_ENV = 'MONKEY_WORKER_INDEX'
+
+
+def worker_index() -> int:
+    """当前进程的worker序号, 不是worker进程返回-1"""
+    return int(os.environ.get(WORKER_INDEX_ENV, '-1'))
+
+
+def worker_port(port: int) -> int:
+    """worker各自监听并注册到membership的rpc端口, port本身由所有worker通过reuse_port共享
+    配置了worker_port_base时从base开始分配, 否则紧跟在port之后"""
+    index = worker_index()
+    if index < 0:
+        return port
+    base = monkey_config.get_config().worker_port_base
+    return base + index if base > 0 else port + index + 1
+
+
+class WorkerSupervisor(object):
+    """fork出N个worker进程, 每个worker运行独立的事件循环/ActorManager/SocketSessionManager
+    必须在创建事件循环和各个Singleton之前调用run, supervisor本身不创建这些对象, 由worker_main(index)在worker进程中完成
+    默认的worker_main是membership.worker_server.WorkerServer: 共享对外端口, 监听各自的rpc端口并注册成独立的ServerNode
+    SIGINT由supervisor统一处理, worker忽略SIGINT, 只在收到supervisor转发的SIGTERM时注销并退出"""
+
+    def __init__(self, worker_main: Callable[[int], None], workers: int = 0) -> None:
+        self.__worker_main = worker_main
+        self.__workers = workers if workers > 0 else monkey_config.get_config().worker_count
+        self.__pids: dict[int, int] = {}
+        self.__restart_at: dict[int, float] = {}
+        self.__stopping = False
+        self.__stop_signal = 0
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def __spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.environ[WORKER_INDEX_ENV] = str(index)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                # 终端的Ctrl-C会发给整个进程组, worker等supervisor转发SIGTERM后再有序退出
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                self.__worker_main(index)
+            except BaseException as e:
+                logger.exception(
+                    f'WorkerSupervisor worker index:{index} pid:{os.getpid()} error:{e}')
+                code = 1
+            finally:
+                os._exit(code)
+        self.__pids[pid] = index
+        logger.info(f'WorkerSupervisor spawn worker index:{index} pid:{pid}')
+
+    def __on_stop(self, signum: int, _) -> None:
+        # 信号处理函数可能打断正在写日志的主循环, 日志的锁不可重入, 这里只记录信号, 由run中转发
+        if not self.__stopping:
+            self.__stop_signal = signum
+            self.__stopping = True
+
+    def __stop_workers(self) -> None:
+        logger.info(
+            f'WorkerSupervisor stopping signal:{self.__stop_signal} workers:{list(self.__pids.keys())}')
+        for pid in self.__pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def __reap(self, block: bool) -> None:
+        while self.__pids:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self.__pids.clear()
+                return
+            except InterruptedError:
+                return
+            if pid == 0:
+                return
+            index = self.__pids.pop(pid, None)
+            if index is None:
+                continue
+            logger.info(
+                f'WorkerSupervisor worker exit index:{index} pid:{pid} code:{os.waitstatus_to_exitcode(status)}')
+            if not self.__stopping:
+                # 异常退出的worker按重启间隔拉起, 避免启动即崩溃时空转
+                self.__restart_at[index] = time.monotonic() + \
+                    monkey_config.get_config().worker_restart_interval
+            if block:
+                return
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.__on_stop)
+        signal.signal(signal.SIGINT, self.__on_stop)
+        for index in range(self.__workers):
+            self.__spawn(index)
+        while not self.__stopping:
+            self.__reap(block=False)
+            now = time.monotonic()
+            for index, restart_at in list(self.__restart_at.items()):
+                if restart_at <= now and not self.__stopping:
+                    del self.__restart_at[index]
+                    self.__spawn(index)
+            time.sleep(0.2)
+
+        self.__stop_workers()
+        deadline = time.monotonic() + monkey_config.get_config().worker_shutdown_timeout
+        while self.__pids and time.monotonic() < deadline:
+            self.__reap(block=False)
+            time.sleep(0.1)
+        for pid in list(self.__pids):
+            logger.error(
+                f'WorkerSupervisor kill worker pid:{pid} shutdown timeout')
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self.__pids:
+            self.__reap(block=True)
+        logger.info('WorkerSupervisor stopped')
@@ -0,0 +1,141 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import unittest
+from actor import activity_table
+from actor.rpc_meta import RpcMeta
+from actor.actor_base import ActorBase
+from utils.singleton import SingletonMeta
+from actor.actor_context import ActorContext
+from actor.actor_manager import ActorManager
+from actor.activity_table import ActivityTable
+from utils.load_monitor import LoadMonitor
+from membership.membership_manager import MembershipManager
+
+
+class GcActor(ActorBase):
+
+    @property
+    def gc_time(self) -> int:
+        return 10
+
+
+RpcMeta.register_actor_impl(GcActor, GcActor)
+
+
+class ReleasePlacement(object):
+
+    def __init__(self) -> None:
+        self.released: list[tuple[str, str]] = []
+
+    def keep_alive_delay(self) -> int:
+        return 30
+
+    async def release_positions(self, actors: list[tuple[str, str]]) -> None:
+        self.released.extend(actors)
+
+
+class TestActivityTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.numpy = activity_table.numpy
+        SingletonMeta._instance.pop(ActivityTable, None)
+
+    def tearDown(self) -> None:
+        activity_table.numpy = self.numpy
+        SingletonMeta._instance.pop(ActivityTable, None)
+
+    def check_table(self, table: ActivityTable) -> None:
+        a = table.alloc('a', 10, 100)
+        b = table.alloc('b', 20, 100)
+        c = table.alloc('c', 10, 105)
+        assert (a, b, c) == (0, 1, 2)
+        assert len(table) == 3
+        # 超过初始容量时扩容, 已有槽位的时间不变
+        assert table.key(c) == 'c'
+        assert table.expired(109) == []
+        assert table.expired(110) == [a]
+        assert table.expired(120) == [a, b, c]
+
+        # 收到消息后重新计时
+        table.touch(a, 115)
+        assert table.expired(120) == [b, c]
+
+        # 释放的槽位不再到期, 下次分配时复用
+        table.free(b)
+        table.free(b)
+        assert len(table) == 2
+        assert table.key(b) is None
+        assert table.expired(1e18) == [a, c]
+        d = table.alloc('d', 5, 118)
+        assert d == b and table.key(d) == 'd'
+        assert table.expired(123) == [d, c]
+
+    def test_numpy(self):
+        if self.numpy is None:
+            self.skipTest('numpy not installed')
+        self.check_table(ActivityTable(capacity=2))
+
+    def test_list(self):
+        activity_table.numpy = None
+        self.check_table(ActivityTable(capacity=2))
+
+
+class TestActorManagerGc(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        for cls in (ActivityTable, ActorManager, MembershipManager):
+            SingletonMeta._instance.pop(cls, None)
+        self.weight = LoadMonitor().weight
+        self.placement = ReleasePlacement()
+        MembershipManager().set_placement(self.placement)
+
+    def tearDown(self) -> None:
+        for cls in (ActivityTable, ActorManager, MembershipManager):
+            SingletonMeta._instance.pop(cls, None)
+        LoadMonitor().add_weight(self.weight - LoadMonitor().weight)
+
+    def new_actor(self, actor_id: str) -> tuple[GcActor, ActorContext]:
+        actor = ActorManager().get_or_new(GcActor, actor_id)
+        assert isinstance(actor, GcActor)
+        context = ActorContext()
+        actor.init(context, None)
+        return actor, context
+
+    async def test_gc_actors(self):
+        idle, idle_context = self.new_actor('idle')
+        busy, busy_context = self.new_actor('busy')
+        now = idle_context.last_msg_time
+        ActivityTable().touch(busy_context.activity_slot, now + 5)
+        assert ActorManager().weight == 2
+
+        # 只有最近一次消息超过gc_time的actor被选中, 其他actor不受影响
+        assert await ActorManager().gc_actors(now + 9) == 0
+        assert await ActorManager().gc_actors(now + 10) == 1
+        assert ActorManager().get_actor(GcActor, 'idle') is None
+        assert ActorManager().get_actor(GcActor, 'busy') is busy
+        assert ActorManager().weight == 1
+        assert idle_context.activity_slot == -1
+        assert idle_context.mailbox_size == 1
+        assert len(ActivityTable()) == 1
+        # 销毁的actor释放位置
+        assert self.placement.released == [('GcActor', 'idle')]
+
+        assert await ActorManager().gc_actors(now + 15) == 1
+        assert ActorManager().get_actor(GcActor, 'busy') is None
+        assert len(ActivityTable()) == 0
+        assert self.placement.released == [('GcActor', 'idle'), ('GcActor', 'busy')]
+
+    async def test_gc_orphan_slot(self):
+        # 没有对应actor的槽位到期后直接释放
+        slot = ActivityTable().alloc('GcActor:orphan', 10, 0)
+        assert await ActorManager().gc_actors(10) == 0
+        assert ActivityTable().key(slot) is None
+        assert len(ActivityTable()) == 0
+        assert self.placement.released == []
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import gc
+import weakref
+import unittest
+from utils import monkey_config
+from message.message import GCActor, RequestHeartBeat
+from message.rpc_message import RpcErrorCode, RpcRequest, RpcResponse
+from actor.actor_context import ActorContext
+from utils.load_monitor import LoadMonitor
+from actor.actor_message_loop import ActorMessageLoop
+
+
+class MailboxConfig(monkey_config.DefaultMonkeyConfig):
+
+    @property
+    def mailbox_high_watermark(self) -> int:
+        return 3
+
+    @property
+    def mailbox_low_watermark(self) -> int:
+        return 1
+
+
+class FakeSession(object):
+
+    def __init__(self, session_id: int) -> None:
+        self.session_id = session_id
+        self.pending = 0
+        self.pause_count = 0
+        self.sent: list[object] = []
+
+    @property
+    def is_closed(self) -> bool:
+        return False
+
+    async def send(self, msg: object) -> None:
+        self.sent.append(msg)
+
+    def add_pending(self, count: int) -> None:
+        self.pending += count
+
+    def pause_reading(self) -> None:
+        self.pause_count += 1
+
+    def resume_reading(self) -> None:
+        self.pause_count -= 1
+
+
+class FakeActor(object):
+
+    def __init__(self, context: ActorContext) -> None:
+        self.context = context
+        self.actor_id = '1'
+        self.messages: list[object] = []
+        self.active_error: None | Exception = None
+
+    @classmethod
+    def actor_type(cls) -> str:
+        return 'FakeActor'
+
+    async def active(self) -> None:
+        if self.active_error is not None:
+            raise self.active_error
+
+    async def deactive(self) -> None:
+        pass
+
+    async def dispatch_message(self, msg: object) -> None:
+        self.messages.append(msg)
+
+
+class TestActorContext(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        monkey_config.set_config_impl(MailboxConfig)
+        self.backlog = LoadMonitor().backlog
+
+    def tearDown(self) -> None:
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    async def test_watermark(self):
+        context = ActorContext()
+        session = FakeSession(1)
+        for i in range(5):
+            await context.push_message(GCActor(actor_id=str(i)), session)
+        # 达到高水位后暂停一次, 同一个连接不会重复暂停
+        assert session.pending == 5 and session.pause_count == 1
+        assert LoadMonitor().backlog == self.backlog + 5
+        for _ in range(3):
+            await context.pop_message()
+        assert session.pending == 2 and session.pause_count == 1
+        await context.pop_message()
+        assert session.pending == 1 and session.pause_count == 0
+        await context.pop_message()
+        assert LoadMonitor().backlog == self.backlog
+
+    async def test_drain(self):
+        context = ActorContext()
+        sessions = [FakeSession(1), FakeSession(2)]
+        for i in range(8):
+            await context.push_message(GCActor(actor_id=str(i)), sessions[i % 2])
+        assert [session.pause_count for session in sessions] == [1, 1]
+        assert len(context.drain()) == 8
+        assert [(session.pending, session.pause_count) for session in sessions] == [(0, 0), (0, 0)]
+        assert context.mailbox_size == 0
+        assert LoadMonitor().backlog == self.backlog
+
+        # context销毁时同样归还
+        context = ActorContext()
+        for i in range(4):
+            await context.push_message(GCActor(actor_id=str(i)), sessions[0])
+        del context
+        gc.collect()
+        assert (sessions[0].pending, sessions[0].pause_count) == (0, 0)
+        assert LoadMonitor().backlog == self.backlog
+
+    async def test_loop_exit(self):
+        context = ActorContext()
+        session = FakeSession(1)
+        actor = FakeActor(context)
+        await context.push_message(GCActor(actor_id='0'), session)
+        for i in range(4):
+            await context.push_message(GCActor(actor_id=str(i + 1)), session)
+        request = RpcRequest(request_id=7, server_name='FakeActor', actor_id='1')
+        await context.push_message((weakref.ref(session), request), session)
+        assert session.pause_count == 1
+        # 收到GCActor后退出, 剩余的消息被丢弃并恢复连接, rpc请求回复错误
+        await ActorMessageLoop.dispatch_actor_message_in_loop(actor)
+        assert (session.pending, session.pause_count) == (0, 0)
+        assert context.mailbox_size == 0 and context.loop_id == 0
+        assert LoadMonitor().backlog == self.backlog
+        assert len(session.sent) == 1
+        resp = session.sent[0]
+        assert isinstance(resp, RpcResponse)
+        assert resp.request_id == 7 and resp.error_code == RpcErrorCode.ActorNotRunning
+
+    async def test_active_failed(self):
+        context = ActorContext()
+        session = FakeSession(1)
+        actor = FakeActor(context)
+        actor.active_error = RuntimeError('active failed')
+        for i in range(4):
+            await context.push_message(RequestHeartBeat(now_sec=i), session)
+        assert session.pause_count == 1
+        # 激活失败时消息保留在邮箱中, 只释放连接的背压
+        await ActorMessageLoop.dispatch_actor_message_in_loop(actor)
+        assert (session.pending, session.pause_count) == (0, 0)
+        assert context.mailbox_size == 4 and context.loop_id == 0
+        assert LoadMonitor().backlog == self.backlog + 4
+
+        # 下一次消息循环处理保留的消息, 不再重复归还连接的计数
+        actor.active_error = None
+        await context.push_message(GCActor(actor_id='0'), session)
+        await ActorMessageLoop.dispatch_actor_message_in_loop(actor)
+        assert [msg.now_sec for msg in actor.messages] == [0, 1, 2, 3]
+        assert (session.pending, session.pause_count) == (0, 0)
+        assert context.mailbox_size == 0
+        assert LoadMonitor().backlog == self.backlog
+
+if __name__ == '__main__':
+    unittest.main()
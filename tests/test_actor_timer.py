@@ -0,0 +1,120 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import time
+import asyncio
+import weakref
+import unittest
+from utils.singleton import SingletonMeta
+from actor.actor_timer import ActorTimer, ActorTimerBatch, ActorTimerManager, TimerScheduler
+
+
+class FakeContext(object):
+
+    def __init__(self) -> None:
+        self.messages: list[ActorTimer | ActorTimerBatch] = []
+
+    async def push_message(self, msg: ActorTimer | ActorTimerBatch) -> None:
+        self.messages.append(msg)
+        msg.tick()
+
+
+class FakeActor(object):
+
+    def __init__(self) -> None:
+        self.context = FakeContext()
+        self.ticks: list[str] = []
+
+    def on_timer(self, name: str) -> None:
+        self.ticks.append(name)
+
+
+class TestActorTimer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        SingletonMeta._instance.pop(TimerScheduler, None)
+
+    def tearDown(self) -> None:
+        SingletonMeta._instance.pop(TimerScheduler, None)
+
+    async def test_schedule(self):
+        actor = FakeActor()
+        manager = ActorTimerManager(weakref.ref(actor))
+        timer = manager.register_timer(0, 0.02, 2, FakeActor.on_timer, actor, 'a')
+        assert len(TimerScheduler()) == 1
+        await asyncio.sleep(0.15)
+        assert actor.ticks == ['a', 'a']
+        assert timer.tick_cnt == 2 and timer.is_cancel
+        assert len(TimerScheduler()) == 0
+
+    async def test_coalesce(self):
+        actor = FakeActor()
+        other = FakeActor()
+        manager = ActorTimerManager(weakref.ref(actor))
+        other_manager = ActorTimerManager(weakref.ref(other))
+        # 固定注册时的时间, 保证三个定时器落在时间轮的同一格
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        loop.time = lambda: now
+        try:
+            manager.register_timer(0.02, 0, 1, FakeActor.on_timer, actor, 'a')
+            manager.register_timer(0.02, 0, 1, FakeActor.on_timer, actor, 'b')
+            other_manager.register_timer(0.02, 0, 1, FakeActor.on_timer, other, 'c')
+        finally:
+            del loop.time
+        await asyncio.sleep(0.1)
+        # 同一轮到期的两个定时器合并成一条消息
+        assert len(actor.context.messages) == 1
+        assert isinstance(actor.context.messages[0], ActorTimerBatch)
+        assert sorted(actor.ticks) == ['a', 'b']
+        assert len(other.context.messages) == 1
+        assert isinstance(other.context.messages[0], ActorTimer)
+        assert other.ticks == ['c']
+
+    async def test_cancel(self):
+        actor = FakeActor()
+        manager = ActorTimerManager(weakref.ref(actor))
+        timer = manager.register_timer(0.02, 0.02, 0, FakeActor.on_timer, actor, 'a')
+        manager.register_timer(0.02, 0.02, 0, FakeActor.on_timer, actor, 'b')
+        assert len(TimerScheduler()) == 2
+        timer.cancel()
+        assert len(TimerScheduler()) == 1
+        await asyncio.sleep(0.05)
+        assert 'a' not in actor.ticks and 'b' in actor.ticks
+        manager.unregister_all_timer()
+        assert len(TimerScheduler()) == 0
+
+    async def test_expire(self):
+        actor = FakeActor()
+        manager = ActorTimerManager(weakref.ref(actor))
+        timer = manager.register_timer(0.02, 0.02, 0, FakeActor.on_timer, actor, 'a')
+        actor.context = None
+        await asyncio.sleep(0.05)
+        # actor失去context后到期的定时器从manager中移除, 不再调度
+        assert timer.is_cancel and timer.tick_cnt == 0
+        assert len(TimerScheduler()) == 0
+
+    async def test_idle_gap(self):
+        actor = FakeActor()
+        manager = ActorTimerManager(weakref.ref(actor))
+        manager.register_timer(0.02, 0, 1, FakeActor.on_timer, actor, 'a')
+        await asyncio.sleep(0.1)
+        assert actor.ticks == ['a'] and len(TimerScheduler()) == 0
+        # 驱动协程退出后空闲一天, 再注册的定时器不需要逐格追赶空闲期间的tick
+        loop = asyncio.get_running_loop()
+        loop_time = loop.time
+        loop.time = lambda: loop_time() + 86400
+        try:
+            begin = time.perf_counter()
+            manager.register_timer(0.02, 0, 1, FakeActor.on_timer, actor, 'b')
+            await asyncio.sleep(0.1)
+            assert actor.ticks == ['a', 'b']
+            assert time.perf_counter() - begin < 1
+        finally:
+            del loop.time
+
+
+if __name__ == '__main__':
+    unittest.main()
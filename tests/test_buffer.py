@@ -6,6 +6,8 @@ __author__ = '虎小黑'
 import unittest
 from utils import monkey_config
 from network.buffer import Buffer
+from network.shm_ring import ShmRing
+from network.buffer_pool import BufferPool
 
 
 class TestBuffer(unittest.TestCase):
@@ -31,3 +33,89 @@ class TestBuffer(unittest.TestCase):
 
         with self.assertRaises(BufferError):
             buf.append(b'b')
+
+    def test_ring_buffer(self):
+        buf = Buffer(ring=True)
+        assert buf.is_ring
+
+        buf.append(b'hello world')
+        data = buf.read(5)
+        assert isinstance(data, memoryview)
+        assert data == b'hello'
+        data.release()
+
+        # 回绕之前shrink不会搬移数据
+        buf.shrink()
+        assert buf.readable_len() == 6
+        assert buf.writable_len() == monkey_config.get_config().tcp_buffer_size - 11
+
+        buf.append(b'x' * buf.writable_len())
+        # 写满后再写入会先把未读数据搬回头部, 而不是扩容
+        buf.append(b'y' * 5)
+        assert buf.readable_len() == monkey_config.get_config().tcp_buffer_size
+        assert buf.slice(6) == b' world'
+
+        buf.read()
+        buf.shrink()
+        assert buf.readable_len() == 0
+        assert buf.writable_len() == monkey_config.get_config().tcp_buffer_size
+
+    def test_buffer_pool(self):
+        pool = BufferPool()
+        size = monkey_config.get_config().tcp_buffer_size
+        assert pool.size_class(1) == size
+        assert pool.size_class(size + 1) == size * 2
+        assert pool.size_class(monkey_config.get_config().tcp_buffer_max_size + 1) == 0
+
+        buf = Buffer()
+        buf.append(b'a' * (size + 1))
+        assert buf.capacity() == size * 2
+        assert not buf.release()
+
+        buf.read()
+        pinned = pool.stats()['bytes_pinned']
+        assert buf.release()
+        assert buf.capacity() == 0
+        assert pool.stats()['bytes_pinned'] == pinned - size * 2
+
+        # 释放之后再写入会重新从池中借用
+        hits = pool.stats()['hits']
+        buf.append(b'hello')
+        assert buf.read() == b'hello'
+        assert pool.stats()['hits'] == hits + 1
+
+        # 强制释放丢弃未读的数据, 同样归还bytearray
+        buf.append(b'partial')
+        pinned = pool.stats()['bytes_pinned']
+        assert buf.release(force=True)
+        assert buf.readable_len() == 0
+        assert pool.stats()['bytes_pinned'] == pinned - size
+
+        # 回收时即使还有未读的数据也归还bytearray
+        buf.append(b'partial')
+        pinned = pool.stats()['bytes_pinned']
+        del buf
+        assert pool.stats()['bytes_pinned'] == pinned - size
+
+    def test_shm_ring(self):
+        producer = ShmRing.create(16)
+        consumer = ShmRing.attach(producer.name)
+        try:
+            assert producer.write(b'0123456789') == 10
+            out = memoryview(bytearray(16))
+            assert consumer.read_into(out[:6]) == 6
+            assert out[:6] == b'012345'
+
+            # 写入跨过环尾部回绕到头部
+            assert producer.write(b'abcdefghijklmn') == 12
+            assert producer.writable_len() == 0
+            assert consumer.readable_len() == 16
+            assert consumer.read_into(out) == 16
+            assert out == b'6789abcdefghijkl'
+            assert consumer.read_into(out) == 0
+
+            consumer.consumer_idle = True
+            assert producer.consumer_idle
+        finally:
+            consumer.close()
+            producer.close()
@@ -4,22 +4,44 @@ __time__ = '2024/09/04'
 __author__ = '虎小黑'
 
 
+import asyncio
 import unittest
-from message.message import RequestHeartBeat
-from message.rpc_message import RpcMessage, RpcRequest
+from dataclasses import dataclass
+from message.base import JsonMessage
+from message.message import RequestHeartBeat, RpcHandshake
+from message.rpc_message import RpcErrorCode, RpcMessage, RpcRequest, RpcResponse
 from network.buffer import Buffer
 from network.codec_rpc import CodecRpc
 from network.codec_echo import CodecEcho
 from network.codec_manager import CodecManager
 from utils import utils
+from utils import monkey_config
+from utils.singleton import SingletonMeta
+from utils.compression import Compression, train_dictionary
 from logger.logger import Logger
 
 
 logger = Logger().get_logger('Monkey')
 
 
+@dataclass(slots=True)
+class UploadRequest(JsonMessage):
+    name: str = ''
+
+
 class TestCodec(unittest.TestCase):
 
+    def setUp(self) -> None:
+        # 压缩阈值和字典保存在进程级的Compression中, 用例使用新实例, 结束后还原
+        self.compression = SingletonMeta._instance.pop(Compression, None)
+
+    def tearDown(self) -> None:
+        # 流式类型是类级别的注册, 不能影响其他用例
+        CodecRpc.unregister_stream_model(UploadRequest)
+        SingletonMeta._instance.pop(Compression, None)
+        if self.compression is not None:
+            SingletonMeta._instance[Compression] = self.compression
+
     def test_codec_echo(self):
         codec = CodecManager().get_codec(CodecEcho)
         if codec is None:
@@ -50,3 +72,239 @@ class TestCodec(unittest.TestCase):
         assert isinstance(msg, RpcMessage)
         assert isinstance(msg.meta, RpcRequest)
         assert request.to_dict() == msg.meta.to_dict()
+
+    def test_codec_rpc_decode_many(self):
+        codec = CodecManager().get_codec(CodecRpc)
+        if codec is None:
+            self.fail('CodecRpc not found')
+
+        data = b''.join(codec.encode(RpcMessage.from_msg(
+            RequestHeartBeat(now_sec=i), b'body' * i)) for i in range(3))
+        buf = Buffer.from_bytes(data[:-1])
+        msgs = codec.decode_many(buf)
+        assert len(msgs) == 2
+        for i, msg in enumerate(msgs):
+            assert isinstance(msg, RpcMessage)
+            assert isinstance(msg.meta, RequestHeartBeat)
+            assert msg.meta.now_sec == i
+            assert msg.body == b'body' * i
+        assert codec.decode_many(buf) == []
+
+        buf.append(data[-1:])
+        msgs = codec.decode_many(buf)
+        assert len(msgs) == 1
+        assert buf.readable_len() == 0
+
+    def test_codec_rpc_handshake(self):
+        codec = CodecManager().get_codec(CodecRpc)
+        if codec is None:
+            self.fail('CodecRpc not found')
+
+        client = codec.fork()
+        server = codec.fork()
+        assert client is not codec and server is not codec
+
+        msg = RequestHeartBeat(now_sec=10)
+        by_name = client.encode(msg)
+        handshake = client.handshake()
+        assert handshake
+        # 收到对端握手之前仍按名字编码, 没有注册RpcHandshake的旧版本对端也能解析
+        assert client.encode(msg) == by_name
+        server_handshake = server.handshake()
+        assert server_handshake
+        client.decode_many(Buffer.from_bytes(server_handshake))
+        by_id = client.encode(msg)
+        assert len(by_id) < len(by_name)
+
+        buf = Buffer.from_bytes(handshake + by_name + by_id)
+        msgs = server.decode_many(buf)
+        assert len(msgs) == 2
+        for item in msgs:
+            assert isinstance(item, RpcMessage)
+            assert isinstance(item.meta, RequestHeartBeat)
+            assert item.meta.now_sec == 10
+
+        # 先收到对端握手时, 发出本端握手后立即按类型id编码
+        other = codec.fork()
+        other.decode_many(Buffer.from_bytes(server_handshake))
+        assert other.encode(msg) == by_name
+        assert other.handshake()
+        assert other.encode(msg) == by_id
+
+    def test_codec_rpc_binary_meta(self):
+        client = CodecRpc(binary_meta=True)
+        server = CodecRpc()
+        assert client.fork().binary_meta
+
+        response = RpcResponse(
+            request_id=1001,
+            error_code=RpcErrorCode.TimeoutError,
+            error_str='timeout')
+        json_data = server.encode(response)
+        binary_data = client.encode(response)
+        assert len(binary_data) < len(json_data)
+
+        handshake = client.handshake()
+        assert handshake
+        buf = Buffer.from_bytes(binary_data + handshake + client.encode(response))
+        msgs = server.decode_many(buf)
+        assert len(msgs) == 2
+        for msg in msgs:
+            assert isinstance(msg, RpcMessage)
+            assert msg.meta == response
+
+    @staticmethod
+    def connect() -> tuple[CodecRpc, CodecRpc]:
+        # 客户端收到只声明分块能力的握手, 之后按分块发送且不压缩body
+        client = CodecRpc()
+        server = CodecRpc()
+        server.decode_many(Buffer.from_bytes(client.handshake() or b''))
+        client.decode_many(Buffer.from_bytes(server.encode(RpcHandshake(chunk=True))))
+        return client, server
+
+    @staticmethod
+    def split_frames(data: bytes) -> list[bytes]:
+        frames = []
+        offset = 0
+        while offset < len(data):
+            meta_len = int.from_bytes(
+                data[offset + CodecRpc.MAGIC_LEN: offset + CodecRpc.MAGIC_LEN + 4], 'little')
+            body_len = int.from_bytes(
+                data[offset + CodecRpc.MAGIC_LEN + 4: offset + CodecRpc.HEARD_LENGTH], 'little')
+            length = CodecRpc.HEARD_LENGTH + meta_len + body_len
+            frames.append(data[offset: offset + length])
+            offset += length
+        return frames
+
+    def test_codec_rpc_chunk(self):
+        client, server = self.connect()
+        first = client.encode(RpcMessage.from_msg(
+            RequestHeartBeat(now_sec=1), bytes(range(256)) * 40))
+        second = client.encode(RpcMessage.from_msg(
+            RpcResponse(request_id=2), b'x' * 30000))
+        first_frames = self.split_frames(first)
+        second_frames = self.split_frames(second)
+        assert len(first_frames) > 1 and len(second_frames) > len(first_frames)
+
+        # 两个消息的分块交错发送, 每次只送入1024字节, 缓冲区不会超过tcp_buffer_max_size
+        data = b''.join(second_frames[:2]) + b''.join(
+            a + b for a, b in zip(first_frames, second_frames[2:])) + b''.join(second_frames[2 + len(first_frames):])
+        buf = Buffer(ring=True)
+        msgs = []
+        for start in range(0, len(data), 1024):
+            buf.append(data[start: start + 1024])
+            msgs.extend(server.decode_many(buf))
+            buf.shrink()
+        assert len(msgs) == 2
+        assert isinstance(msgs[0].meta, RequestHeartBeat)
+        assert msgs[0].body == bytes(range(256)) * 40
+        assert isinstance(msgs[1].meta, RpcResponse)
+        assert msgs[1].meta.request_id == 2
+        assert msgs[1].body == b'x' * 30000
+
+    def test_codec_rpc_chunk_size(self):
+        # 未配置rpc_chunk_size时按tcp_buffer_max_size的一半分块
+        chunk_size = CodecRpc.chunk_size()
+        assert chunk_size == monkey_config.get_config().tcp_buffer_max_size // 2
+        client, _ = self.connect()
+        frames = client.encode_frames(RpcMessage.from_msg(
+            RpcResponse(request_id=1), b'x' * chunk_size * 3))
+        assert len(frames) > 3
+        assert all(len(frame) <= chunk_size for frame in frames)
+        assert len(client.encode_frames(RpcMessage.from_msg(
+            RpcResponse(request_id=1), b'x' * 16))) == 1
+
+    def test_codec_rpc_chunk_capability(self):
+        # 没有收到对端握手时不分块, 旧版本的对端不认识RpcChunk
+        client = CodecRpc()
+        server = CodecRpc()
+        body = b'x' * (CodecRpc.chunk_size() + 1024)
+        frames = client.encode_frames(RpcMessage.from_msg(RpcResponse(request_id=1), body))
+        assert len(frames) == 1
+        msgs = server.decode_many(Buffer.from_bytes(frames[0]))
+        assert len(msgs) == 1 and msgs[0].body == body
+
+        # 对端握手未声明分块能力时同样不分块
+        client.decode_many(Buffer.from_bytes(server.encode(RpcHandshake())))
+        assert len(client.encode_frames(RpcMessage.from_msg(RpcResponse(request_id=2), body))) == 1
+
+        # 对端的握手声明支持分块之后才分块
+        handshake = server.encode(RpcHandshake(chunk=True))
+        client.decode_many(Buffer.from_bytes(handshake))
+        assert len(client.encode_frames(RpcMessage.from_msg(RpcResponse(request_id=3), body))) > 1
+
+    def test_codec_rpc_max_streams(self):
+        client, server = self.connect()
+        max_streams = monkey_config.get_config().rpc_max_streams
+        streams = [client.encode_frames(RpcMessage.from_msg(
+            RpcResponse(request_id=i), b'x' * 30000)) for i in range(max_streams + 1)]
+        for frames in streams[:max_streams]:
+            assert server.decode_many(Buffer.from_bytes(frames[0])) == []
+        # 超过上限的新流直接拒绝, 已经打开的流不受影响
+        with self.assertRaises(ValueError):
+            server.decode_many(Buffer.from_bytes(streams[max_streams][0]))
+        msgs = []
+        for frame in streams[0][1:]:
+            msgs.extend(server.decode_many(Buffer.from_bytes(frame)))
+        assert len(msgs) == 1 and msgs[0].body == b'x' * 30000
+
+    def test_codec_rpc_chunk_stream(self):
+        CodecRpc.register_stream_model(UploadRequest)
+        client, server = self.connect()
+        body = bytes(range(256)) * 100
+        frames = self.split_frames(client.encode(RpcMessage.from_msg(
+            UploadRequest(name='upload'), body)))
+
+        buf = Buffer.from_bytes(frames[0])
+        msgs = server.decode_many(buf)
+        assert len(msgs) == 1
+        stream = msgs[0].stream
+        assert stream is not None and stream.size == len(body)
+        assert msgs[0].meta.name == 'upload'
+        for frame in frames[1:]:
+            buf.append(frame)
+            assert server.decode_many(buf) == []
+            buf.shrink()
+        assert asyncio.run(stream.read_all()) == body
+
+        # 取消注册后同样的分块拼完整之后才分发
+        CodecRpc.unregister_stream_model(UploadRequest)
+        msgs = []
+        for frame in client.encode_frames(RpcMessage.from_msg(UploadRequest(name='upload'), body)):
+            msgs.extend(server.decode_many(Buffer.from_bytes(frame)))
+        assert len(msgs) == 1 and msgs[0].stream is None and msgs[0].body == body
+
+    def test_codec_rpc_compress(self):
+        client = CodecRpc()
+        server = CodecRpc()
+        body = utils.pickle_dump(
+            ([{'name': f'player_{i}', 'level': i, 'items': [1, 2, 3]} for i in range(50)], {}), compress=False)
+        plain = client.encode(RpcMessage.from_msg(RpcRequest(), body))
+
+        buf = Buffer.from_bytes(server.handshake() or b'')
+        assert client.decode_many(buf) == []
+        compressed = client.encode(RpcMessage.from_msg(RpcRequest(), body))
+        assert len(compressed) < len(plain)
+
+        small = client.encode(RpcMessage.from_msg(RpcRequest(), b'small'))
+        msgs = server.decode_many(Buffer.from_bytes(compressed + small))
+        assert len(msgs) == 2
+        assert msgs[0].body == body
+        assert utils.pickle_load(msgs[0].body)[0][49]['name'] == 'player_49'
+        assert msgs[1].body == b'small'
+
+    def test_codec_rpc_compress_dictionary(self):
+        samples = [utils.pickle_dump({'request': i, 'server_name': 'IPlayerActor', 'method': f'update_{i % 7}', 'values': [i, i * 2]}, compress=False)
+                   for i in range(500)]
+        dict_id = Compression().add_dictionary(train_dictionary(samples, 1024 * 2))
+        assert dict_id in Compression().dict_ids()
+
+        client = CodecRpc()
+        server = CodecRpc()
+        Compression().set_threshold(RpcRequest.__qualname__, 32)
+        client.decode_many(Buffer.from_bytes(server.handshake() or b''))
+        body = utils.pickle_dump({'request': 1000, 'server_name': 'IPlayerActor', 'method': 'update_3', 'values': [1000, 2000]}, compress=False)
+        msgs = server.decode_many(Buffer.from_bytes(
+            client.encode(RpcMessage.from_msg(RpcRequest(), body))))
+        assert len(msgs) == 1
+        assert msgs[0].body == body
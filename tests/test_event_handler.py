@@ -0,0 +1,79 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import unittest
+from typing import Type
+from network.event_handler import EventHandler
+from network.socket_session import SocketSession
+
+
+class BatchMessage(object):
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+
+class AsyncMessage(BatchMessage):
+    pass
+
+
+class SyncMessage(BatchMessage):
+    pass
+
+
+class FakeSession(object):
+
+    session_id = 1
+
+
+calls: list[tuple[str, list[int]]] = []
+
+
+async def on_batch(_: SocketSession, __: Type, msgs: list[object]) -> None:
+    calls.append(('batch', [msg.value for msg in msgs]))
+
+
+async def on_async(_: SocketSession, __: Type, msg: object) -> None:
+    if msg.value < 0:
+        raise ValueError('negative')
+    calls.append(('async', [msg.value]))
+
+
+def on_sync(_: SocketSession, __: Type, msg: object) -> None:
+    calls.append(('sync', [msg.value]))
+
+
+class TestEventHandler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+        EventHandler.register_batch_handler(BatchMessage, on_batch)
+        EventHandler.register_hander(AsyncMessage, on_async)
+        EventHandler.register_hander(SyncMessage, on_sync)
+
+    def tearDown(self) -> None:
+        # 处理函数是进程级的注册, 不能影响其他用例
+        EventHandler.unregister_batch_handler(BatchMessage)
+        EventHandler.unregister_handler(AsyncMessage)
+        EventHandler.unregister_handler(SyncMessage)
+
+    async def test_process_socket_messages(self):
+        msgs = [BatchMessage(1), BatchMessage(2), AsyncMessage(3), SyncMessage(4),
+                SyncMessage(5), BatchMessage(6), AsyncMessage(-1), AsyncMessage(7), 'unknown']
+        await EventHandler.process_socket_messages(
+            FakeSession(), [(type(msg), msg) for msg in msgs])
+        # 连续的同类型消息合并成一次批量调用, 其余逐条分发, 顺序与到达顺序一致, 单条异常不影响后续
+        assert calls == [
+            ('batch', [1, 2]), ('async', [3]), ('sync', [4]), ('sync', [5]),
+            ('batch', [6]), ('async', [7])]
+
+    async def test_process_socket_message(self):
+        await EventHandler.process_socket_message(FakeSession(), SyncMessage, SyncMessage(1))
+        await EventHandler.process_socket_message(FakeSession(), AsyncMessage, AsyncMessage(2))
+        assert calls == [('sync', [1]), ('async', [2])]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import time
+import asyncio
+import unittest
+from utils import monkey_config
+from utils.singleton import SingletonMeta
+from utils.load_monitor import LoadMonitor
+
+
+class LoadConfig(monkey_config.DefaultMonkeyConfig):
+
+    @property
+    def load_backlog_factor(self) -> float:
+        return 0.5
+
+    @property
+    def load_lag_factor(self) -> float:
+        return 2
+
+
+class TestLoadMonitor(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        monkey_config.set_config_impl(LoadConfig)
+        SingletonMeta._instance.pop(LoadMonitor, None)
+
+    def tearDown(self) -> None:
+        SingletonMeta._instance.pop(LoadMonitor, None)
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    async def test_load(self):
+        monitor = LoadMonitor()
+        assert monitor.load == 0
+        # 权重和积压增量维护: load = weight + backlog * load_backlog_factor + lag毫秒 * load_lag_factor
+        monitor.add_weight(3)
+        monitor.add_backlog(5)
+        assert monitor.load == 5
+        monitor.add_weight(-1)
+        monitor.add_backlog(-1)
+        assert (monitor.weight, monitor.backlog) == (2, 4)
+        assert monitor.load == 4
+
+    async def test_lag(self):
+        monitor = LoadMonitor()
+        task = asyncio.create_task(monitor.sample_loop())
+        await asyncio.sleep(0)
+        # 阻塞事件循环, sleep的超时部分计入lag
+        time.sleep(0.8)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        lag = monitor.lag
+        assert 0.2 * LoadMonitor.LAG_SMOOTHING <= lag <= 0.8 * LoadMonitor.LAG_SMOOTHING
+        assert monitor.load == int(lag * 1000 * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import unittest
+from utils.lru import DictLRU, LRUCache
+
+
+class TestLRU(unittest.TestCase):
+
+    def test_dict_lru(self):
+        lru: DictLRU[int, int] = DictLRU(2)
+        lru.put(1, 1)
+        lru.put(2, 2)
+        assert lru.get(1) == 1
+        assert lru.get(1) == 1
+        lru.put(3, 3)
+        assert lru.keys() == [1, 3]
+        assert lru.pop(3) == 3
+        lru.put(4, 4)
+        lru.put(5, 5)
+        assert lru.keys() == [4, 5]
+        assert lru.get(0) is None
+
+    def test_lru_cache(self):
+        now = [0.0]
+        evicted = []
+        cache: LRUCache[str, bytes] = LRUCache(
+            max_size=3, max_weight=10, ttl=5, weigher=len,
+            on_evict=lambda k, v: evicted.append(k), clock=lambda: now[0])
+        cache.put('a', b'1234')
+        cache.put('b', b'1234')
+        assert cache.get('a') == b'1234'
+        cache.put('c', b'1234')
+        assert evicted == ['b'] and cache.weight == 8
+        cache.put('d', b'1', ttl=0)
+        cache.put('e', b'1')
+        assert evicted == ['b', 'a']
+        assert cache.get('x') is None
+
+        now[0] = 5
+        assert cache.get('c') is None
+        assert cache.expire() == 1
+        assert cache.keys() == ['d']
+        assert evicted == ['b', 'a', 'c', 'e']
+
+        cache.put('f', b'12')
+        assert cache.invalidate(lambda k, v: len(v) == 1) == 1
+        assert cache.keys() == ['f'] and cache.weight == 2
+        stats = cache.stats()
+        assert stats['hits'] == 1 and stats['misses'] == 2
+        assert stats['evictions'] == 2 and stats['expirations'] == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
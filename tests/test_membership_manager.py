@@ -0,0 +1,68 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import random
+import unittest
+from collections import Counter
+from utils.singleton import SingletonMeta
+from membership.membership_manager import MembershipManager
+
+
+class FakeNode(object):
+
+    def __init__(self, server_id: str, weight: int, available: bool = True) -> None:
+        self.server_id = server_id
+        self.weight = weight
+        self.is_available = available
+
+    def is_support(self, mate: str) -> bool:
+        return mate == 'Player'
+
+
+class TestMembershipManager(unittest.TestCase):
+
+    def setUp(self) -> None:
+        SingletonMeta._instance.pop(MembershipManager, None)
+        random.seed(20261018)
+
+    def tearDown(self) -> None:
+        SingletonMeta._instance.pop(MembershipManager, None)
+
+    def choose(self, times: int) -> Counter:
+        return Counter(MembershipManager().choose_member('Player').server_id for _ in range(times))
+
+    def test_power_of_two_choices(self):
+        manager = MembershipManager()
+        for index, weight in enumerate([0, 10, 20, 30]):
+            manager.add_member(FakeNode(f's{index}', weight))
+        counts = self.choose(6000)
+        # 两个不同节点中取负载低的, 负载最高的节点永远不会被选中
+        assert counts['s3'] == 0
+        assert counts['s0'] > counts['s1'] > counts['s2'] > 0
+        assert abs(counts['s0'] / 6000 - 0.5) < 0.05
+        assert manager.choose_member('Gate') is None
+
+    def test_tie_break(self):
+        manager = MembershipManager()
+        manager.add_member(FakeNode('s0', 5))
+        manager.add_member(FakeNode('s1', 5))
+        counts = self.choose(4000)
+        # 负载相同时取先抽到的节点, 不偏向成员顺序
+        assert abs(counts['s0'] / 4000 - 0.5) < 0.05
+
+        manager.update_member_load('s1', 1)
+        assert self.choose(100) == Counter({'s1': 100})
+
+    def test_unavailable(self):
+        manager = MembershipManager()
+        manager.add_member(FakeNode('s0', 0, available=False))
+        assert manager.choose_member('Player') is None
+        manager.add_member(FakeNode('s1', 100))
+        manager.add_member(FakeNode('s2', 100, available=False))
+        assert self.choose(100) == Counter({'s1': 100})
+
+
+if __name__ == '__main__':
+    unittest.main()
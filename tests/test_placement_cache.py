@@ -0,0 +1,38 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import unittest
+from membership.placement_cache import PlacementCache
+
+
+class TestPlacementCache(unittest.TestCase):
+
+    def test_placement_cache(self):
+        cache = PlacementCache(3, now=100)
+        cache.put('player:1', 'a', 110)
+        cache.put('player:2', 'b', 120)
+        cache.put('player:3', 'a', 130)
+        entry = cache.get('player:1')
+        assert entry is not None and entry.server_id == 'a'
+
+        cache.put('player:4', 'b', 140)
+        assert len(cache) == 3
+        assert 'player:2' not in cache
+
+        assert cache.remove_server('a') == 2
+        assert cache.get('player:1') is None
+        assert cache.get('player:3') is None
+        assert cache.remove_server('a') == 0
+
+        cache.put('player:5', 'c', 115)
+        assert cache.refresh('player:5', 150)
+        assert cache.expire(145) == 1
+        assert 'player:4' not in cache
+        assert cache.expire(150) == 1
+        assert len(cache) == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -86,3 +86,52 @@ class TestRedisPlacement(unittest.IsolatedAsyncioTestCase):
             assert False
 
         await client.close()
+
+    async def test_find_actor_positions_lua(self):
+        client = Redis.from_url('redis://localhost:6379/0')
+
+        pong: bool = await client.ping()
+        assert pong
+
+        await client.delete('player:10004', 'player:10005')
+        await client.set('player:10005', '20005')
+
+        async_script = client.register_script(
+            RedisScript.find_actor_positions_lua())
+        pipeline = client.pipeline(transaction=False)
+        await async_script(keys=['player:10004', 'player:10005'],
+                           args=[120, '10004', '10005'], client=pipeline)
+        await async_script(keys=['player:10004'],
+                           args=[120, '30004'], client=pipeline)
+        res = await pipeline.execute()
+        assert res == [[b'10004', b'20005'], [b'10004']]
+        assert await client.ttl('player:10004') > 0
+
+        await client.close()
+
+    async def test_find_actor_positions_lease_lua(self):
+        client = Redis.from_url('redis://localhost:6379/0')
+
+        pong: bool = await client.ping()
+        assert pong
+
+        await client.delete('player:10006', 'player:10007', 'test:lease:20006', 'test:lease:20007')
+        await client.set('test:lease:20006', 1, ex=30)
+        await client.set('player:10006', '20006')
+        await client.set('player:10007', '20007')
+
+        async_script = client.register_script(
+            RedisScript.find_actor_positions_lease_lua())
+        # 20006租约有效保留原归属, 20007没有租约时重新分配给候选节点
+        res = await async_script(keys=['player:10006', 'player:10007'],
+                                 args=['test:lease:', 600, '30006', '30007'])
+        assert res == [b'20006', b'30007']
+        assert await client.ttl('player:10007') > 540
+
+        await client.delete('test:lease:20006')
+        res = await async_script(keys=['player:10006'],
+                                 args=['test:lease:', 600, '30006'])
+        assert res == [b'30006']
+
+        await client.delete('player:10006', 'player:10007')
+        await client.close()
@@ -0,0 +1,219 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import asyncio
+import unittest
+from redis.asyncio import Redis
+from utils import monkey_config
+from utils.singleton import SingletonMeta
+from utils.load_monitor import LoadMonitor
+from network.event_handler import EventHandler
+from membership.redis_placement import RedisPlacement
+from message.message import RequestHeartBeat, ResponseHeartBeat
+from membership.membership_manager import MembershipManager
+
+
+ACTOR_TYPE = 'RedisPlacementTest'
+
+
+class PlacementConfig(monkey_config.DefaultMonkeyConfig):
+
+    @property
+    def placement_batch_size(self) -> int:
+        return 2
+
+    @property
+    def actor_keep_alive_time(self) -> int:
+        return 300
+
+
+class FakeSession(object):
+
+    is_closed = False
+
+    async def send(self, _: object) -> None:
+        pass
+
+
+class FakeNode(object):
+
+    def __init__(self, server_id: str) -> None:
+        self.server_id = server_id
+        self.weight = 0
+        self.is_healthy = True
+        self.is_available = True
+        self.session = FakeSession()
+
+    def is_support(self, mate: str) -> bool:
+        return mate == ACTOR_TYPE
+
+
+class HeartBeatSession(object):
+
+    session_id = 1
+
+    def __init__(self) -> None:
+        self.sent: list[object] = []
+
+    async def send(self, msg: object) -> None:
+        self.sent.append(msg)
+
+    def send_nowait(self, msg: object) -> None:
+        self.sent.append(msg)
+
+
+class FakeMembership(object):
+
+    server_id = 'A'
+
+
+class TestRedisPlacement(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        monkey_config.set_config_impl(PlacementConfig)
+        for cls in (MembershipManager, RedisPlacement):
+            SingletonMeta._instance.pop(cls, None)
+        self.client = Redis.from_url('redis://localhost:6379/0')
+        self.keys = [f'{ACTOR_TYPE}:{i}' for i in range(6)]
+        await self.client.delete(*self.keys)
+        MembershipManager().set_membership(FakeMembership())
+        self.placement = RedisPlacement('redis://localhost:6379/0')
+        MembershipManager().set_placement(self.placement)
+        MembershipManager().add_member(FakeNode('A'))
+
+    async def asyncTearDown(self) -> None:
+        self.placement.close()
+        await self.client.delete(*self.keys)
+        await self.client.aclose()
+        for cls in (MembershipManager, RedisPlacement):
+            SingletonMeta._instance.pop(cls, None)
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    async def test_actors_keep_alive(self):
+        # 同一轮事件循环中的查询合并成一次pipeline, 首次登记的过期时间取actor_keep_alive_time
+        nodes = await asyncio.gather(
+            *[self.placement.find_position(ACTOR_TYPE, str(i)) for i in range(5)])
+        assert [node.server_id for node in nodes] == ['A'] * 5
+        for key in self.keys[:5]:
+            assert await self.client.get(key) == b'A'
+            assert await self.client.ttl(key) > 240
+
+        for key in self.keys[:5]:
+            await self.client.expire(key, 10)
+        await self.client.set(self.keys[5], 'B')
+        actors = [(ACTOR_TYPE, str(i)) for i in range(6)]
+        results = await self.placement.actors_keep_alive(actors, 300)
+        assert results == [True] * 5 + [False]
+        for key in self.keys[:5]:
+            assert await self.client.ttl(key) > 240
+        assert await self.client.ttl(self.keys[5]) == -1
+
+        # 续期失败的actor从缓存中清理
+        await self.client.delete(self.keys[0])
+        results = await self.placement.actors_keep_alive(actors[:2], 300)
+        assert results == [False, True]
+        assert self.placement.find_position_in_cache(ACTOR_TYPE, '0') is None
+        assert self.placement.find_position_in_cache(ACTOR_TYPE, '1') is not None
+
+    async def test_heart_beat_load(self):
+        node = FakeNode('B')
+        MembershipManager().add_member(node)
+        session = HeartBeatSession()
+
+        # 单个心跳: 更新对端负载并回复本节点负载
+        await EventHandler.process_socket_message(
+            session, RequestHeartBeat, RequestHeartBeat(now_sec=1, server_id='B', load=7))
+        assert node.weight == 7
+        assert session.sent == [ResponseHeartBeat(
+            now_sec=1, server_id='A', load=LoadMonitor().load)]
+
+        # 积压的心跳按最后一个更新负载, 只回复一次
+        session.sent.clear()
+        await EventHandler.process_socket_messages(session, [
+            (RequestHeartBeat, RequestHeartBeat(now_sec=2, server_id='B', load=9)),
+            (RequestHeartBeat, RequestHeartBeat(now_sec=3, server_id='B', load=12))])
+        assert node.weight == 12
+        assert session.sent == [ResponseHeartBeat(
+            now_sec=3, server_id='A', load=LoadMonitor().load)]
+
+        # 心跳回复同样更新对端负载, 不再回复
+        session.sent.clear()
+        await EventHandler.process_socket_message(
+            session, ResponseHeartBeat, ResponseHeartBeat(server_id='B', load=3))
+        assert node.weight == 3
+        await EventHandler.process_socket_messages(session, [
+            (ResponseHeartBeat, ResponseHeartBeat(server_id='B', load=4)),
+            (ResponseHeartBeat, ResponseHeartBeat(server_id='B', load=6))])
+        assert node.weight == 6
+        assert session.sent == []
+
+    async def test_release_positions(self):
+        await asyncio.gather(
+            *[self.placement.find_position(ACTOR_TYPE, str(i)) for i in range(3)])
+        await self.client.set(self.keys[2], 'B')
+        # 只删除仍归属本节点的key, 同时清理缓存
+        await MembershipManager().release_positions([(ACTOR_TYPE, str(i)) for i in range(3)])
+        assert await self.client.exists(self.keys[0], self.keys[1]) == 0
+        assert await self.client.get(self.keys[2]) == b'B'
+        assert self.placement.find_position_in_cache(ACTOR_TYPE, '0') is None
+
+
+class LeaseConfig(PlacementConfig):
+
+    @property
+    def placement_node_lease(self) -> bool:
+        return True
+
+    @property
+    def node_lease_time(self) -> int:
+        return 6
+
+    @property
+    def node_lease_key_ttl(self) -> int:
+        return 600
+
+
+class TestRedisPlacementLease(TestRedisPlacement):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.placement.close()
+        await self.client.delete(RedisPlacement.NODE_LEASE_PREFIX + 'A')
+        for cls in (MembershipManager, RedisPlacement):
+            SingletonMeta._instance.pop(cls, None)
+        monkey_config.set_config_impl(LeaseConfig)
+        MembershipManager().set_membership(FakeMembership())
+        self.placement = RedisPlacement('redis://localhost:6379/0')
+        MembershipManager().set_placement(self.placement)
+        MembershipManager().add_member(FakeNode('A'))
+
+    async def asyncTearDown(self) -> None:
+        self.placement.close()
+        await self.client.delete(RedisPlacement.NODE_LEASE_PREFIX + 'A')
+        await super().asyncTearDown()
+
+    async def test_actors_keep_alive(self):
+        # 启动后随第一次心跳写入租约
+        await asyncio.sleep(0.05)
+        assert await self.client.ttl(RedisPlacement.NODE_LEASE_PREFIX + 'A') > 0
+
+        nodes = await asyncio.gather(
+            *[self.placement.find_position(ACTOR_TYPE, str(i)) for i in range(5)])
+        assert [node.server_id for node in nodes] == ['A'] * 5
+        # 租约模式下actor key只带兜底过期时间
+        for key in self.keys[:5]:
+            assert 540 < await self.client.ttl(key) <= 600
+        await self.client.set(self.keys[5], 'B')
+        await self.client.expire(self.keys[0], 200)
+        actors = [(ACTOR_TYPE, str(i)) for i in range(6)]
+        results = await self.placement.actors_keep_alive(actors, 300)
+        assert results == [True] * 5 + [False]
+        # 剩余时间不足一半的key才续期, 其他key不写Redis
+        assert await self.client.ttl(self.keys[0]) > 540
+        assert await self.client.ttl(self.keys[5]) == -1
+
+
+if __name__ == '__main__':
+    unittest.main()
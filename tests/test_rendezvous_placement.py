@@ -0,0 +1,164 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import asyncio
+import unittest
+from redis.asyncio import Redis
+from utils import monkey_config
+from utils.singleton import SingletonMeta
+from membership.membership_manager import MembershipManager
+from membership.rendezvous_placement import RendezvousPlacement
+
+
+ACTOR_TYPE = 'RendezvousTest'
+
+
+class PlacementConfig(monkey_config.DefaultMonkeyConfig):
+
+    transition_time = 0
+
+    @property
+    def rendezvous_transition_time(self) -> int:
+        return self.transition_time
+
+    @property
+    def actor_keep_alive_time(self) -> int:
+        return 1
+
+    @property
+    def actor_keep_alive_interval(self) -> int:
+        return 0
+
+
+class FakeSession(object):
+
+    is_closed = False
+
+    async def send(self, _: object) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakeNode(object):
+
+    def __init__(self, server_id: str) -> None:
+        self.server_id = server_id
+        self.weight = 0
+        self.is_healthy = True
+        self.session = FakeSession()
+
+    @property
+    def is_available(self) -> bool:
+        return self.is_healthy
+
+    def is_support(self, mate: str) -> bool:
+        return mate == ACTOR_TYPE
+
+    def refresh(self, node: 'FakeNode') -> None:
+        self.is_healthy = node.is_healthy
+
+
+class FakeMembership(object):
+
+    server_id = 'A'
+
+
+class TestRendezvousPlacement(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        monkey_config.set_config_impl(PlacementConfig)
+        for cls in (MembershipManager, RendezvousPlacement):
+            SingletonMeta._instance.pop(cls, None)
+        self.client = Redis.from_url('redis://localhost:6379/0')
+        await self.client.delete(*[f'{ACTOR_TYPE}:{i}' for i in range(64)])
+        MembershipManager().set_membership(FakeMembership())
+        self.placement = RendezvousPlacement('redis://localhost:6379/0')
+        MembershipManager().set_placement(self.placement)
+        self.nodes = {server_id: FakeNode(server_id) for server_id in 'ABC'}
+        MembershipManager().add_member(self.nodes['A'])
+        MembershipManager().add_member(self.nodes['B'])
+
+    async def asyncTearDown(self) -> None:
+        self.placement.close()
+        PlacementConfig.transition_time = 0
+        await self.client.aclose()
+        for cls in (MembershipManager, RendezvousPlacement):
+            SingletonMeta._instance.pop(cls, None)
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    def find_actor(self) -> str:
+        """找到在{A, B}中归属A, 在{A, B, C}中归属C的actor"""
+        for i in range(64):
+            if self.placement.owner(ACTOR_TYPE, str(i)).server_id != 'A':
+                continue
+            MembershipManager().add_member(self.nodes['C'])
+            owner = self.placement.owner(ACTOR_TYPE, str(i)).server_id
+            MembershipManager().remove_member('C')
+            if owner == 'C':
+                return str(i)
+        raise AssertionError('no actor found')
+
+    async def position(self, actor_id: str) -> None | str:
+        value = await self.client.get(f'{ACTOR_TYPE}:{actor_id}')
+        return value.decode() if value is not None else None
+
+    async def test_stable_to_transition(self):
+        actor_id = self.find_actor()
+        # 稳定期直接返回HRW结果, 不写Redis
+        self.placement.remove_position_from_cache(ACTOR_TYPE, actor_id)
+        assert not self.placement.in_transition
+        node = await self.placement.find_position(ACTOR_TYPE, actor_id)
+        assert node is not None and node.server_id == 'A'
+        await asyncio.sleep(0.05)
+        assert await self.position(actor_id) is None
+        # 归属节点激活后立即续期, 由续期登记位置
+        assert MembershipManager().keep_alive_delay() == 0
+        assert await self.placement.actor_keep_alive(ACTOR_TYPE, actor_id, 60)
+        assert await self.position(actor_id) == 'A'
+
+        # C加入后进入过渡期, 以Redis为准仍然路由到A, 不会激活第二份
+        PlacementConfig.transition_time = 60
+        MembershipManager().add_member(self.nodes['C'])
+        assert self.placement.in_transition
+        self.placement.remove_position_from_cache(ACTOR_TYPE, actor_id)
+        node = await self.placement.find_position(ACTOR_TYPE, actor_id)
+        assert node is not None and node.server_id == 'A'
+
+        # A续期时发现归属已经转移, 交出Redis中的位置, 之后登记到C
+        assert not await self.placement.actor_keep_alive(ACTOR_TYPE, actor_id, 60)
+        assert await self.position(actor_id) is None
+        node = await self.placement.find_position(ACTOR_TYPE, actor_id)
+        assert node is not None and node.server_id == 'C'
+        assert await self.position(actor_id) == 'C'
+
+    async def test_health_change(self):
+        actor_id = self.find_actor()
+        MembershipManager().add_member(self.nodes['C'])
+        PlacementConfig.transition_time = 60
+        assert self.placement.owner(ACTOR_TYPE, actor_id).server_id == 'C'
+        assert not self.placement.in_transition
+        # 本地会话断开不影响归属
+        self.nodes['C'].session = None
+        assert self.placement.owner(ACTOR_TYPE, actor_id).server_id == 'C'
+        assert not self.placement.in_transition
+        # 查询归属不改变过渡期状态
+        self.nodes['C'].is_healthy = False
+        assert self.placement.owner(ACTOR_TYPE, actor_id).server_id == 'A'
+        assert not self.placement.in_transition
+        # membership刷新到的健康状态变化开启过渡期
+        self.nodes['C'].is_healthy = True
+        unhealthy = FakeNode('C')
+        unhealthy.is_healthy = False
+        MembershipManager().refresh_members(
+            [self.nodes['A'], self.nodes['B'], unhealthy])
+        assert not self.nodes['C'].is_healthy
+        assert self.placement.owner(ACTOR_TYPE, actor_id).server_id == 'A'
+        assert self.placement.in_transition
+
+
+if __name__ == '__main__':
+    unittest.main()
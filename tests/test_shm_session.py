@@ -0,0 +1,65 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import os
+import asyncio
+import tempfile
+import unittest
+from network.shm_ring import ShmRing
+from network.shm_session import ShmProtocol
+
+
+class TestShmProtocol(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.path = os.path.join(tempfile.mkdtemp(), 'shm.sock')
+        accepted: list[ShmProtocol] = []
+        self.server = await loop.create_unix_server(
+            lambda: ShmProtocol(lambda protocol: accepted.append(protocol)), path=self.path)
+        rings = (ShmRing.create(4096), ShmRing.create(4096))
+        _, self.client = await loop.create_unix_connection(
+            lambda: ShmProtocol(rings=rings), path=self.path)
+        while not accepted:
+            await asyncio.sleep(0.01)
+        self.peer = accepted[0]
+
+    async def asyncTearDown(self) -> None:
+        self.client.close()
+        self.peer.close()
+        self.server.close()
+        await self.server.wait_closed()
+        os.unlink(self.path)
+
+    async def test_idle_backoff(self):
+        self.client.write(b'hello')
+        assert await asyncio.wait_for(self.peer.wait_readable(), 1)
+        assert bytes(self.peer.buffer.read()) == b'hello'
+
+        # 空闲时轮询间隔指数退避, 数据仍然通过唤醒及时送达
+        reader = asyncio.create_task(self.peer.wait_readable())
+        await asyncio.sleep(0.4)
+        assert self.peer.poll_interval >= ShmProtocol.POLL_INTERVAL * 8
+        self.client.write(b'world')
+        assert await asyncio.wait_for(reader, 0.1)
+        assert bytes(self.peer.buffer.read()) == b'world'
+
+    async def test_producer_blocked(self):
+        data = os.urandom(4096 * 3)
+        self.client.write(data)
+        # 环写满后恢复快速轮询, 等对端消费后继续写
+        assert self.client.get_write_buffer_size() > 0
+        assert self.client.poll_interval == ShmProtocol.POLL_INTERVAL
+        received = bytearray()
+        while len(received) < len(data):
+            await asyncio.wait_for(self.peer.wait_readable(), 1)
+            received += self.peer.buffer.read()
+        assert received == data
+        await asyncio.wait_for(self.client.drain(), 1)
+        assert self.client.get_write_buffer_size() == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import socket
+import asyncio
+import unittest
+from utils import monkey_config
+from network.codec_echo import CodecEcho
+from network.event_handler import EventHandler
+from network.tcp_session import TcpSocketSession
+from network.tcp_protocol import TcpBufferedProtocol
+from network.socket_session import SocketSession, SocketSessionManager
+
+
+class FakeTransport(asyncio.Transport):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.paused = False
+
+    def pause_reading(self) -> None:
+        self.paused = True
+
+    def resume_reading(self) -> None:
+        self.paused = False
+
+    def is_closing(self) -> bool:
+        return False
+
+
+class TestTcpBufferedProtocol(unittest.IsolatedAsyncioTestCase):
+
+    def feed(self, protocol: TcpBufferedProtocol, data: bytes) -> None:
+        view = protocol.get_buffer(len(data))
+        length = min(len(view), len(data))
+        view[:length] = data[:length]
+        protocol.buffer_updated(length)
+
+    async def test_read_size(self):
+        protocol = TcpBufferedProtocol()
+        protocol.connection_made(FakeTransport())
+        size = monkey_config.get_config().tcp_buffer_size
+        assert protocol.read_size == size
+        # 读满则放大, 不超过tcp_buffer_max_size
+        self.feed(protocol, b'a' * size)
+        assert protocol.read_size == size * 2
+        protocol.buffer.read()
+        for _ in range(4):
+            self.feed(protocol, b'a' * protocol.read_size)
+            protocol.buffer.read()
+        assert protocol.read_size == monkey_config.get_config().tcp_buffer_max_size
+        # 连续读不到四分之一则缩小, 不小于MIN_READ_SIZE
+        for _ in range(16):
+            self.feed(protocol, b'a')
+        assert protocol.read_size == TcpBufferedProtocol.MIN_READ_SIZE
+        assert await protocol.wait_readable()
+        assert protocol.buffer.readable_len() == 16
+
+    async def test_pause_resume(self):
+        transport = FakeTransport()
+        protocol = TcpBufferedProtocol()
+        protocol.connection_made(transport)
+        max_size = monkey_config.get_config().tcp_buffer_max_size
+        while protocol.buffer.readable_len() < max_size - TcpBufferedProtocol.MIN_READ_SIZE:
+            self.feed(protocol, b'a' * protocol.read_size)
+        # 缓冲区快满时暂停读取, session消费后在wait_readable中恢复
+        assert transport.paused
+        protocol.buffer.read()
+        assert await protocol.wait_readable()
+        assert not transport.paused
+
+        # 上层背压与缓冲区满分开记录, 背压期间wait_readable不会恢复读取
+        protocol.pause_reading()
+        assert transport.paused
+        self.feed(protocol, b'a')
+        assert await protocol.wait_readable()
+        assert transport.paused
+        protocol.resume_reading()
+        assert not transport.paused
+
+    async def test_half_close(self):
+        loop = asyncio.get_running_loop()
+        accepted: list[TcpBufferedProtocol] = []
+        server = await loop.create_server(
+            lambda: TcpBufferedProtocol(lambda protocol: accepted.append(protocol)), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = socket.create_connection(('127.0.0.1', port))
+        client.sendall(b'frame-1frame-2')
+        client.shutdown(socket.SHUT_WR)
+        while not accepted:
+            await asyncio.sleep(0.01)
+        protocol = accepted[0]
+        received = bytearray()
+        while await protocol.wait_readable():
+            received += protocol.buffer.read()
+        # 对端半关闭后已经收到的数据完整保留, transport仍然可以写回
+        assert received == b'frame-1frame-2'
+        assert protocol.at_eof()
+        assert not protocol.transport.is_closing()
+        protocol.write(b'bye')
+        await asyncio.sleep(0.05)
+        assert client.recv(16) == b'bye'
+        client.close()
+        protocol.close()
+        server.close()
+        await server.wait_closed()
+
+    async def test_session_half_close(self):
+        received: list[object] = []
+
+        async def on_echo(_: SocketSession, __: type, msg: object) -> None:
+            received.append(msg)
+
+        async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            writer.write(b'hello')
+            writer.write_eof()
+            await writer.drain()
+
+        EventHandler.register_hander(str, on_echo)
+        try:
+            server = await asyncio.start_server(on_client, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            session = await TcpSocketSession.connect('127.0.0.1', port, CodecEcho, buffered=True)
+            assert session is not None
+            for _ in range(100):
+                if SocketSessionManager().get_session(session.session_id) is None:
+                    break
+                await asyncio.sleep(0.01)
+            # 对端发完数据立即半关闭, 已经收到的帧仍然分发, 之后session关闭
+            assert received == ['hello']
+            assert session.is_closed
+            assert SocketSessionManager().get_session(session.session_id) is None
+            server.close()
+            await server.wait_closed()
+        finally:
+            # 处理函数是进程级的注册, 不能影响其他用例
+            EventHandler.unregister_handler(str)
+
+
+if __name__ == '__main__':
+    unittest.main()
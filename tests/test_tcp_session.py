@@ -0,0 +1,164 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import asyncio
+import unittest
+from utils import monkey_config
+from network.buffer import Buffer
+from network.buffer_pool import BufferPool
+from network.codec_rpc import CodecRpc
+from network.codec_echo import CodecEcho
+from message.message import RequestHeartBeat, RpcHandshake
+from message.rpc_message import RpcMessage, RpcResponse
+from network.codec_manager import CodecManager
+from network.tcp_session import TcpSocketSession
+from network.tcp_protocol import TcpBufferedProtocol
+from network.socket_session import SocketSessionManager
+
+
+class StreamConfig(monkey_config.DefaultMonkeyConfig):
+
+    @property
+    def rpc_max_streams(self) -> int:
+        return 1
+
+
+class FakeTransport(asyncio.Transport):
+
+    def __init__(self, high_water: int) -> None:
+        super().__init__()
+        self.high_water = high_water
+        self.writes: list[list[bytes]] = []
+        self.closed = False
+        self.handshake = b''
+
+    def write(self, data) -> None:
+        self.writes.append([bytes(data)])
+
+    def writelines(self, list_of_data) -> None:
+        self.writes.append([bytes(data) for data in list_of_data])
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def get_write_buffer_limits(self) -> tuple[int, int]:
+        return 0, self.high_water
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestTcpSocketSession(unittest.IsolatedAsyncioTestCase):
+
+    def tearDown(self) -> None:
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    def new_session(self, high_water: int, codec_type: type = CodecEcho) -> tuple[TcpSocketSession, TcpBufferedProtocol, FakeTransport]:
+        transport = FakeTransport(high_water)
+        protocol = TcpBufferedProtocol()
+        protocol.connection_made(transport)
+        codec = CodecManager().get_codec(codec_type)
+        assert codec is not None
+        session = TcpSocketSession(1001, codec, protocol, protocol)
+        self.addCleanup(SocketSessionManager().remove_session, session.session_id)
+        if codec_type is CodecRpc:
+            # 对端的握手只声明支持分块, body不压缩
+            session.codec.decode_many(Buffer.from_bytes(CodecRpc().encode(RpcHandshake(chunk=True))))
+        # 握手帧单独保存, 不参与写出次数的断言
+        transport.handshake = b''.join(b''.join(frames) for frames in transport.writes)
+        transport.writes.clear()
+        return session, protocol, transport
+
+    @staticmethod
+    def decode_writes(transport: FakeTransport) -> list[RpcMessage]:
+        codec = CodecRpc()
+        codec.decode_many(Buffer.from_bytes(transport.handshake))
+        msgs: list[RpcMessage] = []
+        for frames in transport.writes:
+            for frame in frames:
+                msgs.extend(codec.decode_many(Buffer.from_bytes(frame)))
+        return msgs
+
+    async def test_coalesce(self):
+        session, _, transport = self.new_session(1024 * 64)
+        session.send_nowait('a')
+        await session.send('b')
+        session.send_nowait('c')
+        # 同一轮事件循环中的帧在call_soon中合并成一次writelines
+        assert transport.writes == []
+        await asyncio.sleep(0)
+        assert transport.writes == [[b'a', b'b', b'c']]
+        await session.send('d')
+        await asyncio.sleep(0)
+        assert transport.writes == [[b'a', b'b', b'c'], [b'd']]
+
+    async def test_drain_above_high_water(self):
+        session, protocol, transport = self.new_session(4)
+        await session.send('abcd')
+        assert transport.writes == []
+        await asyncio.sleep(0)
+        assert transport.writes == [[b'abcd']]
+        # 超过高水位时不等call_soon, 立即写出并等待drain
+        protocol.pause_writing()
+        sending = asyncio.create_task(session.send('efghi'))
+        await asyncio.sleep(0)
+        assert transport.writes == [[b'abcd'], [b'efghi']]
+        assert not sending.done()
+        protocol.resume_writing()
+        await asyncio.wait_for(sending, 1)
+
+    async def test_close_partial_frame(self):
+        session, protocol, _ = self.new_session(1024 * 64, CodecRpc)
+        # 对端断开时缓冲区中留有半帧, 关闭会话后仍然归还bytearray
+        frame = CodecRpc().encode(RequestHeartBeat(now_sec=1))
+        protocol.buffer.append(frame[:-1])
+        pinned = BufferPool().stats()['bytes_pinned']
+        size = protocol.buffer.capacity()
+        session.close()
+        assert protocol.buffer.readable_len() == 0
+        assert BufferPool().stats()['bytes_pinned'] == pinned - size
+
+    async def test_interleave_chunks(self):
+        session, _, transport = self.new_session(1024 * 64, CodecRpc)
+        chunk_size = CodecRpc.chunk_size()
+        session.send_nowait(RpcMessage.from_msg(
+            RequestHeartBeat(now_sec=1), b'a' * chunk_size * 2))
+        sending = asyncio.create_task(session.send(RpcMessage.from_msg(
+            RpcResponse(request_id=2), b'b' * chunk_size)))
+        await asyncio.sleep(0)
+        session.send_nowait(RequestHeartBeat(now_sec=3))
+        await asyncio.wait_for(sending, 1)
+        await asyncio.sleep(0)
+        # 第二个大消息从第二轮开始与第一个交错, 每轮各写一块; 小消息随下一轮写出, 不用等大消息写完
+        # 分块的消息按最后一块到达的顺序交给上层, 之后发送的小消息先到
+        assert [len(frames) for frames in transport.writes] == [1, 3, 2]
+        assert all(len(frame) <= chunk_size for frames in transport.writes for frame in frames)
+        msgs = self.decode_writes(transport)
+        assert [type(msg.meta) for msg in msgs] == [
+            RequestHeartBeat, RequestHeartBeat, RpcResponse]
+        assert msgs[0].meta.now_sec == 3
+        assert msgs[1].body == b'a' * chunk_size * 2
+        assert msgs[2].body == b'b' * chunk_size
+
+    async def test_max_streams(self):
+        monkey_config.set_config_impl(StreamConfig)
+        session, _, transport = self.new_session(1024 * 64, CodecRpc)
+        chunk_size = CodecRpc.chunk_size()
+        first = asyncio.create_task(session.send(RpcMessage.from_msg(
+            RequestHeartBeat(now_sec=1), b'a' * chunk_size)))
+        second = asyncio.create_task(session.send(RpcMessage.from_msg(
+            RpcResponse(request_id=2), b'b' * chunk_size)))
+        await asyncio.wait_for(asyncio.gather(first, second), 1)
+        # 同时只发送一个流, 第二个消息等第一个写完之后才开始
+        assert [len(frames) for frames in transport.writes] == [1, 1, 1, 1]
+        msgs = self.decode_writes(transport)
+        assert [type(msg.meta) for msg in msgs] == [RequestHeartBeat, RpcResponse]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import unittest
+from utils.timing_wheel import TimingWheel
+
+
+class TestTimingWheel(unittest.TestCase):
+
+    def test_timing_wheel(self):
+        wheel: TimingWheel[int] = TimingWheel(tick=1, slots=4, levels=3)
+        wheel.add(1, 3)
+        wheel.add(2, 10)
+        wheel.add(3, 70)
+        wheel.add(4, 500)
+        assert len(wheel) == 4
+        assert wheel.advance(2) == []
+        assert wheel.advance(3) == [1]
+
+        wheel.add(2, 20)
+        assert wheel.advance(19) == []
+        assert wheel.advance(20) == [2]
+
+        assert wheel.remove(3)
+        assert not wheel.remove(3)
+        assert wheel.advance(100) == []
+        assert wheel.advance(499) == []
+        assert wheel.advance(1000) == [4]
+        assert len(wheel) == 0
+
+        wheel.add(5, 0)
+        assert wheel.advance(1001) == [5]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import os
+import socket
+import asyncio
+import tempfile
+import unittest
+from typing import Type
+from dataclasses import dataclass
+from message.base import JsonMessage
+from network.codec_rpc import CodecRpc
+from network.tcp_server import TcpServer
+from utils.singleton import SingletonMeta
+from network.event_handler import EventHandler
+from network.socket_session import SocketSession
+from network.unix_session import UnixSocketSession
+
+
+@dataclass(slots=True)
+class UnixPing(JsonMessage):
+    value: int = 0
+
+
+@dataclass(slots=True)
+class UnixPong(JsonMessage):
+    value: int = 0
+
+
+pongs: list[tuple[type, int]] = []
+
+
+async def on_ping(session: SocketSession, _: Type, msg: object) -> None:
+    await session.send(UnixPong(value=msg.meta.value))
+
+
+def on_pong(session: SocketSession, _: Type, msg: object) -> None:
+    pongs.append((type(session), msg.meta.value))
+
+
+EventHandler.register_hander(UnixPing, on_ping)
+EventHandler.register_hander(UnixPong, on_pong)
+
+
+class TestUnixSocketSession(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        # TcpServer保存了创建时的事件循环, 每个用例使用新实例
+        SingletonMeta._instance.pop(TcpServer, None)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'monkey.sock')
+        pongs.clear()
+
+    def tearDown(self) -> None:
+        SingletonMeta._instance.pop(TcpServer, None)
+        self.tmp.cleanup()
+
+    async def wait_pongs(self, count: int) -> None:
+        for _ in range(100):
+            if len(pongs) >= count:
+                return
+            await asyncio.sleep(0.01)
+
+    async def ping(self, buffered: bool) -> None:
+        session = await UnixSocketSession.connect_unix(self.path, CodecRpc, buffered)
+        assert isinstance(session, UnixSocketSession)
+        assert session.is_client
+        assert session.remote_address.startswith('unix')
+        await session.send(UnixPing(value=len(pongs) + 1))
+        await self.wait_pongs(len(pongs) + 1)
+        session.close()
+
+    async def test_listen_unix(self):
+        await TcpServer().listen_unix(self.path, CodecRpc)
+        await self.ping(buffered=False)
+        await self.ping(buffered=True)
+        assert pongs == [(UnixSocketSession, 1), (UnixSocketSession, 2)]
+
+    async def test_listen_unix_buffered(self):
+        await TcpServer().listen_unix(self.path, CodecRpc, buffered=True)
+        await self.ping(buffered=True)
+        assert pongs == [(UnixSocketSession, 1)]
+
+    async def test_remove_stale_socket(self):
+        # 进程异常退出时socket文件还在, 但已经没有进程监听
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.close()
+        assert os.path.exists(self.path)
+        await TcpServer().listen_unix(self.path, CodecRpc)
+        await self.ping(buffered=False)
+        assert pongs == [(UnixSocketSession, 1)]
+
+    async def test_socket_in_use(self):
+        accepted: list[int] = []
+
+        async def on_client(_: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            accepted.append(1)
+            writer.close()
+
+        server = await asyncio.start_unix_server(on_client, path=self.path)
+        # 还有进程在监听的socket文件不能删除, listen_unix失败但原来的监听不受影响
+        await TcpServer().listen_unix(self.path, CodecRpc)
+        _, writer = await asyncio.open_unix_connection(self.path)
+        for _ in range(100):
+            if len(accepted) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        assert len(accepted) == 2
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == '__main__':
+    unittest.main()
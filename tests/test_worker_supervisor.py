@@ -0,0 +1,206 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+import os
+import time
+import signal
+import socket
+import asyncio
+import tempfile
+import unittest
+import threading
+from utils import monkey_config
+from network import worker_supervisor
+from network.codec_echo import CodecEcho
+from network.tcp_server import TcpServer
+from utils.singleton import SingletonMeta
+from membership.membership import Membership
+from membership.worker_server import WorkerServer
+from membership.membership_manager import MembershipManager
+from network.worker_supervisor import WorkerSupervisor
+
+
+class WorkerConfig(monkey_config.DefaultMonkeyConfig):
+
+    @property
+    def worker_restart_interval(self) -> int:
+        return 0
+
+    @property
+    def worker_shutdown_timeout(self) -> int:
+        return 5
+
+
+class WorkerPortConfig(WorkerConfig):
+
+    port_base = 0
+
+    @property
+    def worker_port_base(self) -> int:
+        return WorkerPortConfig.port_base
+
+
+class FileMembership(Membership):
+    """注册和注销记录成文件, 供supervisor进程检查"""
+
+    def __init__(self, path: str) -> None:
+        self.__path = path
+        self.__server_id = ''
+
+    @property
+    def server_id(self) -> str:
+        return self.__server_id
+
+    async def register_server(self, namespace: str, name: str, address: str, port: int, tags: list[str], meta: dict[str, str]) -> bool:
+        self.__server_id = f'{name}-{port}'
+        with open(os.path.join(self.__path, f'registered_{port}'), 'w') as f:
+            f.write(meta.get('monkey_worker', ''))
+        return True
+
+    async def unregister_server(self, server_id: str) -> bool:
+        open(os.path.join(self.__path, f'unregistered_{server_id}'), 'w').close()
+        return True
+
+    async def check_health(self, namespace: str, server_tags: list[str] = []) -> None:
+        pass
+
+
+def free_ports(count: int) -> int:
+    """找到连续count个可用端口, 返回第一个"""
+    while True:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            first = sock.getsockname()[1]
+        try:
+            for port in range(first, first + count):
+                with socket.socket() as sock:
+                    sock.bind(('127.0.0.1', port))
+            return first
+        except OSError:
+            continue
+
+
+class TestWorkerSupervisor(unittest.TestCase):
+
+    def setUp(self) -> None:
+        monkey_config.set_config_impl(WorkerConfig)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+        monkey_config.set_config_impl(monkey_config.DefaultMonkeyConfig)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def wait_files(self, names: list[str]) -> bool:
+        deadline = time.monotonic() + 5
+        while not all(os.path.exists(self.path(name)) for name in names):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def test_worker_port(self):
+        os.environ.pop(worker_supervisor.WORKER_INDEX_ENV, None)
+        assert worker_supervisor.worker_index() == -1
+        assert worker_supervisor.worker_port(8080) == 8080
+        os.environ[worker_supervisor.WORKER_INDEX_ENV] = '1'
+        try:
+            assert worker_supervisor.worker_index() == 1
+            assert worker_supervisor.worker_port(8080) == 8082
+            # 配置了端口起点时不再依赖共享端口, 避免和相邻的服务冲突
+            WorkerPortConfig.port_base = 9000
+            monkey_config.set_config_impl(WorkerPortConfig)
+            assert worker_supervisor.worker_port(8080) == 9001
+        finally:
+            del os.environ[worker_supervisor.WORKER_INDEX_ENV]
+
+    def test_run(self):
+        def worker_main(index: int) -> None:
+            if index == 1 and not os.path.exists(self.path('crashed')):
+                # 第一次启动的worker异常退出, supervisor按重启间隔重新拉起
+                open(self.path('crashed'), 'w').close()
+                raise RuntimeError('worker crash')
+            # 写完再改名, 其他worker看到文件时内容已经完整
+            with open(self.path(f'worker_{index}.tmp'), 'w') as f:
+                f.write(f'{worker_supervisor.worker_index()}:{signal.getsignal(signal.SIGINT) == signal.SIG_IGN}')
+            os.rename(self.path(f'worker_{index}.tmp'), self.path(f'worker_{index}'))
+            if index == 1 and not self.wait_files(['survived']):
+                # worker 0没有忽略SIGINT, 停止supervisor让用例失败而不是卡住
+                os.kill(os.getppid(), signal.SIGTERM)
+            if index == 0:
+                self.wait_files(['worker_0', 'worker_1'])
+                # 模拟Ctrl-C发给整个进程组: worker忽略SIGINT, 由supervisor转发SIGTERM
+                os.kill(os.getpid(), signal.SIGINT)
+                open(self.path('survived'), 'w').close()
+                os.kill(os.getppid(), signal.SIGINT)
+            while True:
+                time.sleep(1)
+
+        handlers = {signum: signal.getsignal(signum)
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            WorkerSupervisor(worker_main, workers=2).run()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        for index in range(2):
+            with open(self.path(f'worker_{index}')) as f:
+                assert f.read() == f'{index}:True'
+        assert os.path.exists(self.path('crashed'))
+        assert os.path.exists(self.path('survived'))
+
+    def test_worker_server(self):
+        port = free_ports(1)
+        WorkerPortConfig.port_base = free_ports(2)
+        monkey_config.set_config_impl(WorkerPortConfig)
+
+        async def setup() -> None:
+            MembershipManager().set_membership(FileMembership(self.tmp.name))
+
+        worker_server = WorkerServer(
+            '127.0.0.1', port, CodecEcho, 'test', 'worker', '127.0.0.1', setup=setup)
+
+        def worker_main(index: int) -> None:
+            # 测试进程里已经创建过这些Singleton和事件循环, worker中重新创建
+            for cls in (TcpServer, MembershipManager):
+                SingletonMeta._instance.pop(cls, None)
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            worker_server(index)
+
+        rpc_ports = [WorkerPortConfig.port_base + index for index in range(2)]
+        connected: list[int] = []
+
+        def check() -> None:
+            # 两个worker都注册后连接各自的rpc端口和共享端口, 然后停止supervisor
+            try:
+                if self.wait_files([f'registered_{rpc_port}' for rpc_port in rpc_ports]):
+                    for target in rpc_ports + [port]:
+                        with socket.create_connection(('127.0.0.1', target), timeout=1):
+                            connected.append(target)
+            finally:
+                os.kill(os.getpid(), signal.SIGINT)
+
+        handlers = {signum: signal.getsignal(signum)
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+        thread = threading.Thread(target=check)
+        thread.start()
+        try:
+            WorkerSupervisor(worker_main, workers=2).run()
+        finally:
+            thread.join()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        assert connected == rpc_ports + [port]
+        for index, rpc_port in enumerate(rpc_ports):
+            with open(self.path(f'registered_{rpc_port}')) as f:
+                assert f.read() == str(index)
+            # 收到supervisor转发的SIGTERM后从membership注销
+            assert os.path.exists(self.path(f'unregistered_worker-{rpc_port}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
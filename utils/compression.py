@@ -0,0 +1,153 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import random
+from typing import Any
+from utils import monkey_config
+from logger.logger import Logger
+from utils.singleton import Singleton
+from zstd import ZSTD_compress, ZSTD_uncompress
+
+try:
+    import zstandard
+except ImportError:
+    # 没有安装zstandard时退回zstd的一次性接口, 不支持字典
+    zstandard = None
+
+
+logger = Logger().get_logger('Monkey')
+
+
+def train_dictionary(samples: list[bytes], dict_size: int = 1024 * 16) -> bytes:
+    """用采样得到的body离线训练字典, 结果写入文件后配置到rpcCompressDicts"""
+    if zstandard is None:
+        raise RuntimeError('train_dictionary requires zstandard')
+    return zstandard.train_dictionary(dict_size, samples).as_bytes()
+
+
+class Compression(Singleton):
+    """进程内共享的zstd字典, 按消息类型的压缩阈值和body采样"""
+
+    def __init__(self) -> None:
+        config = monkey_config.get_config()
+        self.__dicts: dict[int, Any] = {}
+        self.__thresholds: dict[str, int] = dict(
+            config.rpc_compress_thresholds)
+        self.__samples: list[bytes] = []
+        self.__sample_seen = 0
+        for path in config.rpc_compress_dicts:
+            try:
+                with open(path, 'rb') as f:
+                    self.add_dictionary(f.read())
+            except Exception as e:
+                logger.error(
+                    f'Compression load dictionary path:{path} error:{e}')
+
+    @property
+    def support_dictionary(self) -> bool:
+        return zstandard is not None
+
+    def add_dictionary(self, data: bytes) -> int:
+        if zstandard is None:
+            logger.error('Compression add dictionary error: zstandard not installed')
+            return 0
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dict_id = dictionary.dict_id()
+        self.__dicts[dict_id] = dictionary
+        return dict_id
+
+    def get_dictionary(self, dict_id: int) -> Any:
+        return self.__dicts.get(dict_id, None)
+
+    def dict_ids(self) -> list[int]:
+        return list(self.__dicts.keys())
+
+    def select_dictionary(self, peer_dict_ids: list[int]) -> int:
+        """双方都有的字典中选最后加载的一个, 没有返回0"""
+        for dict_id in reversed(self.__dicts.keys()):
+            if dict_id in peer_dict_ids:
+                return dict_id
+        return 0
+
+    def threshold(self, name: str) -> int:
+        return self.__thresholds.get(name, monkey_config.get_config().rpc_compress_threshold)
+
+    def set_threshold(self, name: str, threshold: int) -> None:
+        self.__thresholds[name] = threshold
+
+    def sample(self, data: bytes) -> None:
+        # 蓄水池采样, 保留的样本在整个运行期间均匀分布
+        sample_size = monkey_config.get_config().rpc_compress_sample_size
+        if sample_size <= 0:
+            return
+        self.__sample_seen += 1
+        if len(self.__samples) < sample_size:
+            self.__samples.append(bytes(data))
+            return
+        index = random.randrange(self.__sample_seen)
+        if index < sample_size:
+            self.__samples[index] = bytes(data)
+
+    def samples(self) -> list[bytes]:
+        return list(self.__samples)
+
+
+class ZstdContext(object):
+    """可复用的压缩/解压上下文, 每个连接一份, 压缩使用协商好的字典"""
+
+    def __init__(self, dict_id: int = 0) -> None:
+        self.__dict_id = dict_id
+        self.__level = monkey_config.get_config().rpc_compress_level
+        self.__compressor: Any = None
+        self.__decompressors: dict[int, Any] = {}
+        if zstandard is not None:
+            dictionary = Compression().get_dictionary(dict_id) if dict_id else None
+            if dictionary is None:
+                self.__dict_id = 0
+            self.__compressor = zstandard.ZstdCompressor(
+                level=self.__level, dict_data=dictionary)
+        else:
+            self.__dict_id = 0
+
+    @property
+    def dict_id(self) -> int:
+        return self.__dict_id
+
+    def compress(self, data: bytes | bytearray | memoryview) -> bytes:
+        if self.__compressor is None:
+            return ZSTD_compress(bytes(data), self.__level)
+        return self.__compressor.compress(data)
+
+    def decompress(self, data: bytes | bytearray | memoryview, dict_id: int = 0, max_size: int = 0) -> bytes:
+        if zstandard is None:
+            if dict_id:
+                raise ValueError(
+                    f'ZstdContext decompress dictionary not supported dict_id:{dict_id}')
+            return ZSTD_uncompress(bytes(data))
+        if max_size > 0 and zstandard.frame_content_size(data) > max_size:
+            raise ValueError(
+                f'ZstdContext decompress too large max_size:{max_size}')
+        decompressor = self.__decompressors.get(dict_id, None)
+        if decompressor is None:
+            dictionary = None
+            if dict_id:
+                dictionary = Compression().get_dictionary(dict_id)
+                if dictionary is None:
+                    raise ValueError(
+                        f'ZstdContext decompress dictionary not found dict_id:{dict_id}')
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            self.__decompressors[dict_id] = decompressor
+        return decompressor.decompress(data, max_output_size=max_size)
+
+
+_default_context: None | ZstdContext = None
+
+
+def default_context() -> ZstdContext:
+    global _default_context
+    if _default_context is None:
+        _default_context = ZstdContext()
+    return _default_context
@@ -0,0 +1,69 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+import asyncio
+from utils import monkey_config
+from logger.logger import Logger
+from utils.singleton import Singleton
+
+
+logger = Logger().get_logger('Monkey')
+
+
+class LoadMonitor(Singleton):
+    """本进程的负载: actor权重和与邮箱积压在actor激活/销毁, 消息进出时增量维护
+    事件循环延迟由sample_loop测量sleep的超时时间, 取指数移动平均"""
+
+    LAG_SAMPLE_INTERVAL = 0.5
+    LAG_SMOOTHING = 0.2
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__weight = 0
+        self.__backlog = 0
+        self.__lag = 0.0
+        self.__sampling = False
+
+    @property
+    def weight(self) -> int:
+        return self.__weight
+
+    @property
+    def backlog(self) -> int:
+        return self.__backlog
+
+    @property
+    def lag(self) -> float:
+        """事件循环延迟, 单位秒"""
+        return self.__lag
+
+    @property
+    def load(self) -> int:
+        config = monkey_config.get_config()
+        return int(self.__weight + self.__backlog * config.load_backlog_factor +
+                   self.__lag * 1000 * config.load_lag_factor)
+
+    def add_weight(self, weight: int) -> None:
+        self.__weight += weight
+
+    def add_backlog(self, count: int) -> None:
+        self.__backlog += count
+
+    async def sample_loop(self) -> None:
+        if self.__sampling:
+            return
+        self.__sampling = True
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                begin = loop.time()
+                await asyncio.sleep(self.LAG_SAMPLE_INTERVAL)
+                lag = max(loop.time() - begin - self.LAG_SAMPLE_INTERVAL, 0.0)
+                self.__lag += (lag - self.__lag) * self.LAG_SMOOTHING
+        except Exception as e:
+            logger.error(f'LoadMonitor sample_loop error:{e}')
+        finally:
+            self.__sampling = False
@@ -3,7 +3,9 @@
 __time__ = '2024/09/01'
 __author__ = '虎小黑'
 
-from typing import Generic, Self, TypeVar
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Self, TypeVar
 
 
 K = TypeVar('K')
@@ -49,6 +51,7 @@ class KVNode(Generic[K, V]):
 
 
 class DictLRU(Generic[K, V]):
+    """双向链表实现的LRU, 保留兼容旧调用, 新代码使用LRUCache"""
 
     def __init__(self, max_size: int) -> None:
         super().__init__()
@@ -57,6 +60,9 @@ class DictLRU(Generic[K, V]):
         self.__head: KVNode[K, V] = KVNode(None, None)
         self.__tail = self.__head
 
+    def __len__(self) -> int:
+        return len(self.__cache_dict)
+
     def keys(self) -> list[K]:
         return list(self.__cache_dict.keys())
 
@@ -64,26 +70,27 @@ class DictLRU(Generic[K, V]):
         node = self.__cache_dict.get(key, None)
         if node is None:
             return None
-        self.__remove(node)
+        self.__unlink(node)
         self.__append(node)
         return node.val
 
     def put(self, k: K, v: V) -> None:
         node = self.__cache_dict.get(k, None)
-        if node:
+        if node is not None:
             node.val = v
+            self.__unlink(node)
         else:
             if len(self.__cache_dict) >= self.__max_size and self.__head.next:
-                self.__remove(self.__head.next)
+                self.pop(self.__head.next.key)
             node = KVNode(k, v)
             self.__cache_dict[k] = node
-            self.__append(node)
+        self.__append(node)
 
     def pop(self, key: K) -> V | None:
-        node = self.__cache_dict.get(key, None)
+        node = self.__cache_dict.pop(key, None)
         if node is None:
             return None
-        self.__remove(node)
+        self.__unlink(node)
         return node.val
 
     def __append(self, node: KVNode[K, V]) -> None:
@@ -91,12 +98,136 @@ class DictLRU(Generic[K, V]):
         node.pre = self.__tail
         self.__tail = node
 
-    def __remove(self, node: KVNode[K, V]) -> None:
-        if node.key not in self.__cache_dict:
-            return
+    def __unlink(self, node: KVNode[K, V]) -> None:
+        # 只摘除链表节点, 字典由调用方维护; 摘除尾节点时尾指针前移
         pre = node.pre
         next = node.next
-        if pre:
+        if pre is not None:
             pre.next = next
-            if node.key:
-                self.__cache_dict.pop(node.key)
+        if next is not None:
+            next.pre = pre
+        else:
+            self.__tail = pre if pre is not None else self.__head
+        node.pre = None
+        node.next = None
+
+
+class LRUCache(Generic[K, V]):
+    """基于OrderedDict的LRU缓存, 支持条目数和权重(如字节数)上限, TTL和按条件批量失效
+    过期在get时惰性检查, 也可由expire批量清理; on_evict在条目因容量淘汰或过期移除时回调"""
+
+    def __init__(self, max_size: int = 0, max_weight: int = 0, ttl: float = 0,
+                 weigher: None | Callable[[V], int] = None,
+                 on_evict: None | Callable[[K, V], None] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__()
+        self.__max_size = max_size
+        self.__max_weight = max_weight
+        self.__ttl = ttl
+        self.__weigher = weigher
+        self.__on_evict = on_evict
+        self.__clock = clock
+        # 条目: [值, 过期时间(0为不过期), 权重]
+        self.__entries: OrderedDict[K, list] = OrderedDict()
+        self.__weight = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+
+    @property
+    def weight(self) -> int:
+        return self.__weight
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.__entries
+
+    def keys(self) -> list[K]:
+        return list(self.__entries.keys())
+
+    def get(self, key: K, default: None | V = None) -> None | V:
+        entry = self.__entries.get(key, None)
+        if entry is None:
+            self.__misses += 1
+            return default
+        if entry[1] and entry[1] <= self.__clock():
+            self.__remove(key, entry)
+            self.__expirations += 1
+            self.__misses += 1
+            return default
+        self.__entries.move_to_end(key)
+        self.__hits += 1
+        return entry[0]
+
+    def peek(self, key: K, default: None | V = None) -> None | V:
+        """读取但不更新LRU顺序和命中统计, 不检查过期"""
+        entry = self.__entries.get(key, None)
+        return default if entry is None else entry[0]
+
+    def put(self, key: K, value: V, ttl: None | float = None) -> None:
+        weight = self.__weigher(value) if self.__weigher else 1
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__weight -= old[2]
+        ttl = self.__ttl if ttl is None else ttl
+        self.__entries[key] = [value, self.__clock() + ttl if ttl > 0 else 0, weight]
+        self.__weight += weight
+        self.__evict()
+
+    def pop(self, key: K, default: None | V = None) -> None | V:
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return default
+        self.__weight -= entry[2]
+        return entry[0]
+
+    def invalidate(self, predicate: Callable[[K, V], bool]) -> int:
+        """删除predicate(key, value)为真的全部条目, 返回删除的数量"""
+        keys = [key for key, entry in self.__entries.items() if predicate(key, entry[0])]
+        for key in keys:
+            self.pop(key)
+        return len(keys)
+
+    def expire(self) -> int:
+        """清理全部过期条目, 返回清理的数量"""
+        now = self.__clock()
+        keys = [key for key, entry in self.__entries.items() if entry[1] and entry[1] <= now]
+        for key in keys:
+            self.__remove(key, self.__entries[key])
+        self.__expirations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__weight = 0
+
+    def stats(self) -> dict[str, int | float]:
+        total = self.__hits + self.__misses
+        return {
+            'size': len(self.__entries),
+            'weight': self.__weight,
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions,
+            'expirations': self.__expirations,
+            'hit_rate': self.__hits / total if total else 0.0,
+        }
+
+    def __evict(self) -> None:
+        entries = self.__entries
+        while entries and ((self.__max_size and len(entries) > self.__max_size) or
+                           (self.__max_weight and self.__weight > self.__max_weight)):
+            key, entry = entries.popitem(last=False)
+            self.__weight -= entry[2]
+            self.__evictions += 1
+            if self.__on_evict:
+                self.__on_evict(key, entry[0])
+
+    def __remove(self, key: K, entry: list) -> None:
+        del self.__entries[key]
+        self.__weight -= entry[2]
+        if self.__on_evict:
+            self.__on_evict(key, entry[0])
@@ -8,8 +8,15 @@ from logger.logger import Logger
 
 logger = Logger().get_logger('Monkey')
 
+
+def _json_loads(data: str | bytes | bytearray | memoryview):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
 json_dumps = json.dumps
-json_loads = json.loads
+json_loads = _json_loads
 
 try:
     import orjson
@@ -87,6 +87,166 @@ class MonkeyConfig(ABC):
     def socket_gc_interval(self) -> int:
         pass
 
+    @property
+    @abstractmethod
+    def rpc_type_id(self) -> bool:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_binary_meta(self) -> bool:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_chunk_size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_max_body_size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_max_streams(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def buffer_pool_max_bytes(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_compress_threshold(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_compress_thresholds(self) -> dict[str, int]:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_compress_level(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_compress_dicts(self) -> list[str]:
+        pass
+
+    @property
+    @abstractmethod
+    def rpc_compress_sample_size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def mailbox_high_watermark(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def mailbox_low_watermark(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def session_pending_high_watermark(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def session_pending_low_watermark(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def worker_count(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def worker_restart_interval(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def worker_shutdown_timeout(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def worker_port_base(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def shm_ring_size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def actor_timer_tick(self) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def load_report_interval(self) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def load_lag_factor(self) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def load_backlog_factor(self) -> float:
+        pass
+
+    @property
+    @abstractmethod
+    def rendezvous_transition_time(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def placement_batch_size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def actor_keep_alive_time(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def actor_keep_alive_interval(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def placement_node_lease(self) -> bool:
+        pass
+
+    @property
+    @abstractmethod
+    def node_lease_time(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def node_lease_key_ttl(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def placement_cache_size(self) -> int:
+        pass
+
     @abstractmethod
     def parse(self, file_path: str) -> None:
         pass
@@ -145,7 +305,43 @@ class DefaultMonkeyConfig(MonkeyConfig):
         self.__tcp_session_timeout = 60
         self.__tcp_window_size = 1024 * 4
         self.__rpc_timeout = 5
-        self.__socket_gc_interval = 30
+        self.__socket_gc_interval = 1
+        self.__rpc_type_id = True
+        self.__rpc_binary_meta = False
+        # 0按tcp_buffer_max_size的一半分块, 负数不分块
+        self.__rpc_chunk_size = 0
+        self.__rpc_max_body_size = 1024 * 1024 * 64
+        self.__rpc_max_streams = 64
+        self.__buffer_pool_max_bytes = 1024 * 1024 * 16
+        self.__rpc_compress_threshold = 256
+        self.__rpc_compress_thresholds: dict[str, int] = {}
+        self.__rpc_compress_level = 3
+        self.__rpc_compress_dicts: list[str] = []
+        self.__rpc_compress_sample_size = 0
+        self.__mailbox_high_watermark = 1024
+        self.__mailbox_low_watermark = 256
+        self.__session_pending_high_watermark = 1024 * 4
+        self.__session_pending_low_watermark = 1024
+        self.__worker_count = 1
+        self.__worker_restart_interval = 1
+        self.__worker_shutdown_timeout = 10
+        # worker各自rpc端口的起点, 0表示紧跟在共享端口之后
+        self.__worker_port_base = 0
+        self.__shm_ring_size = 1024 * 1024
+        self.__actor_timer_tick = 0.01
+        self.__load_report_interval = 2
+        self.__load_lag_factor = 10
+        self.__load_backlog_factor = 1
+        self.__rendezvous_transition_time = 120
+        self.__placement_batch_size = 256
+        self.__actor_keep_alive_time = 120
+        self.__actor_keep_alive_interval = 10
+        self.__placement_node_lease = False
+        # 租约随心跳续期, 需要大于load_report_interval
+        self.__node_lease_time = 30
+        # 租约模式下actor key的兜底过期时间, 节点宕机后没人再查询的key也会被清理
+        self.__node_lease_key_ttl = 86400
+        self.__placement_cache_size = 1024 * 2
         self.__magic_code = 'Monkey'
         self.__consul_namespace = 'MonkeyDev'
         self.__consul_address = ['http://127.0.0.1:8500']
@@ -214,6 +410,134 @@ class DefaultMonkeyConfig(MonkeyConfig):
     def socket_gc_interval(self) -> int:
         return self.__socket_gc_interval
 
+    @property
+    def rpc_type_id(self) -> bool:
+        return self.__rpc_type_id
+
+    @property
+    def rpc_binary_meta(self) -> bool:
+        return self.__rpc_binary_meta
+
+    @property
+    def rpc_chunk_size(self) -> int:
+        return self.__rpc_chunk_size
+
+    @property
+    def rpc_max_body_size(self) -> int:
+        return self.__rpc_max_body_size
+
+    @property
+    def rpc_max_streams(self) -> int:
+        return self.__rpc_max_streams
+
+    @property
+    def buffer_pool_max_bytes(self) -> int:
+        return self.__buffer_pool_max_bytes
+
+    @property
+    def rpc_compress_threshold(self) -> int:
+        return self.__rpc_compress_threshold
+
+    @property
+    def rpc_compress_thresholds(self) -> dict[str, int]:
+        return self.__rpc_compress_thresholds
+
+    @property
+    def rpc_compress_level(self) -> int:
+        return self.__rpc_compress_level
+
+    @property
+    def rpc_compress_dicts(self) -> list[str]:
+        return self.__rpc_compress_dicts
+
+    @property
+    def rpc_compress_sample_size(self) -> int:
+        return self.__rpc_compress_sample_size
+
+    @property
+    def mailbox_high_watermark(self) -> int:
+        return self.__mailbox_high_watermark
+
+    @property
+    def mailbox_low_watermark(self) -> int:
+        return self.__mailbox_low_watermark
+
+    @property
+    def session_pending_high_watermark(self) -> int:
+        return self.__session_pending_high_watermark
+
+    @property
+    def session_pending_low_watermark(self) -> int:
+        return self.__session_pending_low_watermark
+
+    @property
+    def worker_count(self) -> int:
+        return self.__worker_count
+
+    @property
+    def worker_restart_interval(self) -> int:
+        return self.__worker_restart_interval
+
+    @property
+    def worker_shutdown_timeout(self) -> int:
+        return self.__worker_shutdown_timeout
+
+    @property
+    def worker_port_base(self) -> int:
+        return self.__worker_port_base
+
+    @property
+    def shm_ring_size(self) -> int:
+        return self.__shm_ring_size
+
+    @property
+    def actor_timer_tick(self) -> float:
+        return self.__actor_timer_tick
+
+    @property
+    def load_report_interval(self) -> float:
+        return self.__load_report_interval
+
+    @property
+    def load_lag_factor(self) -> float:
+        return self.__load_lag_factor
+
+    @property
+    def load_backlog_factor(self) -> float:
+        return self.__load_backlog_factor
+
+    @property
+    def rendezvous_transition_time(self) -> int:
+        return self.__rendezvous_transition_time
+
+    @property
+    def placement_batch_size(self) -> int:
+        return self.__placement_batch_size
+
+    @property
+    def actor_keep_alive_time(self) -> int:
+        return self.__actor_keep_alive_time
+
+    @property
+    def actor_keep_alive_interval(self) -> int:
+        return self.__actor_keep_alive_interval
+
+    @property
+    def placement_node_lease(self) -> bool:
+        return self.__placement_node_lease
+
+    @property
+    def node_lease_time(self) -> int:
+        return self.__node_lease_time
+
+    @property
+    def node_lease_key_ttl(self) -> int:
+        return self.__node_lease_key_ttl
+
+    @property
+    def placement_cache_size(self) -> int:
+        return self.__placement_cache_size
+
     @property
     def magic_code(self) -> str:
         return self.__magic_code
@@ -289,6 +613,70 @@ class DefaultMonkeyConfig(MonkeyConfig):
             self.__rpc_timeout = server_config['rpcTimeout']
         if 'socketGCInterval' in server_config:
             self.__socket_gc_interval = server_config['socketGCInterval']
+        if 'rpcTypeId' in server_config:
+            self.__rpc_type_id = server_config['rpcTypeId']
+        if 'rpcBinaryMeta' in server_config:
+            self.__rpc_binary_meta = server_config['rpcBinaryMeta']
+        if 'rpcChunkSize' in server_config:
+            self.__rpc_chunk_size = server_config['rpcChunkSize']
+        if 'rpcMaxBodySize' in server_config:
+            self.__rpc_max_body_size = server_config['rpcMaxBodySize']
+        if 'rpcMaxStreams' in server_config:
+            self.__rpc_max_streams = server_config['rpcMaxStreams']
+        if 'bufferPoolMaxBytes' in server_config:
+            self.__buffer_pool_max_bytes = server_config['bufferPoolMaxBytes']
+        if 'rpcCompressThreshold' in server_config:
+            self.__rpc_compress_threshold = server_config['rpcCompressThreshold']
+        if 'rpcCompressThresholds' in server_config:
+            self.__rpc_compress_thresholds = server_config['rpcCompressThresholds']
+        if 'rpcCompressLevel' in server_config:
+            self.__rpc_compress_level = server_config['rpcCompressLevel']
+        if 'rpcCompressDicts' in server_config:
+            self.__rpc_compress_dicts = server_config['rpcCompressDicts']
+        if 'rpcCompressSampleSize' in server_config:
+            self.__rpc_compress_sample_size = server_config['rpcCompressSampleSize']
+        if 'mailboxHighWatermark' in server_config:
+            self.__mailbox_high_watermark = server_config['mailboxHighWatermark']
+        if 'mailboxLowWatermark' in server_config:
+            self.__mailbox_low_watermark = server_config['mailboxLowWatermark']
+        if 'sessionPendingHighWatermark' in server_config:
+            self.__session_pending_high_watermark = server_config['sessionPendingHighWatermark']
+        if 'sessionPendingLowWatermark' in server_config:
+            self.__session_pending_low_watermark = server_config['sessionPendingLowWatermark']
+        if 'workerCount' in server_config:
+            self.__worker_count = server_config['workerCount']
+        if 'workerRestartInterval' in server_config:
+            self.__worker_restart_interval = server_config['workerRestartInterval']
+        if 'workerShutdownTimeout' in server_config:
+            self.__worker_shutdown_timeout = server_config['workerShutdownTimeout']
+        if 'workerPortBase' in server_config:
+            self.__worker_port_base = server_config['workerPortBase']
+        if 'shmRingSize' in server_config:
+            self.__shm_ring_size = server_config['shmRingSize']
+        if 'actorTimerTick' in server_config:
+            self.__actor_timer_tick = server_config['actorTimerTick']
+        if 'loadReportInterval' in server_config:
+            self.__load_report_interval = server_config['loadReportInterval']
+        if 'loadLagFactor' in server_config:
+            self.__load_lag_factor = server_config['loadLagFactor']
+        if 'loadBacklogFactor' in server_config:
+            self.__load_backlog_factor = server_config['loadBacklogFactor']
+        if 'rendezvousTransitionTime' in server_config:
+            self.__rendezvous_transition_time = server_config['rendezvousTransitionTime']
+        if 'placementBatchSize' in server_config:
+            self.__placement_batch_size = server_config['placementBatchSize']
+        if 'actorKeepAliveTime' in server_config:
+            self.__actor_keep_alive_time = server_config['actorKeepAliveTime']
+        if 'actorKeepAliveInterval' in server_config:
+            self.__actor_keep_alive_interval = server_config['actorKeepAliveInterval']
+        if 'placementNodeLease' in server_config:
+            self.__placement_node_lease = server_config['placementNodeLease']
+        if 'nodeLeaseTime' in server_config:
+            self.__node_lease_time = server_config['nodeLeaseTime']
+        if 'nodeLeaseKeyTtl' in server_config:
+            self.__node_lease_key_ttl = server_config['nodeLeaseKeyTtl']
+        if 'placementCacheSize' in server_config:
+            self.__placement_cache_size = server_config['placementCacheSize']
         if 'magicCode' in server_config:
             self.__magic_code = server_config['magicCode']
         if 'consulNamespace' in server_config:
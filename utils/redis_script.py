@@ -32,6 +32,92 @@ if old_server_id == server_id then
     return 'success'
 end
 return 'fail'
+'''
+
+    __find_actor_positions_lua = '''
+local expire_time = ARGV[1]
+local result = {}
+for i, actor_key in ipairs(KEYS) do
+    local server_id = redis.call('get', actor_key)
+    if not server_id then
+        server_id = ARGV[i + 1]
+        redis.call('set', actor_key, server_id, 'EX', expire_time)
+    end
+    result[i] = server_id
+end
+return result
+'''
+
+    __actors_keep_alive_lua = '''
+local expire_time = ARGV[1]
+local result = {}
+for i, actor_key in ipairs(KEYS) do
+    if redis.call('get', actor_key) == ARGV[i + 1] then
+        redis.call('expire', actor_key, expire_time)
+        result[i] = 1
+    else
+        result[i] = 0
+    end
+end
+return result
+'''
+
+    __find_actor_positions_lease_lua = '''
+local lease_prefix = ARGV[1]
+local expire_time = ARGV[2]
+local result = {}
+for i, actor_key in ipairs(KEYS) do
+    local server_id = redis.call('get', actor_key)
+    if not server_id or redis.call('exists', lease_prefix .. server_id) == 0 then
+        server_id = ARGV[i + 2]
+        redis.call('set', actor_key, server_id, 'EX', expire_time)
+    end
+    result[i] = server_id
+end
+return result
+'''
+
+    __actors_keep_alive_lease_lua = '''
+local expire_time = tonumber(ARGV[1])
+local result = {}
+for i, actor_key in ipairs(KEYS) do
+    if redis.call('get', actor_key) == ARGV[i + 1] then
+        if redis.call('ttl', actor_key) < expire_time / 2 then
+            redis.call('expire', actor_key, expire_time)
+        end
+        result[i] = 1
+    else
+        result[i] = 0
+    end
+end
+return result
+'''
+
+    __claim_actor_positions_lua = '''
+local expire_time = ARGV[1]
+local result = {}
+for i, actor_key in ipairs(KEYS) do
+    local server_id = redis.call('get', actor_key)
+    if not server_id then
+        server_id = ARGV[i + 1]
+        redis.call('set', actor_key, server_id, 'EX', expire_time)
+    elseif server_id == ARGV[i + 1] then
+        redis.call('expire', actor_key, expire_time)
+    end
+    result[i] = server_id
+end
+return result
+'''
+
+    __release_actor_positions_lua = '''
+local result = 0
+for i, actor_key in ipairs(KEYS) do
+    if redis.call('get', actor_key) == ARGV[i] then
+        redis.call('del', actor_key)
+        result = result + 1
+    end
+end
+return result
 '''
 
     @classmethod
@@ -41,3 +127,36 @@ return 'fail'
     @classmethod
     def actor_keep_alive_lua(cls) -> str:
         return cls.__actor_keep_alive_lua
+
+    @classmethod
+    def find_actor_positions_lua(cls) -> str:
+        """KEYS为actor_type:actor_id, ARGV为过期时间和每个key的候选server_id, 返回每个key的server_id"""
+        return cls.__find_actor_positions_lua
+
+    @classmethod
+    def actors_keep_alive_lua(cls) -> str:
+        """KEYS为actor_type:actor_id, ARGV为过期时间和每个key的server_id, 返回每个key是否续期成功(1/0)"""
+        return cls.__actors_keep_alive_lua
+
+    @classmethod
+    def find_actor_positions_lease_lua(cls) -> str:
+        """节点租约模式: actor key只带很长的兜底过期时间, 指向的节点租约(lease_prefix + server_id)不存在时视为空闲重新分配
+        KEYS为actor_type:actor_id, ARGV为租约key前缀, 兜底过期时间和每个key的候选server_id"""
+        return cls.__find_actor_positions_lease_lua
+
+    @classmethod
+    def actors_keep_alive_lease_lua(cls) -> str:
+        """节点租约模式的续期: 检查归属, 剩余时间不足兜底过期时间一半时才写入, 大部分续期不写Redis
+        KEYS为actor_type:actor_id, ARGV为兜底过期时间和每个key的server_id, 返回每个key是否仍归属(1/0)"""
+        return cls.__actors_keep_alive_lease_lua
+
+    @classmethod
+    def claim_actor_positions_lua(cls) -> str:
+        """与find_actor_positions_lua相同, 已经归属候选server_id时同时续期
+        KEYS为actor_type:actor_id, ARGV为过期时间和每个key的候选server_id, 返回每个key的server_id"""
+        return cls.__claim_actor_positions_lua
+
+    @classmethod
+    def release_actor_positions_lua(cls) -> str:
+        """删除仍归属指定server_id的key, KEYS为actor_type:actor_id, ARGV为每个key的server_id, 返回删除的数量"""
+        return cls.__release_actor_positions_lua
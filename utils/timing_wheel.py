@@ -0,0 +1,91 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+from typing import Generic, Hashable, TypeVar
+
+
+KeyType = TypeVar('KeyType', bound=Hashable)
+
+
+class TimingWheel(Generic[KeyType]):
+    """分层时间轮, 第level层每个槽跨度为slots**level个tick
+    add/remove为O(1), advance只处理到期槽位中的key, 高层槽位在低层转完一圈时逐级下放"""
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: float = 0.0) -> None:
+        self.__tick = tick
+        self.__slots = slots
+        self.__levels = levels
+        self.__current = int(now / tick)
+        self.__wheels: list[list[set[KeyType]]] = [
+            [set() for _ in range(slots)] for _ in range(levels)]
+        self.__entries: dict[KeyType, tuple[int, set[KeyType]]] = {}
+
+    @property
+    def tick(self) -> float:
+        return self.__tick
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: KeyType) -> bool:
+        return key in self.__entries
+
+    def __place(self, key: KeyType, expire: int) -> None:
+        delta = expire - self.__current
+        span = self.__slots
+        for level in range(self.__levels):
+            if delta < span or level == self.__levels - 1:
+                break
+            span *= self.__slots
+        # 超出最高层范围的key先放在最高层, 转到时重新计算位置
+        expire_slot = min(expire, self.__current + span - 1)
+        slot = self.__wheels[level][(expire_slot // (span // self.__slots)) % self.__slots]
+        slot.add(key)
+        self.__entries[key] = (expire, slot)
+
+    def add(self, key: KeyType, deadline: float) -> None:
+        """添加或更新key的到期时间, 已经到期的key在下一次advance时返回"""
+        self.remove(key)
+        self.__place(key, max(int(deadline / self.__tick), self.__current + 1))
+
+    def remove(self, key: KeyType) -> bool:
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[1].discard(key)
+        return True
+
+    def advance(self, now: float) -> list[KeyType]:
+        """推进到now, 返回到期的key"""
+        target = int(now / self.__tick)
+        expired: list[KeyType] = []
+        while self.__current < target:
+            if not self.__entries:
+                self.__current = target
+                break
+            self.__current += 1
+            span = self.__slots
+            for level in range(1, self.__levels):
+                if self.__current % span != 0:
+                    break
+                self.__cascade(self.__wheels[level][(self.__current // span) % self.__slots])
+                span *= self.__slots
+            slot = self.__wheels[0][self.__current % self.__slots]
+            for key in list(slot):
+                expire, _ = self.__entries[key]
+                slot.discard(key)
+                if expire <= self.__current:
+                    del self.__entries[key]
+                    expired.append(key)
+                else:
+                    self.__place(key, expire)
+        return expired
+
+    def __cascade(self, slot: set[KeyType]) -> None:
+        keys = list(slot)
+        slot.clear()
+        for key in keys:
+            self.__place(key, max(self.__entries[key][0], self.__current))
@@ -5,8 +5,8 @@ __author__ = '虎小黑'
 
 import pickle
 from typing import Any, cast
+from utils import compression
 from logger.logger import Logger
-from zstd import ZSTD_compress, ZSTD_uncompress
 
 logger = Logger().get_logger('Monkey')
 
@@ -32,15 +32,16 @@ def to_dict(obj: object) -> dict:
         return {}
 
 
-def pickle_dump(o: Any) -> bytes:
+def pickle_dump(o: Any, compress: bool = True) -> bytes:
+    """RPC body由CodecRpc按连接压缩, 这里传compress=False避免重复压缩"""
     array = pickle.dumps(o, protocol=pickle.HIGHEST_PROTOCOL)
     compressed = UNCOMPRESSED + array
-    if len(compressed) > THRESHOLD:
-        compressed = COMPRESSED + ZSTD_compress(array)
+    if compress and len(compressed) > THRESHOLD:
+        compressed = COMPRESSED + compression.default_context().compress(array)
     return compressed
 
 
 def pickle_load(data: bytes) -> Any:
     if data[0:1] == COMPRESSED:
-        return pickle.loads(ZSTD_uncompress(data[1:]))
+        return pickle.loads(compression.default_context().decompress(data[1:]))
     return pickle.loads(data[1:])
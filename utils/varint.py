@@ -0,0 +1,29 @@
+# -*- coding= utf-8 -*-
+
+__time__ = '2026/10/18'
+__author__ = '虎小黑'
+
+
+def encode_varint(value: int) -> bytes:
+    """无符号LEB128编码"""
+    if value < 0x80:
+        return bytes((value,))
+    array = bytearray()
+    while value >= 0x80:
+        array.append((value & 0x7F) | 0x80)
+        value >>= 7
+    array.append(value)
+    return bytes(array)
+
+
+def decode_varint(data: bytes | bytearray | memoryview, offset: int = 0) -> tuple[int, int]:
+    """返回(值, 下一个字节的偏移)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7